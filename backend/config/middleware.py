@@ -1,12 +1,22 @@
 """
-Django middleware for request tracing and logging.
+Django middleware for request tracing, logging and response compression.
 """
+import re
 import uuid
 
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_string
 
 from config.logging_filters import set_trace_id, get_trace_id
 
+try:
+    import brotli
+except ImportError:
+    # 未安装 brotli 时只使用 gzip
+    brotli = None
+
 
 class TraceIdMiddleware(MiddlewareMixin):
     """
@@ -41,3 +51,73 @@ class TraceIdMiddleware(MiddlewareMixin):
             response["X-Trace-Id"] = request.trace_id
         return response
 
+
+
+class ResponseCompressionMiddleware(MiddlewareMixin):
+    """
+    按大小与内容类型压缩响应。
+
+    - 只压缩 RESPONSE_COMPRESSION_CONTENT_TYPES 中的类型（JSON 与文本），图片等已压缩的内容不再处理
+    - 小于 RESPONSE_COMPRESSION_MIN_SIZE 字节的响应不压缩（压缩收益低于开销）
+    - 客户端接受 br 且已安装 brotli 时优先使用 brotli，否则使用 gzip；
+      HTML 页面（后台页面带有 CSRF 令牌）始终使用带随机填充的 gzip，brotli 没有等价的填充
+    - 流式响应（文件下载）与已设置 Content-Encoding 的响应不处理
+    """
+
+    # gzip 文件头中加入的随机字节数上限，与 Django 的 GZipMiddleware 一致（缓解 BREACH 攻击）
+    max_random_bytes = 100
+    # 动态响应使用较低的 brotli 压缩级别，压缩率接近 gzip -9 而耗时远低于默认的 11
+    brotli_quality = 4
+    # 不使用 brotli 的内容类型：页面中可能包含 CSRF 令牌等秘密，只使用带随机填充的 gzip（缓解 BREACH 攻击）
+    brotli_excluded_content_types = frozenset({"text/html"})
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        if len(response.content) < getattr(settings, "RESPONSE_COMPRESSION_MIN_SIZE", 1024):
+            return response
+        content_type = response.get("Content-Type", "").split(";", 1)[0].strip().lower()
+        if content_type not in getattr(settings, "RESPONSE_COMPRESSION_CONTENT_TYPES", ()):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = self._choose_encoding(
+            request.META.get("HTTP_ACCEPT_ENCODING", ""),
+            allow_brotli=content_type not in self.brotli_excluded_content_types,
+        )
+        if encoding is None:
+            return response
+
+        if encoding == "br":
+            compressed = brotli.compress(response.content, mode=brotli.MODE_TEXT, quality=self.brotli_quality)
+        else:
+            compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = encoding
+        # 压缩后内容与未压缩版本不再逐字节相同，强 ETag 改为弱 ETag
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
+
+    @staticmethod
+    def _choose_encoding(accept_encoding: str, allow_brotli: bool = True):
+        accepted = set()
+        for part in accept_encoding.split(","):
+            name, _, params = part.strip().partition(";")
+            match = re.search(r"q\s*=\s*([0-9.]+)", params)
+            try:
+                if match and float(match.group(1)) <= 0:
+                    continue
+            except ValueError:
+                continue
+            accepted.add(name.strip().lower())
+        if allow_brotli and brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted or "*" in accepted:
+            return "gzip"
+        return None
@@ -0,0 +1,59 @@
+"""
+基于 orjson 的 JSON 渲染器与解析器。
+
+输出与 DRF 默认的 JSONRenderer 保持一致：
+- datetime/date/time/timedelta/Decimal/UUID 等类型交给 DRF 的 JSONEncoder.default 处理，
+  日期格式（UTC 输出为 Z、微秒截断为毫秒）与 Decimal（转换为浮点数）不变
+- 紧凑输出、不转义非 ASCII 字符，\\u2028 与 \\u2029 仍被转义
+- 请求缩进输出（浏览器调试）或 orjson 无法编码（超出 64 位的整数等）时回退到 DRF 实现
+
+唯一的差异：NaN/Infinity 输出为 null，而不是非标准的 NaN 字面量。
+"""
+from __future__ import annotations
+
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+# datetime 交给 DRF 的编码器处理以保持格式；非字符串键（例如整数）与 json.dumps 一样转换为字符串
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+_drf_encoder = encoders.JSONEncoder()
+
+
+class ORJSONRenderer(JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_drf_encoder.default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # 与 DRF 一致：始终转义 \u2028 与 \u2029，保证输出是严格的 JavaScript 子集
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        if encoding.lower().replace("_", "-") not in ("utf-8", "utf8"):
+            # orjson 只接受 UTF-8
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError(f"JSON parse error - {exc}")
@@ -100,6 +100,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # WhiteNoise必须在SecurityMiddleware之后，其他中间件之前
+    "config.middleware.ResponseCompressionMiddleware",  # 在修改响应内容的中间件之前，最后处理响应
     "corsheaders.middleware.CorsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -351,7 +352,12 @@ if DEBUG:
 
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "config.renderers.ORJSONRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "config.renderers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "core.authentication.AuthTokenAuthentication",
@@ -375,6 +381,17 @@ REST_FRAMEWORK = {
     },
 }
 
+# 响应压缩：只压缩超过该大小（字节）的 JSON 与文本响应
+RESPONSE_COMPRESSION_MIN_SIZE = int(os.getenv("RESPONSE_COMPRESSION_MIN_SIZE", "1024"))
+RESPONSE_COMPRESSION_CONTENT_TYPES = (
+    "application/json",
+    "text/html",
+    "text/plain",
+    "text/csv",
+    "text/css",
+    "application/javascript",
+)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -460,6 +477,19 @@ CELERY_TASK_SOFT_TIME_LIMIT = 300  # 软超时：5分钟（任务可以优雅退
 CELERY_TASK_TIME_LIMIT = 360  # 硬超时：6分钟（强制终止）
 CELERY_TASK_MAX_RETRIES = 2  # 最多重试2次
 CELERY_TASK_DEFAULT_RETRY_DELAY = 60  # 重试延迟60秒
+# 同步执行任务（不经过 broker），用于本地开发和测试
+CELERY_TASK_ALWAYS_EAGER = os.getenv("CELERY_TASK_ALWAYS_EAGER", "false").lower() == "true"
+CELERY_TASK_EAGER_PROPAGATES = True
+
+# 月报生成子任务的限流（每个 worker），避免月初集中生成时压垮数据库
+MONTHLY_REPORT_TASK_RATE_LIMIT = os.getenv("MONTHLY_REPORT_TASK_RATE_LIMIT", "120/m")
+
+# 上传删除记录（墓碑）保留天数：超过此天数未同步的客户端需要全量同步
+UPLOAD_TOMBSTONE_RETENTION_DAYS = int(os.getenv("UPLOAD_TOMBSTONE_RETENTION_DAYS", "30"))
+
+# Token 鉴权缓存：令牌解析结果缓存秒数；最近使用时间每个令牌最多每隔多少秒记录一次
+AUTH_TOKEN_CACHE_TTL = int(os.getenv("AUTH_TOKEN_CACHE_TTL", "60"))
+AUTH_TOKEN_TOUCH_INTERVAL = int(os.getenv("AUTH_TOKEN_TOUCH_INTERVAL", "300"))
 
 # 图像分析配置
 # 图片分析时的最大边长（像素），降低此值可以减少计算量和内存使用
@@ -477,4 +507,19 @@ CELERY_BEAT_SCHEDULE = {
         "schedule": crontab(hour=2, minute=0, day_of_month=1),  # 每月1号凌晨2点执行
         "options": {"expires": 3600},  # 任务过期时间1小时
     },
+    "sweep-short-term-goal-statuses": {
+        "task": "core.tasks.sweep_short_term_goal_statuses_task",
+        "schedule": crontab(minute=5),  # 每小时第5分钟执行
+        "options": {"expires": 1800},
+    },
+    "purge-upload-tombstones": {
+        "task": "core.tasks.purge_upload_tombstones_task",
+        "schedule": crontab(hour=3, minute=30),  # 每天凌晨3点30分执行
+        "options": {"expires": 3600},
+    },
+    "flush-auth-token-last-used": {
+        "task": "core.tasks.flush_auth_token_last_used_task",
+        "schedule": crontab(minute="*/5"),  # 每5分钟执行
+        "options": {"expires": 240},
+    },
 }
\ No newline at end of file
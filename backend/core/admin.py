@@ -10,6 +10,7 @@ from core.models import (
     HolidayMessage,
     MonthlyReport,
     MonthlyReportTemplate,
+    ReportGenerationRun,
     UserProfile,
     TestAccountProfile,
     UploadConditionalMessage,
@@ -638,3 +639,11 @@ class MonthlyReportAdmin(admin.ModelAdmin):
             "classes": ("collapse",),
         }),
     )
+
+
+@admin.register(ReportGenerationRun)
+class ReportGenerationRunAdmin(admin.ModelAdmin):
+    list_display = ("year", "month", "status", "total_users", "users_done", "users_failed", "started_at", "finished_at")
+    list_filter = ("status",)
+    ordering = ("-year", "-month")
+    readonly_fields = ("task_id", "started_at", "finished_at")
@@ -33,6 +33,7 @@ from core.models import (
     UserUpload,
 )
 from core.permissions import IsStaffUser
+from core.projections import CheckInProjection
 from core.serializers import (
     ConditionalMessageSerializer,
     DailyHistoryMessageSerializer,
@@ -178,6 +179,9 @@ class TestAccountCheckInListCreateView(_BaseTestAccountChildView, generics.ListC
 
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        return Response(CheckInProjection(request).project(self.get_queryset()))
+
     def perform_create(self, serializer: TestAccountCheckInSerializer):
         profile = self._get_profile()
         serializer.save(user=profile.user)
@@ -294,8 +298,10 @@ class DailyQuizAdminViewSet(viewsets.ModelViewSet):
     pagination_class = None
     
     def get_parser_classes(self):
-        from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
-        return [MultiPartParser, FormParser, JSONParser]
+        from rest_framework.parsers import FormParser, MultiPartParser
+
+        from config.renderers import ORJSONParser
+        return [MultiPartParser, FormParser, ORJSONParser]
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -310,8 +316,10 @@ class DailyQuizOptionAdminViewSet(viewsets.ModelViewSet):
     pagination_class = None
     
     def get_parser_classes(self):
-        from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
-        return [MultiPartParser, FormParser, JSONParser]
+        from rest_framework.parsers import FormParser, MultiPartParser
+
+        from config.renderers import ORJSONParser
+        return [MultiPartParser, FormParser, ORJSONParser]
 
 
 # ==================== 订单管理 ====================
@@ -0,0 +1,149 @@
+"""
+Token 鉴权缓存与 last_used_at 合并写入。
+
+- 令牌 -> (AuthToken, 用户) 的解析结果缓存 AUTH_TOKEN_CACHE_TTL 秒；令牌删除、更换或
+  用户信息修改（修改密码、停用账号等）时由信号立即失效（见 core.signals）
+- last_used_at 不再在每次请求时写入：每个令牌每 AUTH_TOKEN_TOUCH_INTERVAL 秒最多记录一次，
+  记录放入缓存中的待写队列，由定时任务 flush_last_used 批量写入数据库
+
+待写队列：用 cache.incr 分配递增槽位，每个槽位保存 (令牌ID, 使用时间)；
+写入任务从上次处理到的槽位读到当前槽位。缓存不可用时鉴权直接查询数据库，
+不记录使用时间（last_used_at 只用于统计，不影响鉴权）。
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from core.models import AuthToken
+
+logger = logging.getLogger(__name__)
+
+# 缓存键前缀
+CACHE_PREFIX = "auth_token"
+# 每次从待写队列读取的槽位数
+FLUSH_BATCH_SIZE = 500
+# 待写记录在缓存中的保留时间（秒），超过后视为丢失
+PENDING_TTL = 24 * 60 * 60
+# 写入任务的互斥锁超时（秒）
+FLUSH_LOCK_TIMEOUT = 5 * 60
+
+_SEQ_KEY = f"{CACHE_PREFIX}:pending:seq"
+_CURSOR_KEY = f"{CACHE_PREFIX}:pending:cursor"
+_FLUSH_LOCK_KEY = f"{CACHE_PREFIX}:pending:lock"
+
+
+def get_cache_ttl() -> int:
+    return getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60)
+
+
+def get_touch_interval() -> int:
+    return getattr(settings, "AUTH_TOKEN_TOUCH_INTERVAL", 300)
+
+
+def _token_key(key: str) -> str:
+    # 缓存键中不保存令牌明文
+    return f"{CACHE_PREFIX}:key:{hashlib.sha256(key.encode('utf-8')).hexdigest()}"
+
+
+def get_token(key: str) -> Optional[AuthToken]:
+    """
+    按令牌字符串获取 AuthToken（已加载 user），优先读取缓存。
+
+    Returns:
+        令牌不存在时返回 None
+    """
+    cache_key = _token_key(key)
+    try:
+        token = cache.get(cache_key)
+    except Exception:
+        logger.warning("读取鉴权缓存失败，直接查询数据库", exc_info=True)
+        return AuthToken.objects.select_related("user").filter(key=key).first()
+    if token is not None:
+        return token
+
+    token = AuthToken.objects.select_related("user").filter(key=key).first()
+    if token is not None:
+        try:
+            cache.set(cache_key, token, get_cache_ttl())
+        except Exception:
+            logger.warning("写入鉴权缓存失败", exc_info=True)
+    return token
+
+
+def revoke_keys(keys: Iterable[str]) -> None:
+    """
+    在当前事务提交后使令牌的缓存失效。
+
+    提交后再删除，避免并发请求在提交前读到旧数据并重新写入缓存。
+    """
+    cache_keys = [_token_key(key) for key in keys if key]
+    if cache_keys:
+        transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
+def revoke_user(user_id: int) -> None:
+    """使用户所有令牌的缓存失效（修改密码、停用账号等）。"""
+    revoke_keys(AuthToken.objects.filter(user_id=user_id).values_list("key", flat=True))
+
+
+def touch(token_id: int, now: Optional[datetime] = None) -> None:
+    """记录令牌的使用时间：每个令牌每个间隔最多进入一次待写队列。"""
+    now = now or timezone.now()
+    if not cache.add(f"{CACHE_PREFIX}:touched:{token_id}", 1, get_touch_interval()):
+        return
+    try:
+        slot = cache.incr(_SEQ_KEY)
+    except ValueError:
+        # 计数键不存在（首次使用或缓存被清空）
+        cache.add(_SEQ_KEY, 0, None)
+        slot = cache.incr(_SEQ_KEY)
+    cache.set(f"{CACHE_PREFIX}:pending:{slot}", (token_id, now), PENDING_TTL)
+
+
+def flush_last_used() -> int:
+    """
+    将待写队列中的使用时间批量写入 AuthToken.last_used_at。
+
+    Returns:
+        更新的令牌数
+    """
+    if not cache.add(_FLUSH_LOCK_KEY, 1, FLUSH_LOCK_TIMEOUT):
+        logger.info("last_used_at 写入任务正在执行，跳过")
+        return 0
+    try:
+        end = cache.get(_SEQ_KEY) or 0
+        start = cache.get(_CURSOR_KEY) or 0
+        if start > end:
+            # 计数键被清空后重新从 1 开始分配
+            start = 0
+
+        # 已分配槽位但尚未写入记录的请求会被跳过：该次使用时间丢失，下个间隔重新记录
+        updated = 0
+        for batch_start in range(start + 1, end + 1, FLUSH_BATCH_SIZE):
+            batch_end = min(batch_start + FLUSH_BATCH_SIZE - 1, end)
+            slots = [f"{CACHE_PREFIX}:pending:{slot}" for slot in range(batch_start, batch_end + 1)]
+            latest: Dict[int, datetime] = {}
+            for token_id, used_at in cache.get_many(slots).values():
+                if token_id not in latest or used_at > latest[token_id]:
+                    latest[token_id] = used_at
+            if latest:
+                # bulk_update 不触发 auto_now，写入记录的使用时间
+                tokens = [AuthToken(pk=token_id, last_used_at=used_at) for token_id, used_at in latest.items()]
+                AuthToken.objects.bulk_update(tokens, ["last_used_at"])
+                updated += len(tokens)
+            cache.delete_many(slots)
+            cache.set(_CURSOR_KEY, batch_end, None)
+    finally:
+        cache.delete(_FLUSH_LOCK_KEY)
+
+    if updated:
+        logger.info(f"写入令牌最近使用时间: {updated} 个")
+    return updated
@@ -1,18 +1,23 @@
 from __future__ import annotations
 
+import logging
 from typing import Any
 
-from django.utils import timezone
 from rest_framework import exceptions
 from rest_framework.authentication import BaseAuthentication, get_authorization_header
 
+from core import auth_token_cache
 from core.models import AuthToken
 
+logger = logging.getLogger(__name__)
+
 
 class AuthTokenAuthentication(BaseAuthentication):
     """
     简单的 Token 鉴权实现，使用数据库中的 `AuthToken`。
     期待客户端在请求头中携带 `Authorization: Token <key>`。
+
+    令牌解析结果短时间缓存，最近使用时间合并后由定时任务批量写入（见 core.auth_token_cache）。
     """
 
     keyword = "Token"
@@ -29,41 +34,18 @@ class AuthTokenAuthentication(BaseAuthentication):
         if not key:
             return None
 
-        try:
-            token = AuthToken.objects.select_related("user").get(key=key)
-        except AuthToken.DoesNotExist as exc:
-            raise exceptions.AuthenticationFailed("无效的认证令牌") from exc
+        token = auth_token_cache.get_token(key)
+        if token is None:
+            raise exceptions.AuthenticationFailed("无效的认证令牌")
 
         # 检查token是否过期
         if token.is_expired:
             raise exceptions.AuthenticationFailed("认证令牌已过期，请重新登录")
 
-        # 更新最近使用时间（如果数据库可写）
-        # 如果数据库是只读的，忽略此错误，不影响认证流程
+        # 记录最近使用时间（合并写入），失败时不影响认证
         try:
-            AuthToken.objects.filter(pk=token.pk).update(last_used_at=timezone.now())
+            auth_token_cache.touch(token.pk)
         except Exception:
-            # 数据库可能是只读的，记录警告但不影响认证
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.warning(
-                f"无法更新 token {token.pk} 的 last_used_at: 数据库可能是只读的",
-                exc_info=True
-            )
+            logger.warning(f"无法记录 token {token.pk} 的最近使用时间", exc_info=True)
 
         return token.user, token
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
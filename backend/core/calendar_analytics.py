@@ -0,0 +1,108 @@
+"""
+日历统计：在 NumPy datetime64[D] 日期数组上计算日历直方图、连续段与最长间隔。
+
+输入通常来自一次 values_list 查询得到的日期流：
+- 上传记录使用 local_date（保存时已按中国时区换算）
+- 只有时间戳时用 shanghai_days 换算为中国时区日期
+
+日期流可以包含重复日期且无需排序；连续段与间隔按去重后的日期计算。
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timezone as dt_timezone
+from typing import Iterable, Tuple
+
+import numpy as np
+
+# 中国时区相对 UTC 的固定偏移（1991 年后不再实行夏令时）
+SHANGHAI_UTC_OFFSET = np.timedelta64(8, "h")
+
+
+def to_days(values: Iterable[date]) -> np.ndarray:
+    """将日期流转换为 datetime64[D] 数组（保留重复与原有顺序，忽略 None）。"""
+    return np.array([value for value in values if value is not None], dtype="datetime64[D]")
+
+
+def shanghai_days(values: Iterable[datetime]) -> np.ndarray:
+    """将带时区的时间戳流换算为中国时区日期数组（忽略 None）。"""
+    utc_seconds = np.array(
+        [
+            value.astimezone(dt_timezone.utc).replace(tzinfo=None)
+            for value in values
+            if value is not None
+        ],
+        dtype="datetime64[s]",
+    )
+    return (utc_seconds + SHANGHAI_UTC_OFFSET).astype("datetime64[D]")
+
+
+def unique_days(days: np.ndarray) -> np.ndarray:
+    """去重并升序排列。"""
+    return np.unique(days.astype("datetime64[D]"))
+
+
+def calendar_histogram(
+    days: np.ndarray, start: date, end: date, weights: np.ndarray | None = None
+) -> np.ndarray:
+    """
+    统计 [start, end] 内每天的出现次数（或权重之和）。
+
+    Returns:
+        长度为 (end - start).days + 1 的数组，下标 0 对应 start
+    """
+    length = (end - start).days + 1
+    if length <= 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = (days.astype("datetime64[D]") - np.datetime64(start, "D")).astype(np.int64)
+    in_range = (offsets >= 0) & (offsets < length)
+    if weights is None:
+        return np.bincount(offsets[in_range], minlength=length)
+    histogram = np.bincount(offsets[in_range], weights=np.asarray(weights)[in_range], minlength=length)
+    return histogram.astype(np.asarray(weights).dtype, copy=False)
+
+
+def streak_runs(days: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    计算连续段（按日连续出现的日期区间）。
+
+    Returns:
+        (各连续段起始日期 datetime64[D], 各连续段天数)，按起始日期升序
+    """
+    days = unique_days(days)
+    if len(days) == 0:
+        return days, np.zeros(0, dtype=np.int64)
+    new_run = np.ones(len(days), dtype=bool)
+    new_run[1:] = np.diff(days).astype(np.int64) != 1
+    starts = np.flatnonzero(new_run)
+    lengths = np.diff(np.append(starts, len(days)))
+    return days[starts], lengths
+
+
+def longest_streak(days: np.ndarray) -> int:
+    """最长连续天数，没有日期时为 0。"""
+    _, lengths = streak_runs(days)
+    return int(lengths.max()) if len(lengths) else 0
+
+
+def streak_ending_at(days: np.ndarray, end: date) -> int:
+    """以 end 结束的连续天数；end 当天没有出现时为 0。"""
+    starts, lengths = streak_runs(days)
+    if len(starts) == 0:
+        return 0
+    end_day = np.datetime64(end, "D")
+    # 起始日期不晚于 end 的最后一个连续段
+    index = int(np.searchsorted(starts, end_day, side="right")) - 1
+    if index < 0:
+        return 0
+    run_end = starts[index] + np.timedelta64(int(lengths[index]) - 1, "D")
+    if run_end < end_day:
+        return 0
+    return int((end_day - starts[index]).astype(np.int64)) + 1
+
+
+def longest_gap(days: np.ndarray) -> int:
+    """相邻两次出现之间最长的空白天数，少于两个日期时为 0。"""
+    days = unique_days(days)
+    if len(days) < 2:
+        return 0
+    return int(np.diff(days).astype(np.int64).max()) - 1
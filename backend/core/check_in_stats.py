@@ -0,0 +1,104 @@
+"""
+打卡统计批量计算：一次为多个用户计算打卡统计，避免逐用户查询（N+1）。
+
+统计规则与 views._get_check_in_stats 一致：
+- 打卡天数 = "打卡记录日期" 与 "上传记录日期（按中国时区）" 的并集（去重）天数
+- 今日是否已打卡 = 并集中是否包含今天
+- 连续天数 = 以最近一天为起点，向前按日连续命中的天数
+
+无论批次大小，固定只执行两次分组查询；连续天数在排序后的
+(用户, 日期) 数组上用 NumPy 向量化计算。
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, Iterable
+
+import numpy as np
+
+from core.models import DailyCheckIn, UserUpload
+
+
+def _empty_stats() -> Dict[str, Any]:
+    return {
+        "checked_today": False,
+        "current_streak": 0,
+        "total_checkins": 0,
+        "latest_checkin": None,
+    }
+
+
+def get_check_in_stats_bulk(
+    user_ids: Iterable[int], *, today: date | None = None
+) -> Dict[int, Dict[str, Any]]:
+    """
+    批量获取用户打卡统计。
+
+    Args:
+        user_ids: 用户 ID 列表
+        today: 中国时区的今天日期，默认使用 get_today_shanghai()
+
+    Returns:
+        {user_id: 统计字典}，统计字典与 _get_check_in_stats 的返回值格式相同；
+        没有任何打卡或上传记录的用户返回空统计
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return {}
+    if today is None:
+        from core.views import get_today_shanghai
+
+        today = get_today_shanghai()
+
+    checkin_rows = list(
+        DailyCheckIn.objects.filter(user_id__in=user_ids)
+        .order_by()
+        .values_list("user_id", "date")
+        .distinct()
+    )
+    upload_rows = list(
+        UserUpload.objects.filter(user_id__in=user_ids, local_date__isnull=False)
+        .order_by()
+        .values_list("user_id", "local_date")
+        .distinct()
+    )
+
+    results = {user_id: _empty_stats() for user_id in user_ids}
+    rows = checkin_rows + upload_rows
+    if not rows:
+        return results
+
+    owners = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    days = np.array([row[1] for row in rows], dtype="datetime64[D]").astype(np.int64)
+
+    # 按 (用户, 日期) 去重并排序，得到每个用户的日期并集
+    pairs = np.unique(np.column_stack((owners, days)), axis=0)
+    owners = pairs[:, 0]
+    days = pairs[:, 1]
+
+    # 用户切换或日期不连续的位置开启新的连续段
+    new_run = np.ones(len(days), dtype=bool)
+    new_run[1:] = (owners[1:] != owners[:-1]) | (np.diff(days) != 1)
+    run_ids = np.cumsum(new_run) - 1
+    run_lengths = np.bincount(run_ids)
+
+    # 每个用户在排序数组中的最后一个位置，即最近打卡日所在的连续段
+    user_ends = np.flatnonzero(np.append(owners[1:] != owners[:-1], True))
+    user_starts = np.concatenate(([0], user_ends[:-1] + 1))
+    totals = user_ends - user_starts + 1
+    streaks = run_lengths[run_ids[user_ends]]
+    latest_days = days[user_ends].astype("datetime64[D]").tolist()
+    checked_today_owners = set(
+        owners[days == np.datetime64(today, "D").astype(np.int64)].tolist()
+    )
+
+    for owner, total, streak, latest in zip(
+        owners[user_ends].tolist(), totals.tolist(), streaks.tolist(), latest_days
+    ):
+        results[owner] = {
+            "checked_today": owner in checked_today_owners,
+            "current_streak": streak,
+            "total_checkins": total,
+            "latest_checkin": latest.isoformat(),
+        }
+    return results
@@ -0,0 +1,20 @@
+"""
+数据库后端差异的兼容工具
+"""
+from __future__ import annotations
+
+from typing import List, Optional
+
+from django.db import connection
+
+
+def conflict_target(fields: List[str]) -> Optional[List[str]]:
+    """
+    bulk_create(update_conflicts=True) 的 unique_fields 参数。
+
+    MySQL 不支持指定冲突目标（传入 unique_fields 会抛出 NotSupportedError），
+    返回 None 由数据库按唯一约束自动匹配；其他数据库（PostgreSQL、SQLite）必须指定。
+    """
+    if connection.features.supports_update_conflicts_with_target:
+        return fields
+    return None
@@ -0,0 +1,236 @@
+"""
+长期目标进度增量统计。
+
+每个长期目标保存累计分钟数（LongTermGoal.progress_minutes）与检查点达成记录
+（LongTermGoalCheckpointCrossing），读取目标时只需 O(检查点数) 的数据，
+不再加载计划开始以来的全部上传记录。
+
+统计规则与原先的实时计算一致：
+- 计入范围：上传时间 >= 计划开始当天 00:00（中国时区）的上传
+- 按 (uploaded_at, id) 排序累加，时长 <= 0 的上传不计入
+- 第 i 个检查点的阈值 = 目标分钟数 / 检查点数量 * i，
+  累计分钟数首次 >= 阈值的上传即为该检查点的达成上传
+
+维护方式：
+- 新增上传且其排序位于用户所有上传之后（常见情况）：直接在已有统计上追加
+- 其他情况（补录历史上传、修改时长或时间、删除上传、修改目标参数）：重建受影响目标的统计
+- 尚未建立统计的目标在首次读取时重建
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, time
+from typing import Any, Dict, List, Tuple
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import (
+    SHANGHAI_TZ,
+    LongTermGoal,
+    LongTermGoalCheckpointCrossing,
+    UserUpload,
+    to_shanghai_date,
+)
+
+logger = logging.getLogger(__name__)
+
+# 影响进度统计的上传字段
+PROGRESS_FIELDS = frozenset({"uploaded_at", "duration_minutes"})
+
+
+def get_window_start(started_at: datetime) -> datetime:
+    """返回目标计入上传的起始时间：计划开始当天 00:00（中国时区）。"""
+    if timezone.is_naive(started_at):
+        started_at = timezone.make_aware(started_at)
+    return datetime.combine(to_shanghai_date(started_at), time.min, tzinfo=SHANGHAI_TZ)
+
+
+def get_checkpoint_thresholds(goal: LongTermGoal) -> List[float]:
+    """返回各检查点的阈值分钟数（按检查点顺序）。"""
+    # 确保类型正确（防止从数据库读取时是字符串）
+    target_hours = float(goal.target_hours) if goal.target_hours is not None else 0.0
+    checkpoint_count = int(goal.checkpoint_count) if goal.checkpoint_count is not None else 1
+    per_checkpoint_minutes = target_hours * 60 / checkpoint_count
+    return [per_checkpoint_minutes * (index + 1) for index in range(checkpoint_count)]
+
+
+def _safe_minutes(value: int | None) -> int:
+    if value is None:
+        return 0
+    return max(int(value), 0)
+
+
+def compute_goal_progress(goal: LongTermGoal) -> Tuple[int, List[Tuple[int, int, int]]]:
+    """
+    从头扫描上传记录计算目标进度（不读写已保存的统计）。
+
+    Returns:
+        (累计分钟数, [(检查点序号, 上传ID, 累计分钟数), ...])
+    """
+    thresholds = get_checkpoint_thresholds(goal)
+    rows = (
+        UserUpload.objects.filter(
+            user_id=goal.user_id,
+            uploaded_at__gte=get_window_start(goal.started_at),
+        )
+        .order_by("uploaded_at", "id")
+        .values_list("id", "duration_minutes")
+    )
+
+    total_minutes = 0
+    crossings: List[Tuple[int, int, int]] = []
+    for upload_id, duration_minutes in rows.iterator():
+        minutes = _safe_minutes(duration_minutes)
+        if minutes <= 0:
+            continue
+        total_minutes += minutes
+        while len(crossings) < len(thresholds) and thresholds[len(crossings)] <= total_minutes:
+            crossings.append((len(crossings) + 1, upload_id, total_minutes))
+    return total_minutes, crossings
+
+
+def get_stored_progress(goal: LongTermGoal) -> Tuple[int, List[Tuple[int, int, int]]]:
+    """读取已保存的目标进度，格式与 compute_goal_progress 相同。"""
+    crossings = list(
+        LongTermGoalCheckpointCrossing.objects.filter(goal=goal)
+        .order_by("index")
+        .values_list("index", "upload_id", "cumulative_minutes")
+    )
+    return goal.progress_minutes, crossings
+
+
+def rebuild_goal_progress(goal: LongTermGoal) -> None:
+    """从头重建目标的累计分钟数与检查点达成记录。"""
+    with transaction.atomic():
+        # 锁定目标，避免与并发的增量更新交错
+        LongTermGoal.objects.select_for_update().filter(pk=goal.pk).first()
+        total_minutes, crossings = compute_goal_progress(goal)
+        LongTermGoalCheckpointCrossing.objects.filter(goal=goal).delete()
+        LongTermGoalCheckpointCrossing.objects.bulk_create(
+            [
+                LongTermGoalCheckpointCrossing(
+                    goal=goal,
+                    index=index,
+                    upload_id=upload_id,
+                    cumulative_minutes=cumulative_minutes,
+                )
+                for index, upload_id, cumulative_minutes in crossings
+            ]
+        )
+        synced_at = timezone.now()
+        LongTermGoal.objects.filter(pk=goal.pk).update(
+            progress_minutes=total_minutes,
+            progress_synced_at=synced_at,
+        )
+    goal.progress_minutes = total_minutes
+    goal.progress_synced_at = synced_at
+
+
+def _append_upload(goal: LongTermGoal, upload: UserUpload, minutes: int) -> None:
+    """在已有统计上追加一条排在最后的上传。"""
+    thresholds = get_checkpoint_thresholds(goal)
+    with transaction.atomic():
+        locked = LongTermGoal.objects.select_for_update().get(pk=goal.pk)
+        total_minutes = locked.progress_minutes + minutes
+        crossed = LongTermGoalCheckpointCrossing.objects.filter(goal=goal).count()
+        new_crossings = []
+        while crossed < len(thresholds) and thresholds[crossed] <= total_minutes:
+            crossed += 1
+            new_crossings.append(
+                LongTermGoalCheckpointCrossing(
+                    goal=goal,
+                    index=crossed,
+                    upload=upload,
+                    cumulative_minutes=total_minutes,
+                )
+            )
+        LongTermGoalCheckpointCrossing.objects.bulk_create(new_crossings)
+        LongTermGoal.objects.filter(pk=goal.pk).update(progress_minutes=total_minutes)
+    goal.progress_minutes = total_minutes
+
+
+def _goals_covering(user_id: int, *moments: datetime) -> List[LongTermGoal]:
+    """返回计入范围覆盖任一时间点的目标（包括已归档的历史目标）。"""
+    goals = LongTermGoal.objects.filter(user_id=user_id)
+    return [
+        goal
+        for goal in goals
+        if any(moment >= get_window_start(goal.started_at) for moment in moments)
+    ]
+
+
+def _is_last_upload(upload: UserUpload) -> bool:
+    """上传是否排在该用户所有上传的最后（按 uploaded_at、id 排序）。"""
+    return not (
+        UserUpload.objects.filter(user_id=upload.user_id)
+        .filter(
+            Q(uploaded_at__gt=upload.uploaded_at)
+            | Q(uploaded_at=upload.uploaded_at, id__gt=upload.pk)
+        )
+        .exists()
+    )
+
+
+# on_upload_* 返回进度被重建的目标（检查点达成记录可能已变化），供调用方刷新派生数据（如目标快照）
+def on_upload_created(upload: UserUpload) -> List[LongTermGoal]:
+    minutes = _safe_minutes(upload.duration_minutes)
+    if minutes <= 0:
+        return []
+    goals = _goals_covering(upload.user_id, upload.uploaded_at)
+    if not goals:
+        return []
+    is_last = _is_last_upload(upload)
+    rebuilt = []
+    for goal in goals:
+        if is_last and goal.progress_synced_at is not None:
+            _append_upload(goal, upload, minutes)
+        else:
+            rebuild_goal_progress(goal)
+            rebuilt.append(goal)
+    return rebuilt
+
+
+def on_upload_changed(upload: UserUpload, previous: Tuple[datetime, int | None]) -> List[LongTermGoal]:
+    previous_uploaded_at, previous_minutes = previous
+    if (
+        previous_uploaded_at == upload.uploaded_at
+        and _safe_minutes(previous_minutes) == _safe_minutes(upload.duration_minutes)
+    ):
+        return []
+    goals = _goals_covering(upload.user_id, previous_uploaded_at, upload.uploaded_at)
+    for goal in goals:
+        rebuild_goal_progress(goal)
+    return goals
+
+
+def on_upload_deleted(upload: UserUpload) -> List[LongTermGoal]:
+    if _safe_minutes(upload.duration_minutes) <= 0:
+        return []
+    goals = _goals_covering(upload.user_id, upload.uploaded_at)
+    for goal in goals:
+        rebuild_goal_progress(goal)
+    return goals
+
+
+def get_goal_progress(goal: LongTermGoal) -> Dict[str, Any]:
+    """
+    获取目标进度（尚未建立统计时先重建）。
+
+    Returns:
+        - total_minutes: 累计分钟数
+        - crossings: {检查点序号: LongTermGoalCheckpointCrossing}，已关联上传记录
+    """
+    if goal.progress_synced_at is None:
+        rebuild_goal_progress(goal)
+    crossings = (
+        LongTermGoalCheckpointCrossing.objects.filter(goal=goal)
+        .select_related("upload", "upload__mood")
+        .prefetch_related("upload__tags")
+        .order_by("index")
+    )
+    return {
+        "total_minutes": goal.progress_minutes,
+        "crossings": {crossing.index: crossing for crossing in crossings},
+    }
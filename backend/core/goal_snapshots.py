@@ -0,0 +1,185 @@
+"""
+已完成长期目标的归档快照。
+
+目标完成后，其序列化结果（进度、检查点、展示作品）冻结为压缩 JSON 保存在
+LongTermGoalSnapshot 中，已完成目标列表直接分页读取快照，不再逐个重新序列化。
+
+- 图片链接依赖请求与令牌，快照中只保存文件名，读取时再生成
+- 目标元数据（检查点留言、展示作品、轮次）被修改时刷新快照
+- 上传被修改或删除时，丢弃进度被重建的目标以及展示该上传的目标的快照，下次读取时重新判断
+- 未完成的目标记录判断时的累计分钟数（LongTermGoal.snapshot_checked_minutes），
+  进度没有变化时不再重复序列化
+- 快照格式变化时递增 SNAPSHOT_SCHEMA_VERSION，并运行
+  regenerate_long_term_goal_snapshots 管理命令重新生成
+"""
+from __future__ import annotations
+
+import json
+import logging
+import zlib
+from typing import Any, Dict, Iterable, Optional, Set
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+
+from core.models import LongTermGoal, LongTermGoalCheckpointCrossing, LongTermGoalSnapshot, UserUpload
+from core.serializers import DEFERRED_IMAGE_KEY, LongTermGoalSerializer, build_upload_image_url
+
+logger = logging.getLogger(__name__)
+
+# 快照格式版本
+SNAPSHOT_SCHEMA_VERSION = 1
+
+
+def is_goal_completed(goal_data: Dict[str, Any]) -> bool:
+    """
+    判断序列化后的目标是否已完成：
+    所有检查点都已完成，或者进度达到100%，或者时长达到目标。
+    """
+    progress = goal_data.get("progress") or {}
+    checkpoints = goal_data.get("checkpoints") or []
+
+    # 检查是否所有检查点都已完成
+    if len(checkpoints) > 0 and all(cp.get("status") == "completed" for cp in checkpoints):
+        return True
+
+    try:
+        progress_percent = int(progress.get("progressPercent") or 0)
+    except (TypeError, ValueError):
+        progress_percent = 0
+    try:
+        spent_hours = float(progress.get("spentHours") or 0)
+    except (TypeError, ValueError):
+        spent_hours = 0.0
+    try:
+        target_hours = float(progress.get("targetHours") or 0)
+    except (TypeError, ValueError):
+        target_hours = 0.0
+
+    return progress_percent >= 100 or (target_hours > 0 and spent_hours >= target_hours)
+
+
+def encode_payload(goal_data: Dict[str, Any]) -> bytes:
+    return zlib.compress(
+        json.dumps(goal_data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    )
+
+
+def decode_payload(payload: bytes) -> Dict[str, Any]:
+    return json.loads(zlib.decompress(bytes(payload)).decode("utf-8"))
+
+
+def refresh_goal_snapshot(goal: LongTermGoal) -> Optional[LongTermGoalSnapshot]:
+    """
+    重新序列化目标：已完成则写入（或覆盖）快照，未完成则删除已有快照。
+
+    Returns:
+        快照对象；目标未完成时返回 None
+    """
+    goal_data = LongTermGoalSerializer(goal, context={"defer_image_urls": True}).data
+    # 序列化时已按需重建进度，记录本次判断时的累计分钟数
+    LongTermGoal.objects.filter(pk=goal.pk).update(snapshot_checked_minutes=goal.progress_minutes)
+    goal.snapshot_checked_minutes = goal.progress_minutes
+    if not is_goal_completed(goal_data):
+        LongTermGoalSnapshot.objects.filter(goal=goal).delete()
+        return None
+
+    snapshot, _ = LongTermGoalSnapshot.objects.update_or_create(
+        goal=goal,
+        defaults={
+            "user_id": goal.user_id,
+            "schema_version": SNAPSHOT_SCHEMA_VERSION,
+            "payload": encode_payload(goal_data),
+            "goal_created_at": goal.created_at,
+        },
+    )
+    return snapshot
+
+
+def refresh_existing_snapshot(goal: LongTermGoal) -> None:
+    """目标元数据变化后刷新快照（目标尚无快照时不做任何事）。"""
+    if LongTermGoalSnapshot.objects.filter(goal=goal).exists():
+        refresh_goal_snapshot(goal)
+
+
+def discard_goal_snapshots(goal_ids: Iterable[int]) -> None:
+    """删除目标的快照并清除判断记录，之后按需重新判断是否完成。"""
+    goal_ids = list(goal_ids)
+    if not goal_ids:
+        return
+    LongTermGoalSnapshot.objects.filter(goal_id__in=goal_ids).delete()
+    LongTermGoal.objects.filter(pk__in=goal_ids).update(snapshot_checked_minutes=None)
+
+
+def discard_goal_snapshot(goal: LongTermGoal) -> None:
+    """目标重新开始计算进度时删除快照，之后按需重新判断是否完成。"""
+    discard_goal_snapshots([goal.pk])
+    goal.snapshot_checked_minutes = None
+
+
+def _custom_upload_ids(metadata) -> Set[int]:
+    """目标元数据中检查点自定义展示的上传ID。"""
+    if not isinstance(metadata, dict):
+        return set()
+    return {
+        value["upload_id"]
+        for key, value in metadata.items()
+        if key.startswith("checkpoint_") and isinstance(value, dict) and isinstance(value.get("upload_id"), int)
+    }
+
+
+def discard_snapshots_for_upload(upload: UserUpload, rebuilt_goals: Iterable[LongTermGoal] = ()) -> None:
+    """
+    上传被修改或删除后丢弃受影响目标的快照：
+
+    - 进度被重建的目标（检查点达成记录可能变化，进度也可能跌回未完成）
+    - 快照中以该上传作为检查点展示作品的目标（达成上传或自定义展示）
+    """
+    goal_ids = {goal.pk for goal in rebuilt_goals}
+    snapshot_goals = dict(
+        LongTermGoal.objects.filter(user_id=upload.user_id, snapshot__isnull=False).values_list("pk", "metadata")
+    )
+    if snapshot_goals:
+        goal_ids.update(
+            goal_id for goal_id, metadata in snapshot_goals.items() if upload.pk in _custom_upload_ids(metadata)
+        )
+        goal_ids.update(
+            LongTermGoalCheckpointCrossing.objects.filter(
+                upload_id=upload.pk, goal_id__in=list(snapshot_goals)
+            ).values_list("goal_id", flat=True)
+        )
+    discard_goal_snapshots(goal_ids)
+
+
+def ensure_goal_snapshots(user) -> None:
+    """
+    为用户尚无快照的目标判断是否已完成，已完成的写入快照。
+
+    上次判断后累计分钟数没有变化的未完成目标直接跳过。
+    """
+    goals = (
+        LongTermGoal.objects.filter(user=user, snapshot__isnull=True)
+        .exclude(snapshot_checked_minutes=F("progress_minutes"))
+        .order_by("pk")
+    )
+    for goal in goals:
+        try:
+            refresh_goal_snapshot(goal)
+        except Exception as e:
+            # 如果某个目标序列化失败，记录错误但继续处理其他目标
+            logger.error(
+                f"生成长期目标快照失败: goal_id={goal.id}, error={str(e)}",
+                exc_info=True,
+            )
+
+
+def render_goal_snapshot(snapshot: LongTermGoalSnapshot, request=None) -> Dict[str, Any]:
+    """解压快照并为检查点展示作品生成图片链接。"""
+    goal_data = decode_payload(snapshot.payload)
+    for checkpoint in goal_data.get("checkpoints") or []:
+        upload = checkpoint.get("upload")
+        if not isinstance(upload, dict) or DEFERRED_IMAGE_KEY not in upload:
+            continue
+        image_name = upload.pop(DEFERRED_IMAGE_KEY)
+        upload["image"] = build_upload_image_url(upload["id"], image_name, request) if image_name else None
+    return goal_data
@@ -0,0 +1,184 @@
+"""
+首页文案缓存：按上海日期缓存与用户无关的首页文案片段。
+
+提供：
+- 节日文案、历史文案的按天片段缓存
+- 通用文案加权抽样器：每个内容版本在进程内只构建一次
+- 内容版本号：文案新增、修改或删除时递增（见 core.signals），使旧片段自动失效
+- 跨零点时的缓存击穿保护（同一时刻只有一个请求回源数据库）
+"""
+from __future__ import annotations
+
+import logging
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from django.core.cache import cache
+
+from core.models import DailyHistoryMessage, EncouragementMessage, HolidayMessage
+from core.weighted_sampling import AliasSampler
+
+logger = logging.getLogger(__name__)
+
+# 缓存键前缀
+CACHE_PREFIX = "homepage"
+CONTENT_VERSION_KEY = f"{CACHE_PREFIX}:content_version"
+# 片段在当天结束后额外保留的秒数，避免零点前后的边界抖动
+FRAGMENT_GRACE_SECONDS = 60
+# 回源锁超时时间（秒），防止持锁请求异常退出后锁无法释放
+REBUILD_LOCK_TIMEOUT = 10
+# 未抢到锁的请求等待其他请求回源的最长时间（秒）及轮询间隔
+REBUILD_WAIT_SECONDS = 1.0
+REBUILD_POLL_INTERVAL = 0.05
+
+# 进程内的通用文案抽样器：(内容版本号, 抽样器或 None)
+_encouragement_sampler: Optional[Tuple[str, Optional[AliasSampler[str]]]] = None
+
+
+def get_content_version() -> str:
+    """
+    获取当前首页文案内容版本号。
+
+    版本号丢失（缓存被清空或淘汰）时生成一个新的随机版本号，
+    保证不会命中旧版本遗留的片段。
+    """
+    version = cache.get(CONTENT_VERSION_KEY)
+    if version is None:
+        cache.add(CONTENT_VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(CONTENT_VERSION_KEY)
+    return version
+
+
+def bump_content_version() -> str:
+    """
+    递增首页文案内容版本号，使所有已缓存的片段失效。
+
+    节日文案、历史文案、通用文案保存或删除时由信号调用（后台接口、Django admin、
+    shell 与 fixture 导入的修改都会触发）；通过 QuerySet.update 批量修改时需手动调用。
+
+    其他进程中的通用文案抽样器会在下次读取时发现版本变化并重建。
+    """
+    version = uuid.uuid4().hex
+    cache.set(CONTENT_VERSION_KEY, version, None)
+    logger.debug(f"Bumped homepage content version to {version}")
+    return version
+
+
+def _fragments_cache_key(today: date, version: str) -> str:
+    return f"{CACHE_PREFIX}:fragments:{today.isoformat()}:{version}"
+
+
+def _seconds_until_next_day(today: date) -> int:
+    """计算距离上海时区下一个零点的秒数（附加少量宽限时间）。"""
+    from core.views import SHANGHAI_TZ, get_now_with_mock
+
+    if SHANGHAI_TZ is None:
+        return 24 * 60 * 60
+    next_midnight = datetime.combine(today + timedelta(days=1), datetime.min.time()).replace(
+        tzinfo=SHANGHAI_TZ
+    )
+    remaining = int((next_midnight - get_now_with_mock()).total_seconds())
+    return max(remaining, 0) + FRAGMENT_GRACE_SECONDS
+
+
+def _build_daily_fragments(today: date) -> Dict[str, Any]:
+    """从数据库构建指定日期的首页文案片段（不使用缓存）。"""
+    holiday_message = HolidayMessage.get_for_date(today)
+    holiday_payload = None
+    if holiday_message:
+        holiday_payload = {
+            "headline": holiday_message.headline or None,
+            "text": holiday_message.text,
+        }
+
+    history_message = DailyHistoryMessage.get_for_date(today)
+    history_payload = None
+    if history_message:
+        history_payload = {
+            "headline": history_message.headline or None,
+            "text": history_message.text,
+        }
+
+    return {
+        "holiday": holiday_payload,
+        "history": history_payload,
+    }
+
+
+def get_daily_fragments(today: date) -> Dict[str, Any]:
+    """
+    获取指定日期的首页文案片段（带缓存）。
+
+    Args:
+        today: 上海时区的当天日期
+
+    Returns:
+        片段字典，包含：
+        - holiday: 节日文案（headline/text）或 None
+        - history: 历史文案（headline/text）或 None
+    """
+    version = get_content_version()
+    cache_key = _fragments_cache_key(today, version)
+
+    fragments = cache.get(cache_key)
+    if fragments is not None:
+        return fragments
+
+    # 缓存未命中（通常发生在零点跨天或内容更新后），只允许一个请求回源
+    lock_key = f"{cache_key}:lock"
+    if cache.add(lock_key, 1, REBUILD_LOCK_TIMEOUT):
+        try:
+            fragments = _build_daily_fragments(today)
+            cache.set(cache_key, fragments, _seconds_until_next_day(today))
+            return fragments
+        finally:
+            cache.delete(lock_key)
+
+    # 其他请求正在回源：短暂等待其结果
+    deadline = time.monotonic() + REBUILD_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(REBUILD_POLL_INTERVAL)
+        fragments = cache.get(cache_key)
+        if fragments is not None:
+            return fragments
+
+    # 等待超时：直接回源但不写缓存，避免与持锁请求互相覆盖
+    logger.warning(f"Timed out waiting for homepage fragments rebuild: {cache_key}")
+    return _build_daily_fragments(today)
+
+
+def _build_encouragement_sampler() -> Optional[AliasSampler[str]]:
+    """从数据库构建通用文案抽样器，没有启用的文案时返回 None。"""
+    rows = list(
+        EncouragementMessage.objects.filter(is_active=True)
+        .order_by("id")
+        .values_list("text", "weight")
+    )
+    if not rows:
+        return None
+    texts = [text for text, _ in rows]
+    # 确保类型正确（防止从数据库读取时是字符串），权重至少为 1
+    weights = [max(int(weight) if weight is not None else 1, 1) for _, weight in rows]
+    return AliasSampler(texts, weights)
+
+
+def get_encouragement_sampler() -> Optional[AliasSampler[str]]:
+    """
+    获取当前内容版本的通用文案抽样器。
+
+    抽样器保存在进程内存中，仅在内容版本号变化时重建，
+    因此常态下每次抽样既不查询数据库，也不分配临时列表。
+    """
+    global _encouragement_sampler
+
+    version = get_content_version()
+    current = _encouragement_sampler
+    if current is not None and current[0] == version:
+        return current[1]
+
+    sampler = _build_encouragement_sampler()
+    _encouragement_sampler = (version, sampler)
+    return sampler
+
@@ -0,0 +1,80 @@
+"""
+管理命令：回填上传记录的 local_date（中国时区日期）。
+
+UserUpload.save() 会自动维护 local_date，但通过 queryset.update()、
+bulk_create() 或直接 SQL 写入的记录不会经过 save()，可运行此命令修复。
+
+使用方法：
+    # 仅回填 local_date 为空的记录
+    python manage.py backfill_upload_local_date
+
+    # 重新计算所有记录，修正与 uploaded_at 不一致的 local_date
+    python manage.py backfill_upload_local_date --all
+"""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from core.models import UserUpload, to_shanghai_date
+
+
+class Command(BaseCommand):
+    help = "回填上传记录的 local_date（中国时区日期）"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="重新计算所有记录（默认只处理 local_date 为空的记录）",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="批处理大小（默认：1000）",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="只统计需要修正的记录数，不写入数据库",
+        )
+
+    def handle(self, *args, **options):
+        recompute_all = options.get("all", False)
+        batch_size = options.get("batch_size", 1000)
+        dry_run = options.get("dry_run", False)
+
+        queryset = UserUpload.objects.order_by("pk")
+        if not recompute_all:
+            queryset = queryset.filter(local_date__isnull=True)
+
+        self.stdout.write(f"待检查记录数: {queryset.count()}")
+
+        checked_count = 0
+        fixed_count = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                queryset.filter(pk__gt=last_pk).only("pk", "uploaded_at", "local_date")[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            checked_count += len(batch)
+
+            changed = []
+            for upload in batch:
+                expected = to_shanghai_date(upload.uploaded_at)
+                if upload.local_date != expected:
+                    upload.local_date = expected
+                    changed.append(upload)
+
+            if changed and not dry_run:
+                UserUpload.objects.bulk_update(changed, ["local_date"])
+            fixed_count += len(changed)
+            self.stdout.write(f"处理进度: 已检查 {checked_count} 条，需修正 {fixed_count} 条")
+
+        action = "需修正" if dry_run else "已修正"
+        self.stdout.write(
+            self.style.SUCCESS(f"\n完成！检查: {checked_count}, {action}: {fixed_count}")
+        )
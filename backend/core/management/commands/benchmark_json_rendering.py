@@ -0,0 +1,165 @@
+"""
+管理命令：在代表性响应数据上对比 DRF 默认 JSONRenderer 与 ORJSONRenderer 的渲染耗时，
+并统计 gzip/brotli 压缩后的大小与耗时。
+
+数据为固定随机种子生成的样本，结构与以下接口的响应一致：
+- uploads：上传列表
+- completed_long_term_goals：已完成的长期目标（含检查点）
+- monthly_report：月报（core/test_data 中的基准月报）
+- comprehensive_analysis：综合分析结果（大量浮点数组）
+
+使用方法：
+    python manage.py benchmark_json_rendering
+    python manage.py benchmark_json_rendering --iterations 200 --uploads 1000
+"""
+from __future__ import annotations
+
+import json
+import random
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+
+from config.middleware import ResponseCompressionMiddleware, brotli
+from config.renderers import ORJSONRenderer
+
+TEST_DATA_DIR = Path(__file__).resolve().parents[2] / "test_data"
+
+
+def _upload_payload(rng: random.Random, count: int) -> list:
+    start = datetime(2024, 1, 1, 8, 30, 15, 123456, tzinfo=dt_timezone.utc)
+    tags = ["速写", "草稿", "成图", "临摹", "oc", "练习", "水彩", "人体"]
+    uploads = []
+    for index in range(count):
+        uploaded_at = start + timedelta(minutes=rng.randint(0, 525600))
+        uploads.append(
+            {
+                "id": index + 1,
+                "title": f"第{index + 1}张练习作品",
+                "description": "今天画了一张风景速写，光影还需要多练习。" * rng.randint(0, 3),
+                "image": f"https://cdn.example.com/uploads/2024/{index:06d}.jpg?token={uuid.uuid4().hex}",
+                "thumbnail": f"https://cdn.example.com/uploads/2024/{index:06d}_thumb.webp",
+                "uploaded_at": uploaded_at,
+                "created_at": uploaded_at,
+                "updated_at": uploaded_at + timedelta(seconds=rng.randint(0, 3600)),
+                "local_date": uploaded_at.date(),
+                "self_rating": rng.randint(0, 100),
+                "mood": {"id": rng.randint(1, 8), "name": "平静"},
+                "tags": rng.sample(tags, rng.randint(0, 3)),
+                "duration_minutes": rng.randint(5, 300),
+            }
+        )
+    return uploads
+
+
+def _completed_goals_payload(rng: random.Random, count: int) -> list:
+    goals = []
+    for index in range(count):
+        started_at = datetime(2023, 1, 1, tzinfo=dt_timezone.utc) + timedelta(days=index * 10)
+        checkpoints = []
+        for number in range(1, 11):
+            checkpoints.append(
+                {
+                    "index": number,
+                    "target_hours": Decimal(number * 10),
+                    "reached_at": started_at + timedelta(days=number * 3, hours=rng.randint(0, 23)),
+                    "upload": {
+                        "id": rng.randint(1, 10000),
+                        "title": "检查点作品",
+                        "image": f"https://cdn.example.com/uploads/{uuid.uuid4().hex}.jpg",
+                    },
+                    "completion_note": "坚持就是胜利",
+                }
+            )
+        goals.append(
+            {
+                "id": index + 1,
+                "title": f"{index + 1}00小时目标",
+                "target_hours": 100,
+                "spent_hours": round(rng.uniform(100, 120), 2),
+                "started_at": started_at,
+                "completed_at": started_at + timedelta(days=rng.randint(30, 300)),
+                "checkpoints": checkpoints,
+            }
+        )
+    return goals
+
+
+def _monthly_report_payload() -> dict:
+    reports = {}
+    for path in sorted(TEST_DATA_DIR.glob("monthly_report_*.json")):
+        reports[path.stem] = json.loads(path.read_text(encoding="utf-8"))
+    return reports
+
+
+def _comprehensive_analysis_payload(rng: random.Random) -> dict:
+    return {
+        "uploads_analyzed": 500,
+        "generated_at": timezone.now(),
+        "color_histograms": [[rng.random() for _ in range(256)] for _ in range(30)],
+        "saturation": {"mean": rng.random(), "values": [rng.random() for _ in range(2000)]},
+        "composition": [
+            {"upload_id": index, "grid": [[rng.random() for _ in range(3)] for _ in range(3)]}
+            for index in range(300)
+        ],
+        "summary": "整体色调偏暖，构图以三分法为主。",
+    }
+
+
+class Command(BaseCommand):
+    help = "对比 DRF JSONRenderer 与 ORJSONRenderer 的渲染耗时及压缩效果"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=50, help="每个样本的渲染次数（默认 50）")
+        parser.add_argument("--uploads", type=int, default=500, help="上传列表样本的条数（默认 500）")
+        parser.add_argument("--seed", type=int, default=46, help="随机种子（默认 46）")
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        rng = random.Random(options["seed"])
+        fixtures = {
+            "uploads": _upload_payload(rng, options["uploads"]),
+            "completed_long_term_goals": _completed_goals_payload(rng, 50),
+            "monthly_report": _monthly_report_payload(),
+            "comprehensive_analysis": _comprehensive_analysis_payload(rng),
+        }
+
+        drf_renderer = JSONRenderer()
+        orjson_renderer = ORJSONRenderer()
+        if brotli is None:
+            self.stdout.write(self.style.WARNING("未安装 brotli，跳过 brotli 压缩统计"))
+
+        for name, data in fixtures.items():
+            drf_output = drf_renderer.render(data)
+            orjson_output = orjson_renderer.render(data)
+            if json.loads(drf_output) != json.loads(orjson_output):
+                self.stdout.write(self.style.ERROR(f"{name}: 两种渲染器的输出不一致"))
+
+            drf_ms = timeit.timeit(lambda: drf_renderer.render(data), number=iterations) / iterations * 1000
+            orjson_ms = timeit.timeit(lambda: orjson_renderer.render(data), number=iterations) / iterations * 1000
+            self.stdout.write(
+                f"{name}: {len(orjson_output) / 1024:.1f} KB, "
+                f"JSONRenderer {drf_ms:.2f} ms, ORJSONRenderer {orjson_ms:.2f} ms "
+                f"({drf_ms / orjson_ms:.1f}x)"
+            )
+
+            gzip_ms = timeit.timeit(lambda: compress_string(orjson_output), number=iterations) / iterations * 1000
+            gzip_size = len(compress_string(orjson_output))
+            line = f"  gzip: {gzip_size / 1024:.1f} KB ({gzip_size / len(orjson_output):.0%}), {gzip_ms:.2f} ms"
+            if brotli is not None:
+                compress = lambda: brotli.compress(  # noqa: E731
+                    orjson_output, mode=brotli.MODE_TEXT, quality=ResponseCompressionMiddleware.brotli_quality
+                )
+                br_ms = timeit.timeit(compress, number=iterations) / iterations * 1000
+                br_size = len(compress())
+                line += f"; brotli: {br_size / 1024:.1f} KB ({br_size / len(orjson_output):.0%}), {br_ms:.2f} ms"
+            self.stdout.write(line)
+
+        self.stdout.write(self.style.SUCCESS("\n完成！"))
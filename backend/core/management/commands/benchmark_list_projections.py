@@ -0,0 +1,151 @@
+"""
+管理命令：对比只读列表的序列化器与 .values() 投影（core.projections）的耗时。
+
+在一个最终回滚的事务中为临时用户批量生成上传、标签、打卡与短期目标，
+对每种列表分别用序列化器与投影构建响应并计时，同时校验两者输出一致。
+
+使用方法：
+    python manage.py benchmark_list_projections
+    python manage.py benchmark_list_projections --rows 1000 10000 --iterations 5
+"""
+from __future__ import annotations
+
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+from django.utils import timezone
+from rest_framework.request import Request
+
+from config.renderers import ORJSONRenderer
+from core.models import AuthToken, DailyCheckIn, ShortTermGoal, Tag, UserUpload, to_shanghai_date
+from core.projections import CheckInProjection, ShortTermGoalProjection, TagProjection, UploadProjection
+from core.serializers import (
+    ShortTermGoalSerializer,
+    TagSerializer,
+    TestAccountCheckInSerializer,
+    UserUploadSerializer,
+)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "对比只读列表的序列化器与 .values() 投影的耗时（1k/10k 行）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000], help="每种列表的行数（默认 1000 10000）")
+        parser.add_argument("--iterations", type=int, default=3, help="每项测量的重复次数，取最短耗时（默认 3）")
+
+    def handle(self, *args, **options):
+        for rows in options["rows"]:
+            try:
+                with transaction.atomic():
+                    self._benchmark(rows, options["iterations"])
+                    raise _Rollback
+            except _Rollback:
+                pass
+        self.stdout.write(self.style.SUCCESS("\n完成！测试数据已回滚"))
+
+    def _seed(self, rows: int):
+        user = get_user_model().objects.create_user(
+            username=f"benchmark-{uuid.uuid4().hex[:12]}", password=uuid.uuid4().hex
+        )
+        now = timezone.now()
+        tags = Tag.objects.bulk_create(
+            Tag(user=user, name=f"标签{index}", display_order=index % 20) for index in range(rows)
+        )
+        uploads = UserUpload.objects.bulk_create(
+            UserUpload(
+                user=user,
+                title=f"作品{index}",
+                notes="练习",
+                uploaded_at=now - timedelta(minutes=index),
+                local_date=to_shanghai_date(now - timedelta(minutes=index)),
+                self_rating=index % 100,
+                duration_minutes=30,
+                image=f"uploads/benchmark/{index}.webp",
+                thumbnail=f"uploads/benchmark/{index}_thumb.webp" if index % 2 else None,
+            )
+            for index in range(rows)
+        )
+        through = UserUpload.tags.through
+        through.objects.bulk_create(
+            through(userupload_id=upload.pk, tag_id=tags[(index * 7 + offset) % len(tags)].pk)
+            for index, upload in enumerate(uploads)
+            for offset in range(2)
+        )
+        DailyCheckIn.objects.bulk_create(
+            DailyCheckIn(user=user, date=date(2000, 1, 1) + timedelta(days=index), source="app")
+            for index in range(rows)
+        )
+        schedule = [{"day_index": 0, "tasks": [{"task_id": "t1", "title": "速写", "subtitle": ""}]}]
+        ShortTermGoal.objects.bulk_create(
+            ShortTermGoal(
+                user=user,
+                title=f"挑战{index}",
+                duration_days=7,
+                plan_type=ShortTermGoal.PLAN_TYPE_SAME,
+                schedule=schedule,
+                status=ShortTermGoal.STATUS_ACTIVE,
+            )
+            for index in range(rows)
+        )
+        return user
+
+    def _measure(self, build, iterations: int):
+        best = None
+        output = None
+        for _ in range(iterations):
+            started = time.perf_counter()
+            output = build()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best * 1000, output
+
+    def _benchmark(self, rows: int, iterations: int):
+        user = self._seed(rows)
+        request = Request(RequestFactory().get("/api/uploads/"))
+        request.user = user
+        request.auth = AuthToken.objects.get(key=AuthToken.issue_for_user(user))
+        context = {"request": request}
+
+        cases = [
+            (
+                "uploads",
+                lambda: UserUpload.objects.filter(user=user)
+                .select_related("mood")
+                .prefetch_related("tags")
+                .order_by("-uploaded_at", "-id"),
+                UserUploadSerializer,
+                UploadProjection,
+            ),
+            ("tags", lambda: Tag.objects.filter(user=user), TagSerializer, TagProjection),
+            ("checkins", lambda: DailyCheckIn.objects.filter(user=user), TestAccountCheckInSerializer, CheckInProjection),
+            (
+                "short_term_goals",
+                lambda: ShortTermGoal.objects.filter(user=user).order_by("-created_at", "-id"),
+                ShortTermGoalSerializer,
+                ShortTermGoalProjection,
+            ),
+        ]
+
+        self.stdout.write(f"\n{rows} 行：")
+        renderer = ORJSONRenderer()
+        for name, queryset, serializer_class, projection_class in cases:
+            serializer_ms, expected = self._measure(
+                lambda: serializer_class(queryset(), many=True, context=context).data, iterations
+            )
+            projection_ms, actual = self._measure(lambda: projection_class(request).project(queryset()), iterations)
+            if renderer.render(actual) != renderer.render(expected):
+                self.stdout.write(self.style.ERROR(f"  {name}: 投影输出与序列化器不一致"))
+            self.stdout.write(
+                f"  {name}: 序列化器 {serializer_ms:.1f} ms, 投影 {projection_ms:.1f} ms "
+                f"({serializer_ms / projection_ms:.1f}x)"
+            )
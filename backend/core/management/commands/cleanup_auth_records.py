@@ -6,16 +6,21 @@
 - Windows: 使用任务计划程序
 
 对于高并发场景（每日1万+用户），建议每小时执行一次。
+
+记录按主键分批删除（core.retention），每批之间休眠，避免大范围 DELETE 锁表；
+LoginAttempt / EmailVerification 已按月分区（见 partition_auth_tables）时，
+整月过期的分区直接删除，并补齐后续月份的分区。
 """
 
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
-from core.models import EmailVerification, LoginAttempt
+from core import retention
+from core.models import AuthToken, EmailVerification, LoginAttempt
 
 
 class Command(BaseCommand):
-    help = "清理过期的EmailVerification和LoginAttempt记录，防止数据库表无限增长"
+    help = "分批清理过期的EmailVerification、LoginAttempt和AuthToken记录，防止数据库表无限增长"
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -30,6 +35,36 @@ class Command(BaseCommand):
             default=30,
             help="删除多少天前的登录尝试记录（默认：30天）",
         )
+        parser.add_argument(
+            "--token-days",
+            type=int,
+            default=7,
+            help="删除过期多少天以上的登录令牌（默认：7天）",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=retention.DEFAULT_BATCH_SIZE,
+            help=f"每批删除的记录数（默认：{retention.DEFAULT_BATCH_SIZE}）",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=retention.DEFAULT_SLEEP,
+            help=f"批次之间的休眠秒数（默认：{retention.DEFAULT_SLEEP}）",
+        )
+        parser.add_argument(
+            "--max-batches",
+            type=int,
+            default=None,
+            help="每张表最多删除的批数，超出部分留到下次执行（默认：不限制）",
+        )
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=2,
+            help="已分区的表提前创建多少个月的分区（默认：2）",
+        )
         parser.add_argument(
             "--dry-run",
             action="store_true",
@@ -40,46 +75,56 @@ class Command(BaseCommand):
         now = timezone.now()
         verification_days = options["verification_days"]
         login_attempt_days = options["login_attempt_days"]
-        dry_run = options["dry_run"]
+        token_days = options["token_days"]
 
         # 计算截止日期
         verification_cutoff = now - timedelta(days=verification_days)
         login_cutoff = now - timedelta(days=login_attempt_days)
+        token_cutoff = now - timedelta(days=token_days)
 
-        # 统计要删除的记录数
-        verification_count = EmailVerification.objects.filter(
-            created_at__lt=verification_cutoff
-        ).count()
-
-        login_attempt_count = LoginAttempt.objects.filter(
-            created_at__lt=login_cutoff
-        ).count()
+        targets = [
+            (
+                f"验证码记录（{verification_days}天前）",
+                EmailVerification.objects.filter(created_at__lt=verification_cutoff),
+                verification_cutoff,
+            ),
+            (
+                f"登录尝试记录（{login_attempt_days}天前）",
+                LoginAttempt.objects.filter(created_at__lt=login_cutoff),
+                login_cutoff,
+            ),
+            (
+                f"登录令牌（过期{token_days}天以上）",
+                AuthToken.objects.filter(expires_at__lt=token_cutoff),
+                None,
+            ),
+        ]
 
-        if dry_run:
-            self.stdout.write(
-                self.style.WARNING(
-                    f"[DRY RUN] 将删除："
-                    f"\n  - {verification_count} 条验证码记录（{verification_days}天前）"
-                    f"\n  - {login_attempt_count} 条登录尝试记录（{login_attempt_days}天前）"
-                )
-            )
+        if options["dry_run"]:
+            lines = "".join(f"\n  - {queryset.count()} 条{label}" for label, queryset, _ in targets)
+            self.stdout.write(self.style.WARNING(f"[DRY RUN] 将删除：{lines}"))
             return
 
-        # 删除过期的验证码记录
-        deleted_verifications = EmailVerification.objects.filter(
-            created_at__lt=verification_cutoff
-        ).delete()
-
-        # 删除过期的登录尝试记录
-        deleted_attempts = LoginAttempt.objects.filter(
-            created_at__lt=login_cutoff
-        ).delete()
-
-        self.stdout.write(
-            self.style.SUCCESS(
-                f"清理完成："
-                f"\n  - 删除 {deleted_verifications[0]} 条验证码记录（{verification_days}天前）"
-                f"\n  - 删除 {deleted_attempts[0]} 条登录尝试记录（{login_attempt_days}天前）"
+        lines = []
+        for label, queryset, cutoff in targets:
+            result = retention.purge(
+                queryset,
+                cutoff=cutoff,
+                batch_size=options["batch_size"],
+                sleep=options["sleep"],
+                max_batches=options["max_batches"],
             )
-        )
+            line = (
+                f"\n  - 删除 {result['deleted']} 条{label}，"
+                f"耗时 {result['seconds']:.1f} 秒（{result['rows_per_second']:.0f} 条/秒）"
+            )
+            if result["partitions"]:
+                line += f"，删除分区 {', '.join(result['partitions'])}"
+            lines.append(line)
+
+        for model in retention.PARTITIONED_MODELS:
+            created = retention.ensure_future_partitions(model, options["months_ahead"], now.date())
+            if created:
+                lines.append(f"\n  - {model._meta.db_table} 新建分区 {', '.join(created)}")
 
+        self.stdout.write(self.style.SUCCESS(f"清理完成：{''.join(lines)}"))
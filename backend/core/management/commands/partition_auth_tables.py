@@ -0,0 +1,51 @@
+"""
+将 LoginAttempt / EmailVerification 表改为按 created_at 月份 RANGE 分区（仅 MySQL/MariaDB）。
+
+启用后 cleanup_auth_records 会直接删除整月过期的分区，并提前创建后续月份的分区。
+启用会重建整张表并将主键改为 (id, created_at)，请在低峰期执行并提前备份。
+
+使用方法：
+    python manage.py partition_auth_tables              # 查看分区状态
+    python manage.py partition_auth_tables --print-sql  # 仅输出启用分区的 SQL
+    python manage.py partition_auth_tables --enable
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core import retention
+
+
+class Command(BaseCommand):
+    help = "将LoginAttempt和EmailVerification表改为按月分区（仅MySQL/MariaDB）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--enable", action="store_true", help="对尚未分区的表启用按月分区")
+        parser.add_argument("--print-sql", action="store_true", help="仅输出启用分区的 SQL，不执行")
+        parser.add_argument("--months-ahead", type=int, default=2, help="提前创建多少个月的分区（默认：2）")
+
+    def handle(self, *args, **options):
+        if not retention.is_mysql():
+            self.stdout.write(self.style.WARNING("当前数据库不是 MySQL/MariaDB，按月分区不可用，清理时使用分批删除"))
+            return
+
+        today = timezone.now().date()
+        for model in retention.PARTITIONED_MODELS:
+            table = model._meta.db_table
+            partitions = retention.get_partitions(model)
+            if partitions:
+                months = sorted(month for month, _ in partitions.values())
+                self.stdout.write(
+                    f"{table}: 已分区，{len(partitions)} 个月份分区（{months[0]:%Y-%m} 至 {months[-1]:%Y-%m}）"
+                )
+                continue
+
+            if options["print_sql"]:
+                last_month = retention.last_partition_month(today, options["months_ahead"])
+                self.stdout.write(retention.build_partition_sql(table, today, last_month) + ";")
+                self.stdout.write(self.style.WARNING("  （起始月份以当前月份示意，--enable 时使用表中最早记录的月份）"))
+            elif options["enable"]:
+                self.stdout.write(f"{table}: 正在启用按月分区...")
+                retention.enable_partitioning(model, options["months_ahead"], today)
+                self.stdout.write(self.style.SUCCESS(f"{table}: 已启用按月分区"))
+            else:
+                self.stdout.write(f"{table}: 未分区（使用 --enable 启用）")
@@ -0,0 +1,84 @@
+"""
+管理命令：从头重建长期目标进度统计，并与已保存的增量统计对比。
+
+长期目标的累计时长与检查点达成记录在上传新增、修改、删除时增量维护
+（见 core.goal_progress）。通过 queryset.update()、bulk_create() 或直接 SQL
+修改上传记录时不会触发维护，可运行此命令检查并修复。
+
+使用方法：
+    # 检查并修复所有长期目标
+    python manage.py reconcile_long_term_goal_progress
+
+    # 只报告差异，不写入数据库
+    python manage.py reconcile_long_term_goal_progress --dry-run
+
+    # 只处理指定目标
+    python manage.py reconcile_long_term_goal_progress --goal-id 12
+"""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from core.goal_progress import compute_goal_progress, get_stored_progress, rebuild_goal_progress
+from core.models import LongTermGoal
+
+
+class Command(BaseCommand):
+    help = "重建长期目标进度统计并报告与已保存统计的差异"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--goal-id",
+            type=int,
+            help="只处理指定的长期目标",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="只报告差异，不写入数据库",
+        )
+
+    def handle(self, *args, **options):
+        goal_id = options.get("goal_id")
+        dry_run = options.get("dry_run", False)
+
+        goals = LongTermGoal.objects.order_by("pk")
+        if goal_id:
+            goals = goals.filter(pk=goal_id)
+
+        checked_count = 0
+        mismatch_count = 0
+        for goal in goals.iterator():
+            checked_count += 1
+            expected = compute_goal_progress(goal)
+            if goal.progress_synced_at is not None and get_stored_progress(goal) == expected:
+                continue
+
+            mismatch_count += 1
+            self._report_mismatch(goal, expected)
+            if not dry_run:
+                rebuild_goal_progress(goal)
+
+        action = "发现差异" if dry_run else "已修复"
+        self.stdout.write(
+            self.style.SUCCESS(f"\n完成！检查: {checked_count}, {action}: {mismatch_count}")
+        )
+
+    def _report_mismatch(self, goal: LongTermGoal, expected) -> None:
+        if goal.progress_synced_at is None:
+            self.stdout.write(f"目标 {goal.pk}: 尚未建立进度统计")
+            return
+
+        stored_minutes, stored_crossings = get_stored_progress(goal)
+        expected_minutes, expected_crossings = expected
+        if stored_minutes != expected_minutes:
+            self.stdout.write(
+                f"目标 {goal.pk}: 累计分钟数 已保存 {stored_minutes}，应为 {expected_minutes}"
+            )
+        stored_map = {index: (upload_id, minutes) for index, upload_id, minutes in stored_crossings}
+        expected_map = {index: (upload_id, minutes) for index, upload_id, minutes in expected_crossings}
+        for index in sorted(stored_map.keys() | expected_map.keys()):
+            if stored_map.get(index) != expected_map.get(index):
+                self.stdout.write(
+                    f"目标 {goal.pk}: 检查点 {index} 已保存 {stored_map.get(index)}，应为 {expected_map.get(index)}"
+                )
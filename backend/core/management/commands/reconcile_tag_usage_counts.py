@@ -0,0 +1,51 @@
+"""
+管理命令：从画作标签关联重新统计标签使用次数，并与已保存的 usage_count 对比。
+
+标签使用次数在标签关联变化、画作删除时增量维护（见 core.tag_usage）。通过
+bulk_create 或直接 SQL 修改关联表时不会触发维护，可运行此命令检查并修复。
+
+使用方法：
+    # 检查并修复所有标签
+    python manage.py reconcile_tag_usage_counts
+
+    # 只报告差异，不写入数据库
+    python manage.py reconcile_tag_usage_counts --dry-run
+"""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from core.models import Tag
+from core.tag_usage import compute_usage_counts
+
+
+class Command(BaseCommand):
+    help = "重新统计标签使用次数并报告与已保存次数的差异"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="只报告差异，不写入数据库",
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options.get("dry_run", False)
+
+        expected = compute_usage_counts()
+        checked_count = 0
+        mismatch_count = 0
+        for tag_id, name, stored in Tag.objects.order_by("pk").values_list("id", "name", "usage_count").iterator():
+            checked_count += 1
+            count = expected.get(tag_id, 0)
+            if stored == count:
+                continue
+            mismatch_count += 1
+            self.stdout.write(f"标签 {tag_id}（{name}）: 已保存 {stored}，应为 {count}")
+            if not dry_run:
+                Tag.objects.filter(pk=tag_id).update(usage_count=count)
+
+        action = "发现差异" if dry_run else "已修复"
+        self.stdout.write(
+            self.style.SUCCESS(f"\n完成！检查: {checked_count}, {action}: {mismatch_count}")
+        )
@@ -0,0 +1,63 @@
+"""
+管理命令：从上传记录重新统计每月上传数量，并与已保存的计数对比。
+
+每月上传计数在上传新增、删除时增量维护（见 core.upload_quota）。通过
+queryset.update()、bulk_create() 或直接 SQL 修改上传记录时不会触发维护，
+可运行此命令检查并修复。
+
+使用方法：
+    # 检查并修复所有用户
+    python manage.py reconcile_upload_month_counters
+
+    # 只报告差异，不写入数据库
+    python manage.py reconcile_upload_month_counters --dry-run
+
+    # 只处理指定用户
+    python manage.py reconcile_upload_month_counters --user-id 12
+"""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from core.upload_quota import apply_counts, count_uploads_by_month, get_stored_counts
+
+
+class Command(BaseCommand):
+    help = "重新统计每月上传数量并报告与已保存计数的差异"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user-id",
+            type=int,
+            help="只处理指定的用户",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="只报告差异，不写入数据库",
+        )
+
+    def handle(self, *args, **options):
+        user_id = options.get("user_id")
+        dry_run = options.get("dry_run", False)
+
+        user_ids = [user_id] if user_id else None
+        expected = count_uploads_by_month(user_ids)
+        stored = get_stored_counts(user_ids)
+
+        mismatches = sorted(
+            key for key in expected.keys() | stored.keys() if expected.get(key, 0) != stored.get(key, 0)
+        )
+        for mismatched_user_id, year_month in mismatches:
+            self.stdout.write(
+                f"用户 {mismatched_user_id} {year_month}: "
+                f"已保存 {stored.get((mismatched_user_id, year_month), 0)}，"
+                f"应为 {expected.get((mismatched_user_id, year_month), 0)}"
+            )
+        if mismatches and not dry_run:
+            apply_counts(expected, stored)
+
+        action = "发现差异" if dry_run else "已修复"
+        self.stdout.write(
+            self.style.SUCCESS(f"\n完成！检查: {len(expected.keys() | stored.keys())}, {action}: {len(mismatches)}")
+        )
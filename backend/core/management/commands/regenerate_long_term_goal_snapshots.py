@@ -0,0 +1,70 @@
+"""
+管理命令：重新生成已完成长期目标的归档快照。
+
+快照格式（SNAPSHOT_SCHEMA_VERSION）或目标序列化逻辑变化后运行此命令。
+重新生成时目标若已不满足完成条件，其快照会被删除。
+
+使用方法：
+    # 只重新生成旧版本格式的快照
+    python manage.py regenerate_long_term_goal_snapshots
+
+    # 重新生成所有快照
+    python manage.py regenerate_long_term_goal_snapshots --all
+
+    # 只统计需要重新生成的快照数
+    python manage.py regenerate_long_term_goal_snapshots --dry-run
+"""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from core.goal_snapshots import SNAPSHOT_SCHEMA_VERSION, refresh_goal_snapshot
+from core.models import LongTermGoal
+
+
+class Command(BaseCommand):
+    help = "重新生成已完成长期目标的归档快照"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="重新生成所有快照（默认只处理旧版本格式的快照）",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="只统计需要重新生成的快照数，不写入数据库",
+        )
+
+    def handle(self, *args, **options):
+        regenerate_all = options.get("all", False)
+        dry_run = options.get("dry_run", False)
+
+        goals = LongTermGoal.objects.filter(snapshot__isnull=False).order_by("pk")
+        if not regenerate_all:
+            goals = goals.filter(snapshot__schema_version__lt=SNAPSHOT_SCHEMA_VERSION)
+
+        total = goals.count()
+        self.stdout.write(f"待重新生成快照数: {total}")
+        if dry_run:
+            return
+
+        regenerated_count = 0
+        removed_count = 0
+        error_count = 0
+        for goal in goals.iterator():
+            try:
+                if refresh_goal_snapshot(goal) is None:
+                    removed_count += 1
+                else:
+                    regenerated_count += 1
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f"目标 {goal.pk} 重新生成失败: {e}"))
+                error_count += 1
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"\n完成！重新生成: {regenerated_count}, 已不满足完成条件而删除: {removed_count}, 失败: {error_count}"
+            )
+        )
@@ -6,15 +6,20 @@
 """
 from __future__ import annotations
 
+from datetime import timedelta
+
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.utils import timezone
 
 from core.models import UserStats
-from core.user_stats_cache import get_or_update_for_user, update_for_user
+from core.user_stats_cache import update_for_users
 
 User = get_user_model()
 
+# 统计数据超过该时长未更新时视为过期（与 get_or_update_for_user 一致）
+STALE_AFTER = timedelta(minutes=5)
+
 
 class Command(BaseCommand):
     help = "批量更新用户统计数据"
@@ -53,33 +58,53 @@ class Command(BaseCommand):
         self.stdout.write(f"用户数: {total_users}")
 
         updated_count = 0
-        created_count = 0
-
-        for user in users.iterator(chunk_size=batch_size):
-            try:
-                if force:
-                    stats = update_for_user(user)
-                else:
-                    stats = get_or_update_for_user(user)
-                
-                if stats.id is None or (hasattr(stats, '_state') and stats._state.adding):
-                    created_count += 1
-                else:
-                    updated_count += 1
-                
-                if (updated_count + created_count) % 10 == 0:
-                    self.stdout.write(
-                        f"处理进度: {updated_count + created_count}/{total_users} 用户"
-                    )
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f"更新用户 {user.id} 统计数据失败: {e}")
-                )
+        skipped_count = 0
+        processed_count = 0
+
+        batch = []
+        for user in users.order_by("pk").iterator(chunk_size=batch_size):
+            batch.append(user)
+            if len(batch) >= batch_size:
+                updated, skipped = self._update_batch(batch, force)
+                updated_count += updated
+                skipped_count += skipped
+                processed_count += len(batch)
+                batch = []
+                self.stdout.write(f"处理进度: {processed_count}/{total_users} 用户")
+        if batch:
+            updated, skipped = self._update_batch(batch, force)
+            updated_count += updated
+            skipped_count += skipped
+            processed_count += len(batch)
 
         self.stdout.write("\n" + "=" * 50)
         self.stdout.write("更新完成！统计信息：")
         self.stdout.write(f"  更新记录数: {updated_count}")
-        self.stdout.write(f"  新建记录数: {created_count}")
-        self.stdout.write(f"  总计: {updated_count + created_count}")
+        self.stdout.write(f"  跳过（最近已更新）: {skipped_count}")
+        self.stdout.write(f"  总计: {processed_count}")
         self.stdout.write("=" * 50)
 
+    def _update_batch(self, users, force: bool) -> tuple[int, int]:
+        """批量更新一批用户，返回 (更新数, 跳过数)。"""
+        if force:
+            stale_users = users
+        else:
+            threshold = timezone.now() - STALE_AFTER
+            fresh_ids = set(
+                UserStats.objects.filter(
+                    user_id__in=[user.id for user in users],
+                    last_updated__gte=threshold,
+                ).values_list("user_id", flat=True)
+            )
+            stale_users = [user for user in users if user.id not in fresh_ids]
+
+        try:
+            update_for_users(stale_users)
+        except Exception as e:
+            self.stdout.write(
+                self.style.ERROR(
+                    f"更新用户 {users[0].id}-{users[-1].id} 统计数据失败: {e}"
+                )
+            )
+            return 0, len(users) - len(stale_users)
+        return len(stale_users), len(users) - len(stale_users)
@@ -0,0 +1,55 @@
+from zoneinfo import ZoneInfo
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+BATCH_SIZE = 1000
+SHANGHAI_TZ = ZoneInfo("Asia/Shanghai")
+
+
+def backfill_local_date(apps, schema_editor):
+    """按中国时区为已有上传记录回填 local_date。"""
+    UserUpload = apps.get_model("core", "UserUpload")
+    queryset = UserUpload.objects.filter(local_date__isnull=True).order_by("pk")
+    last_pk = 0
+    while True:
+        batch = list(
+            queryset.filter(pk__gt=last_pk).only("pk", "uploaded_at")[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for upload in batch:
+            uploaded_at = upload.uploaded_at
+            if timezone.is_naive(uploaded_at):
+                uploaded_at = timezone.make_aware(uploaded_at)
+            upload.local_date = uploaded_at.astimezone(SHANGHAI_TZ).date()
+        UserUpload.objects.bulk_update(batch, ["local_date"])
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0093_fix_longtermgoal_auto_increment"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userupload",
+            name="local_date",
+            field=models.DateField(
+                blank=True,
+                editable=False,
+                help_text="uploaded_at 对应的中国时区日期，保存时自动维护，用于按天统计。",
+                null=True,
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userupload",
+            index=models.Index(
+                fields=["user", "local_date"], name="core_userup_user_id_b012bc_idx"
+            ),
+        ),
+        migrations.RunPython(backfill_local_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,76 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0094_userupload_local_date"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReportGenerationRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year", models.PositiveIntegerField(help_text="年份")),
+                ("month", models.PositiveIntegerField(help_text="月份（1-12）")),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("running", "生成中"),
+                            ("completed", "已完成"),
+                            ("failed", "失败"),
+                        ],
+                        default="running",
+                        help_text="运行状态",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "task_id",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="触发本次运行的 Celery 任务ID",
+                        max_length=255,
+                    ),
+                ),
+                (
+                    "total_users",
+                    models.PositiveIntegerField(default=0, help_text="需要生成月报的用户数"),
+                ),
+                (
+                    "users_done",
+                    models.PositiveIntegerField(default=0, help_text="已处理完成的用户数"),
+                ),
+                (
+                    "users_failed",
+                    models.PositiveIntegerField(default=0, help_text="生成失败的用户数"),
+                ),
+                (
+                    "error_message",
+                    models.TextField(blank=True, default="", help_text="错误信息（如果失败）"),
+                ),
+                ("started_at", models.DateTimeField(help_text="开始时间")),
+                (
+                    "finished_at",
+                    models.DateTimeField(blank=True, help_text="结束时间", null=True),
+                ),
+            ],
+            options={
+                "verbose_name": "月报生成运行记录",
+                "verbose_name_plural": "月报生成运行记录",
+                "ordering": ["-year", "-month"],
+                "unique_together": {("year", "month")},
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0095_reportgenerationrun"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="longtermgoal",
+            name="progress_minutes",
+            field=models.PositiveIntegerField(
+                default=0, help_text="计划开始以来累计的创作分钟数。"
+            ),
+        ),
+        migrations.AddField(
+            model_name="longtermgoal",
+            name="progress_synced_at",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="进度最近一次全量重建的时间；为空表示尚未建立增量统计。",
+                null=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="LongTermGoalCheckpointCrossing",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "index",
+                    models.PositiveSmallIntegerField(help_text="检查点序号（从1开始）。"),
+                ),
+                (
+                    "cumulative_minutes",
+                    models.PositiveIntegerField(help_text="计入该上传后的累计分钟数。"),
+                ),
+                (
+                    "goal",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="checkpoint_crossings",
+                        to="core.longtermgoal",
+                    ),
+                ),
+                (
+                    "upload",
+                    models.ForeignKey(
+                        help_text="使累计时长达到阈值的上传记录。",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="checkpoint_crossings",
+                        to="core.userupload",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "长期目标检查点达成记录",
+                "verbose_name_plural": "长期目标检查点达成记录",
+                "ordering": ["goal", "index"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("goal", "index"), name="core_lt_goal_crossing_unique"
+                    )
+                ],
+            },
+        ),
+    ]
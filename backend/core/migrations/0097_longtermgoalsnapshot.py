@@ -0,0 +1,65 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0096_longtermgoal_progress"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LongTermGoalSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "schema_version",
+                    models.PositiveSmallIntegerField(
+                        help_text="快照格式版本，格式变化后可通过管理命令重新生成。"
+                    ),
+                ),
+                ("payload", models.BinaryField(help_text="zlib 压缩的目标序列化 JSON。")),
+                ("goal_created_at", models.DateTimeField(help_text="目标创建时间（用于排序）。")),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "goal",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="snapshot",
+                        to="core.longtermgoal",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="long_term_goal_snapshots",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "长期目标归档快照",
+                "verbose_name_plural": "长期目标归档快照",
+                "ordering": ["-goal_created_at", "-goal_id"],
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-goal_created_at"],
+                        name="core_lt_goal_snapshot_idx",
+                    )
+                ],
+            },
+        ),
+    ]
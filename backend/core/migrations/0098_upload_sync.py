@@ -0,0 +1,95 @@
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0097_longtermgoalsnapshot"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userupload",
+            name="sync_seq",
+            field=models.BigIntegerField(
+                default=0,
+                editable=False,
+                help_text="最近一次变更时分配的用户变更序号，用于客户端增量同步。",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="userupload",
+            index=models.Index(fields=["user", "sync_seq"], name="core_userup_user_id_ac9d99_idx"),
+        ),
+        migrations.CreateModel(
+            name="UploadSyncState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("last_seq", models.BigIntegerField(default=0, help_text="已分配的最大变更序号。")),
+                (
+                    "purged_through_seq",
+                    models.BigIntegerField(
+                        default=0,
+                        help_text="已清理的删除记录的最大序号，早于此序号的同步令牌需要全量同步。",
+                    ),
+                ),
+                (
+                    "user",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="upload_sync_state",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "上传同步状态",
+                "verbose_name_plural": "上传同步状态",
+            },
+        ),
+        migrations.CreateModel(
+            name="UploadTombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("upload_id", models.BigIntegerField(help_text="已删除的上传记录ID。")),
+                ("sync_seq", models.BigIntegerField(help_text="删除时分配的变更序号。")),
+                ("deleted_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="upload_tombstones",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "上传删除记录",
+                "verbose_name_plural": "上传删除记录",
+                "indexes": [
+                    models.Index(fields=["user", "sync_seq"], name="core_upload_user_id_ab2343_idx"),
+                    models.Index(fields=["deleted_at"], name="core_upload_deleted_09e357_idx"),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,76 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_counters(apps, schema_editor):
+    """按已有上传记录初始化计数（与 core.upload_quota.count_uploads_by_month 一致）。"""
+    from django.db.models import Count
+    from django.db.models.functions import TruncMonth
+    from zoneinfo import ZoneInfo
+
+    UserUpload = apps.get_model("core", "UserUpload")
+    UserUploadMonthCounter = apps.get_model("core", "UserUploadMonthCounter")
+    rows = (
+        UserUpload.objects.annotate(month=TruncMonth("created_at", tzinfo=ZoneInfo("Asia/Shanghai")))
+        .values("user_id", "month")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    UserUploadMonthCounter.objects.bulk_create(
+        [
+            UserUploadMonthCounter(
+                user_id=row["user_id"],
+                year_month=f"{row['month']:%Y-%m}",
+                count=row["count"],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0098_upload_sync"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserUploadMonthCounter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("year_month", models.CharField(help_text="中国时区月份，格式 YYYY-MM。", max_length=7)),
+                ("count", models.PositiveIntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="upload_month_counters",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "每月上传计数",
+                "verbose_name_plural": "每月上传计数",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("user", "year_month"),
+                        name="core_upload_month_counter_unique",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
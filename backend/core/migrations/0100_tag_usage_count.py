@@ -0,0 +1,39 @@
+from django.db import migrations, models
+
+
+def populate_usage_counts(apps, schema_editor):
+    """按已有的画作标签关联初始化使用次数。"""
+    from django.db.models import Count
+
+    Tag = apps.get_model("core", "Tag")
+    counts = (
+        Tag.objects.annotate(count=Count("uploads"))
+        .filter(count__gt=0)
+        .values_list("id", "count")
+    )
+    for tag_id, count in counts.iterator():
+        Tag.objects.filter(pk=tag_id).update(usage_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0099_useruploadmonthcounter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="tag",
+            name="usage_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="使用此标签的画作数量，标签关联变化时自动维护。",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="tag",
+            index=models.Index(fields=["user", "-usage_count"], name="core_tag_user_id_0736da_idx"),
+        ),
+        migrations.RunPython(populate_usage_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0100_tag_usage_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="longtermgoal",
+            name="snapshot_checked_minutes",
+            field=models.PositiveIntegerField(
+                blank=True,
+                null=True,
+                help_text="最近一次判断是否完成（见 core.goal_snapshots）时的累计分钟数；为空表示需要重新判断。",
+            ),
+        ),
+    ]
@@ -3,12 +3,28 @@ from __future__ import annotations
 import hashlib
 import secrets
 import uuid
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
 
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 from django.utils import timezone
 
+# 业务日期统一按中国时区划分
+SHANGHAI_TZ = ZoneInfo("Asia/Shanghai")
+
+
+def to_shanghai_date(value: datetime | None) -> date | None:
+    """将时间转换为中国时区（Asia/Shanghai）的日期，朴素时间按当前时区处理。"""
+    if value is None:
+        return None
+    if timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value.astimezone(SHANGHAI_TZ).date()
+
+
 # 动态导入TOS存储，避免循环导入
 def get_default_storage():
     """获取默认存储后端"""
@@ -320,6 +336,11 @@ class Tag(models.Model):
         default=100,
         help_text="显示顺序，数值越小越靠前。",
     )
+    usage_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text="使用此标签的画作数量，标签关联变化时自动维护。",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -327,6 +348,7 @@ class Tag(models.Model):
         indexes = [
             models.Index(fields=["user", "-created_at"]),
             models.Index(fields=["is_preset", "is_hidden"]),
+            models.Index(fields=["user", "-usage_count"]),
         ]
         constraints = [
             models.UniqueConstraint(
@@ -391,6 +413,12 @@ class UserUpload(models.Model):
         help_text="作品标题，用于前端展示。",
     )
     uploaded_at = models.DateTimeField(default=timezone.now)
+    local_date = models.DateField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="uploaded_at 对应的中国时区日期，保存时自动维护，用于按天统计。",
+    )
     self_rating = models.PositiveSmallIntegerField(
         null=True,
         blank=True,
@@ -445,17 +473,133 @@ class UserUpload(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    sync_seq = models.BigIntegerField(
+        default=0,
+        editable=False,
+        help_text="最近一次变更时分配的用户变更序号，用于客户端增量同步。",
+    )
 
     class Meta:
         indexes = [
             models.Index(fields=["user", "-uploaded_at"]),
             models.Index(fields=["uploaded_at"]),
+            models.Index(fields=["user", "local_date"]),
+            models.Index(fields=["user", "sync_seq"]),
         ]
         ordering = ["-uploaded_at"]
 
     def __str__(self):
         return f"{self.user} @ {self.uploaded_at:%Y-%m-%d %H:%M}"
 
+    def save(self, *args, **kwargs):
+        # 根据 uploaded_at 同步维护中国时区日期
+        self.local_date = to_shanghai_date(self.uploaded_at)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            extra_fields = {"sync_seq"}
+            if "uploaded_at" in update_fields:
+                extra_fields.add("local_date")
+            kwargs["update_fields"] = {*update_fields, *extra_fields}
+        # 分配变更序号与写入在同一事务中：序号行锁持续到提交，保证同一用户按序号顺序提交
+        with transaction.atomic():
+            self.sync_seq = UploadSyncState.allocate(self.user_id)
+            super().save(*args, **kwargs)
+
+
+class UserUploadMonthCounter(models.Model):
+    """
+    用户每月上传数量计数（按 created_at 的中国时区月份），用于上传限额检查。
+
+    上传新增、删除时在同一事务中增减（见 core.upload_quota），
+    可运行 reconcile_upload_month_counters 管理命令校正。
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="upload_month_counters",
+    )
+    year_month = models.CharField(max_length=7, help_text="中国时区月份，格式 YYYY-MM。")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "year_month"],
+                name="core_upload_month_counter_unique",
+            ),
+        ]
+        verbose_name = "每月上传计数"
+        verbose_name_plural = "每月上传计数"
+
+    def __str__(self) -> str:
+        return f"{self.user_id} {self.year_month}: {self.count}"
+
+
+class UploadSyncState(models.Model):
+    """
+    用户上传记录的同步状态：单调递增的变更序号（新增、修改、删除上传时递增）。
+
+    客户端以最近一次同步得到的序号作为同步令牌，只拉取之后的变更（见 core.upload_sync）。
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="upload_sync_state",
+    )
+    last_seq = models.BigIntegerField(default=0, help_text="已分配的最大变更序号。")
+    purged_through_seq = models.BigIntegerField(
+        default=0,
+        help_text="已清理的删除记录的最大序号，早于此序号的同步令牌需要全量同步。",
+    )
+
+    class Meta:
+        verbose_name = "上传同步状态"
+        verbose_name_plural = "上传同步状态"
+
+    def __str__(self) -> str:
+        return f"{self.user_id} @ {self.last_seq}"
+
+    @classmethod
+    def allocate(cls, user_id: int) -> int:
+        """
+        为用户分配下一个变更序号。
+
+        必须在调用方的事务中调用：序号行在事务提交前保持锁定，
+        并发写入同一用户时按序号顺序提交，客户端不会跳过较小序号的变更。
+        """
+        with transaction.atomic():
+            if not cls.objects.filter(user_id=user_id).update(last_seq=F("last_seq") + 1):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(user_id=user_id, last_seq=1)
+                except IntegrityError:
+                    # 并发情况下记录已被创建
+                    cls.objects.filter(user_id=user_id).update(last_seq=F("last_seq") + 1)
+            return cls.objects.filter(user_id=user_id).values_list("last_seq", flat=True).get()
+
+
+class UploadTombstone(models.Model):
+    """已删除上传的墓碑记录，保留一段时间供客户端增量同步删除操作。"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="upload_tombstones",
+    )
+    upload_id = models.BigIntegerField(help_text="已删除的上传记录ID。")
+    sync_seq = models.BigIntegerField(help_text="删除时分配的变更序号。")
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "sync_seq"]),
+            models.Index(fields=["deleted_at"]),
+        ]
+        verbose_name = "上传删除记录"
+        verbose_name_plural = "上传删除记录"
+
+    def __str__(self) -> str:
+        return f"{self.user_id} - {self.upload_id} @ {self.sync_seq}"
+
 
 class LongTermGoal(models.Model):
     GOAL_TYPE_10000_HOURS = "10000-hours"
@@ -525,6 +669,21 @@ class LongTermGoal(models.Model):
         default=False,
         help_text="是否已归档（用于保留历史完成记录，而不是物理删除）。",
     )
+    # 进度增量统计（由 core.goal_progress 维护）
+    progress_minutes = models.PositiveIntegerField(
+        default=0,
+        help_text="计划开始以来累计的创作分钟数。",
+    )
+    progress_synced_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="进度最近一次全量重建的时间；为空表示尚未建立增量统计。",
+    )
+    snapshot_checked_minutes = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        help_text="最近一次判断是否完成（见 core.goal_snapshots）时的累计分钟数；为空表示需要重新判断。",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -545,6 +704,83 @@ class LongTermGoal(models.Model):
         return f"{self.title} ({self.user})"
 
 
+class LongTermGoalCheckpointCrossing(models.Model):
+    """
+    长期目标检查点达成记录：累计时长首次达到检查点阈值时对应的上传。
+    
+    由 core.goal_progress 在上传新增、修改、删除时维护，
+    读取目标时无需再扫描全部上传记录。
+    """
+    goal = models.ForeignKey(
+        LongTermGoal,
+        on_delete=models.CASCADE,
+        related_name="checkpoint_crossings",
+    )
+    index = models.PositiveSmallIntegerField(help_text="检查点序号（从1开始）。")
+    upload = models.ForeignKey(
+        UserUpload,
+        on_delete=models.CASCADE,
+        related_name="checkpoint_crossings",
+        help_text="使累计时长达到阈值的上传记录。",
+    )
+    cumulative_minutes = models.PositiveIntegerField(
+        help_text="计入该上传后的累计分钟数。",
+    )
+
+    class Meta:
+        ordering = ["goal", "index"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["goal", "index"],
+                name="core_lt_goal_crossing_unique",
+            ),
+        ]
+        verbose_name = "长期目标检查点达成记录"
+        verbose_name_plural = "长期目标检查点达成记录"
+
+    def __str__(self) -> str:
+        return f"{self.goal_id} - CheckPoint {self.index:02d}"
+
+
+class LongTermGoalSnapshot(models.Model):
+    """
+    已完成长期目标的归档快照：目标完成时冻结的序列化结果（zlib 压缩的 JSON）。
+    
+    图片链接依赖请求与令牌，快照中只保存文件名，读取时再生成（见 core.goal_snapshots）。
+    """
+    goal = models.OneToOneField(
+        LongTermGoal,
+        on_delete=models.CASCADE,
+        related_name="snapshot",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="long_term_goal_snapshots",
+    )
+    schema_version = models.PositiveSmallIntegerField(
+        help_text="快照格式版本，格式变化后可通过管理命令重新生成。",
+    )
+    payload = models.BinaryField(help_text="zlib 压缩的目标序列化 JSON。")
+    goal_created_at = models.DateTimeField(help_text="目标创建时间（用于排序）。")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-goal_created_at", "-goal_id"]
+        indexes = [
+            models.Index(
+                fields=["user", "-goal_created_at"],
+                name="core_lt_goal_snapshot_idx",
+            ),
+        ]
+        verbose_name = "长期目标归档快照"
+        verbose_name_plural = "长期目标归档快照"
+
+    def __str__(self) -> str:
+        return f"{self.goal_id} - v{self.schema_version}"
+
+
 class ShortTermGoal(models.Model):
     PLAN_TYPE_SAME = "same"
     PLAN_TYPE_DIFFERENT = "different"
@@ -2194,6 +2430,54 @@ class MonthlyReport(models.Model):
         return f"{self.user.email} - {self.year}年{self.month}月月报"
 
 
+class ReportGenerationRun(models.Model):
+    """
+    月报批量生成运行记录：每个月份只有一条，用于跟踪定时任务进度并保证幂等。
+    
+    定时任务重复触发时，已在运行或已完成的月份会被直接跳过。
+    """
+    STATUS_RUNNING = "running"
+    STATUS_COMPLETED = "completed"
+    STATUS_FAILED = "failed"
+    
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, "生成中"),
+        (STATUS_COMPLETED, "已完成"),
+        (STATUS_FAILED, "失败"),
+    ]
+    
+    year = models.PositiveIntegerField(help_text="年份")
+    month = models.PositiveIntegerField(help_text="月份（1-12）")
+    status = models.CharField(
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_RUNNING,
+        help_text="运行状态",
+    )
+    task_id = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        help_text="触发本次运行的 Celery 任务ID",
+    )
+    total_users = models.PositiveIntegerField(default=0, help_text="需要生成月报的用户数")
+    users_done = models.PositiveIntegerField(default=0, help_text="已处理完成的用户数")
+    users_failed = models.PositiveIntegerField(default=0, help_text="生成失败的用户数")
+    error_message = models.TextField(blank=True, default="", help_text="错误信息（如果失败）")
+    
+    started_at = models.DateTimeField(help_text="开始时间")
+    finished_at = models.DateTimeField(null=True, blank=True, help_text="结束时间")
+    
+    class Meta:
+        unique_together = [["year", "month"]]
+        ordering = ["-year", "-month"]
+        verbose_name = "月报生成运行记录"
+        verbose_name_plural = "月报生成运行记录"
+    
+    def __str__(self) -> str:
+        return f"{self.year}年{self.month}月 - {self.status}"
+
+
 class UserStats(models.Model):
     """
     用户统计物化表：定期聚合用户统计数据，避免实时计算。
@@ -0,0 +1,100 @@
+"""
+按需月报生成任务：月报不存在时在后台生成，接口立即返回任务ID。
+
+提供：
+- 入队：同一用户同一月份同时只有一个生成任务（缓存锁去重）
+- 任务状态：保存在缓存中，供进度接口查询
+"""
+from __future__ import annotations
+
+import logging
+import uuid
+from typing import Any, Dict, Optional
+
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# 缓存键前缀
+CACHE_PREFIX = "monthly_report_job"
+# 任务状态在缓存中的保留时间（秒）
+JOB_TTL = 60 * 60
+# 去重锁超时时间（秒），防止任务丢失后锁无法释放
+LOCK_TIMEOUT = 10 * 60
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_SUCCESS = "success"
+STATUS_FAILURE = "failure"
+
+
+def _job_key(job_id: str) -> str:
+    return f"{CACHE_PREFIX}:job:{job_id}"
+
+
+def _lock_key(user_id: int, year: int, month: int) -> str:
+    return f"{CACHE_PREFIX}:lock:{user_id}:{year}-{month:02d}"
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """获取任务状态，不存在或已过期时返回 None。"""
+    return cache.get(_job_key(job_id))
+
+
+def set_job_status(job_id: str, status: str, error: str | None = None) -> None:
+    """更新任务状态（任务记录已过期时不再写入）。"""
+    job = get_job(job_id)
+    if job is None:
+        return
+    job["status"] = status
+    job["error"] = error
+    cache.set(_job_key(job_id), job, JOB_TTL)
+
+
+def release_lock(user_id: int, year: int, month: int) -> None:
+    """释放去重锁，之后的请求可以重新入队。"""
+    cache.delete(_lock_key(user_id, year, month))
+
+
+def enqueue_report_generation(user, year: int, month: int) -> str:
+    """
+    为用户的指定月份入队月报生成任务。
+
+    同一用户同一月份已有进行中的任务时，直接返回该任务的ID。
+
+    Returns:
+        任务ID（同时也是 Celery 任务ID）
+    """
+    lock_key = _lock_key(user.id, year, month)
+    job_id = uuid.uuid4().hex
+    if not cache.add(lock_key, job_id, LOCK_TIMEOUT):
+        existing_job_id = cache.get(lock_key)
+        if existing_job_id and get_job(existing_job_id) is not None:
+            return existing_job_id
+        # 锁恰好过期或任务记录已丢失：接管锁重新入队
+        cache.set(lock_key, job_id, LOCK_TIMEOUT)
+
+    cache.set(
+        _job_key(job_id),
+        {
+            "user_id": user.id,
+            "year": year,
+            "month": month,
+            "status": STATUS_PENDING,
+            "error": None,
+        },
+        JOB_TTL,
+    )
+
+    from core.tasks import generate_monthly_report_for_user_task
+
+    try:
+        generate_monthly_report_for_user_task.apply_async(
+            args=(user.id, year, month), task_id=job_id
+        )
+    except Exception as e:
+        logger.exception(f"入队月报生成任务失败: user={user.id}, {year}-{month:02d}")
+        set_job_status(job_id, STATUS_FAILURE, str(e))
+        release_lock(user.id, year, month)
+        raise
+    return job_id
@@ -0,0 +1,402 @@
+"""
+月报统计引擎：用分组 SQL 聚合生成月报数据。
+
+所有按"天"和"小时"划分的统计都使用中国时区（Asia/Shanghai）：
+按天统计读取 UserUpload.local_date，按小时统计在数据库中做时区转换。
+无论当月上传数量多少，生成一份月报只执行固定次数的查询。
+"""
+from __future__ import annotations
+
+import logging
+import time
+from calendar import monthrange
+from datetime import date, timedelta
+from typing import Any, Iterable
+
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.db.models import Count, Min, Q, Sum
+from django.db.models.functions import Coalesce, ExtractHour
+
+from core import calendar_analytics
+from core.db_utils import conflict_target
+from core.models import SHANGHAI_TZ, MonthlyReport, MonthlyReportTemplate, UserUpload
+
+logger = logging.getLogger(__name__)
+
+# 标签统计只保留使用次数最多的前 N 个
+TOP_TAG_LIMIT = 10
+
+# 批量写入月报时，冲突（已存在）记录需要更新的字段
+REPORT_UPDATE_FIELDS = [
+    "total_uploads",
+    "total_hours",
+    "avg_hours_per_upload",
+    "avg_rating",
+    "most_upload_day_date",
+    "most_upload_day_count",
+    "current_streak",
+    "longest_streak",
+    "time_distribution",
+    "weekly_distribution",
+    "tag_stats",
+    "heatmap_calendar",
+    "upload_ids",
+    "report_texts",
+    "updated_at",
+]
+
+
+def get_month_bounds(year: int, month: int) -> tuple[date, date]:
+    """返回指定月份的第一天和最后一天。"""
+    return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+
+
+def get_previous_month(today: date) -> tuple[int, int]:
+    """返回 today 所在月份的上一个月 (year, month)。"""
+    if today.month == 1:
+        return today.year - 1, 12
+    return today.year, today.month - 1
+
+
+def get_report_user_ids(year: int, month: int) -> list[int]:
+    """返回指定月份有上传记录的活跃用户 ID（按 ID 升序）。"""
+    start_date, end_date = get_month_bounds(year, month)
+    uploader_ids = (
+        UserUpload.objects.filter(local_date__gte=start_date, local_date__lte=end_date)
+        .order_by()
+        .values_list("user_id", flat=True)
+        .distinct()
+    )
+    return list(
+        get_user_model()
+        .objects.filter(id__in=uploader_ids, is_active=True)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+
+
+def generate_report_data(user, year: int, month: int) -> dict[str, Any]:
+    """生成指定用户指定月份的月报数据（字段与 MonthlyReport 模型一致）。"""
+    start_date, end_date = get_month_bounds(year, month)
+    monthly_uploads = UserUpload.objects.filter(
+        user=user,
+        local_date__gte=start_date,
+        local_date__lte=end_date,
+    ).order_by()
+
+    # 基础统计数据
+    rated = Q(self_rating__isnull=False, self_rating__gt=0)
+    totals = monthly_uploads.aggregate(
+        total_uploads=Count("id"),
+        total_minutes=Coalesce(Sum("duration_minutes"), 0),
+        rating_sum=Sum("self_rating", filter=rated),
+        rating_count=Count("id", filter=rated),
+    )
+    total_uploads = totals["total_uploads"]
+    total_hours = totals["total_minutes"] / 60.0
+    avg_hours_per_upload = total_uploads > 0 and (total_hours / total_uploads) or 0.0
+    avg_rating = (
+        totals["rating_sum"] / totals["rating_count"] if totals["rating_count"] else 0.0
+    )
+
+    # 按天统计：最多上传日期、周内分布、日历热力图都由此推导
+    day_rows = list(
+        monthly_uploads.values("local_date")
+        .annotate(count=Count("id"), minutes=Coalesce(Sum("duration_minutes"), 0))
+        .order_by("local_date")
+        .values_list("local_date", "count", "minutes")
+    )
+
+    # 最多上传日期（并列时取较早的日期）
+    most_upload_day_date = None
+    most_upload_day_count = 0
+    for day, count, _ in day_rows:
+        if count > most_upload_day_count:
+            most_upload_day_date, most_upload_day_count = day, count
+
+    # 连续打卡天数（需要所有历史上传日期）
+    all_upload_dates = calendar_analytics.to_days(
+        UserUpload.objects.filter(user=user, local_date__isnull=False)
+        .order_by("local_date")
+        .values_list("local_date", flat=True)
+        .distinct()
+    )
+    streaks = calculate_streaks(all_upload_dates)
+
+    # 时段分布（24小时，中国时区）
+    hour_counts = dict(
+        monthly_uploads.annotate(hour=ExtractHour("uploaded_at", tzinfo=SHANGHAI_TZ))
+        .values("hour")
+        .annotate(count=Count("id"))
+        .values_list("hour", "count")
+    )
+    total_for_hour_dist = sum(hour_counts.values())
+    time_distribution = [
+        {
+            "hour": hour,
+            "count": hour_counts.get(hour, 0),
+            "percentage": (
+                (hour_counts.get(hour, 0) / total_for_hour_dist * 100)
+                if total_for_hour_dist > 0
+                else 0
+            ),
+        }
+        for hour in range(24)
+    ]
+
+    # 周内分布（0=周一，6=周日）
+    weekday_counts = [0] * 7
+    weekday_minutes = [0] * 7
+    for day, count, minutes in day_rows:
+        weekday_counts[day.weekday()] += count
+        weekday_minutes[day.weekday()] += minutes
+    weekly_distribution = [
+        {
+            "weekday": weekday,
+            "count": weekday_counts[weekday],
+            "minutes": weekday_minutes[weekday],
+        }
+        for weekday in range(7)
+    ]
+
+    # 标签统计
+    tag_stats = _build_tag_stats(monthly_uploads)
+
+    # 日历热力图
+    day_counts = calendar_analytics.calendar_histogram(
+        calendar_analytics.to_days(day for day, _, _ in day_rows),
+        start_date,
+        end_date,
+        weights=np.array([count for _, count, _ in day_rows], dtype=np.int64),
+    ).tolist()
+    max_count = max(day_counts, default=0)
+    heatmap_calendar = [
+        {
+            "day": index + 1,
+            "count": count,
+            "weekday": (start_date + timedelta(days=index)).weekday(),  # 0=周一，6=周日
+            "opacity": count / max_count if max_count > 0 else 0,
+        }
+        for index, count in enumerate(day_counts)
+    ]
+
+    # 上传记录ID列表（按上传时间排序）
+    upload_ids = list(
+        monthly_uploads.order_by("uploaded_at", "id").values_list("id", flat=True)
+    )
+
+    # 生成月报文案（匹配模板）
+    report_texts = generate_report_texts(
+        total_uploads, total_hours, avg_hours_per_upload, avg_rating
+    )
+
+    return {
+        "total_uploads": total_uploads,
+        "total_hours": total_hours,
+        "avg_hours_per_upload": avg_hours_per_upload,
+        "avg_rating": avg_rating,
+        "most_upload_day_date": most_upload_day_date,
+        "most_upload_day_count": most_upload_day_count,
+        "current_streak": streaks["current"],
+        "longest_streak": streaks["longest"],
+        "time_distribution": time_distribution,
+        "weekly_distribution": weekly_distribution,
+        "tag_stats": tag_stats,
+        "heatmap_calendar": heatmap_calendar,
+        "upload_ids": upload_ids,
+        "report_texts": report_texts,
+    }
+
+
+def _build_tag_stats(monthly_uploads) -> list[dict[str, Any]]:
+    """
+    按标签分组聚合使用次数、时长和评分。
+
+    同名标签（如预设标签与自定义标签重名）合并统计；次数相同时按首次出现顺序排列，
+    即最早使用该标签的上传时间，同一上传内再按标签的显示顺序。
+    """
+    rated = Q(self_rating__isnull=False, self_rating__gt=0)
+    rows = (
+        monthly_uploads.filter(tags__isnull=False)
+        .values("tags__id", "tags__name", "tags__display_order")
+        .annotate(
+            count=Count("id"),
+            minutes=Coalesce(Sum("duration_minutes"), 0),
+            rating_sum=Sum("self_rating", filter=rated),
+            rating_count=Count("id", filter=rated),
+            first_used_at=Min("uploaded_at"),
+        )
+    )
+
+    merged: dict[str, dict[str, Any]] = {}
+    for row in rows:
+        name = row["tags__name"]
+        first_seen = (row["first_used_at"], row["tags__display_order"], name)
+        entry = merged.get(name)
+        if entry is None:
+            merged[name] = {
+                "count": row["count"],
+                "minutes": row["minutes"],
+                "rating_sum": row["rating_sum"] or 0,
+                "rating_count": row["rating_count"],
+                "first_seen": first_seen,
+            }
+            continue
+        entry["count"] += row["count"]
+        entry["minutes"] += row["minutes"]
+        entry["rating_sum"] += row["rating_sum"] or 0
+        entry["rating_count"] += row["rating_count"]
+        entry["first_seen"] = min(entry["first_seen"], first_seen)
+
+    total_for_tags = sum(entry["count"] for entry in merged.values())
+    ranked = sorted(merged.items(), key=lambda item: (-item[1]["count"], item[1]["first_seen"]))
+
+    tag_stats = []
+    for tag_name, entry in ranked[:TOP_TAG_LIMIT]:
+        count = entry["count"]
+        tag_stats.append(
+            {
+                "tag": tag_name,
+                "count": count,
+                "percentage": (count / total_for_tags * 100) if total_for_tags > 0 else 0,
+                "avgDurationMinutes": entry["minutes"] / count if count > 0 else 0,
+                "avgRating": (
+                    entry["rating_sum"] / entry["rating_count"] if entry["rating_count"] else 0
+                ),
+            }
+        )
+    return tag_stats
+
+
+def calculate_streaks(upload_dates: Iterable[date] | np.ndarray) -> dict[str, int]:
+    """
+    计算连续打卡天数。
+
+    当前连续天数 = 1 + 截至昨天的连续天数（今天是否上传不影响结果，与历史版本一致）。
+    """
+    from core.views import get_today_shanghai
+
+    days = (
+        upload_dates
+        if isinstance(upload_dates, np.ndarray)
+        else calendar_analytics.to_days(upload_dates)
+    )
+    if len(days) == 0:
+        return {"current": 0, "longest": 0}
+
+    yesterday = get_today_shanghai() - timedelta(days=1)
+    return {
+        "current": 1 + calendar_analytics.streak_ending_at(days, yesterday),
+        "longest": calendar_analytics.longest_streak(days),
+    }
+
+
+def generate_report_texts(
+    total_uploads: int,
+    total_hours: float,
+    avg_hours: float,
+    avg_rating: float,
+) -> dict[str, str]:
+    """生成月报文案（匹配模板）"""
+    report_texts = {}
+
+    # 获取所有活跃的模板
+    templates = MonthlyReportTemplate.objects.filter(is_active=True).order_by(
+        "section", "priority"
+    )
+
+    # 按部分分组
+    sections = {}
+    for template in templates:
+        if template.section not in sections:
+            sections[template.section] = []
+        sections[template.section].append(template)
+
+    # 为每个部分匹配模板并生成文案
+    for section, section_templates in sections.items():
+        matched_template = None
+        for template in section_templates:
+            if template.matches_conditions(
+                total_uploads=total_uploads,
+                total_hours=total_hours,
+                avg_hours=avg_hours,
+                avg_rating=avg_rating,
+            ):
+                matched_template = template
+                break
+
+        if matched_template:
+            # 渲染模板文案
+            text = matched_template.text_template
+            text = text.replace("{count}", str(total_uploads))
+            text = text.replace("{hours}", f"{total_hours:.1f}")
+            text = text.replace("{avg_hours}", f"{avg_hours:.1f}")
+            text = text.replace("{rating}", f"{avg_rating:.1f}")
+            report_texts[section] = text
+
+    return report_texts
+
+
+def generate_reports_for_users(
+    user_ids: Iterable[int], year: int, month: int, *, force: bool = False
+) -> dict[str, Any]:
+    """
+    为一批用户生成月报并批量写入。
+
+    - 非强制模式下跳过已存在的 (user, year, month) 月报，中断后重跑即可续跑；
+      写入时忽略并发运行抢先写入的记录，不会覆盖
+    - 强制模式下重新生成并覆盖已存在的月报
+
+    Returns:
+        {"generated": 写入数, "skipped": 跳过数, "failed": 失败数, "elapsed": 耗时秒数}
+    """
+    started = time.monotonic()
+    user_ids = list(dict.fromkeys(user_ids))
+
+    skipped_ids: set[int] = set()
+    if not force:
+        skipped_ids = set(
+            MonthlyReport.objects.filter(
+                user_id__in=user_ids, year=year, month=month
+            ).values_list("user_id", flat=True)
+        )
+    pending_ids = [user_id for user_id in user_ids if user_id not in skipped_ids]
+
+    reports = []
+    failed = 0
+    for user in get_user_model().objects.filter(id__in=pending_ids).order_by("id"):
+        try:
+            report_data = generate_report_data(user, year, month)
+        except Exception:
+            logger.exception(f"生成月报失败: user={user.id}, {year}-{month:02d}")
+            failed += 1
+            continue
+        reports.append(MonthlyReport(user=user, year=year, month=month, **report_data))
+
+    if reports:
+        if force:
+            MonthlyReport.objects.bulk_create(
+                reports,
+                update_conflicts=True,
+                unique_fields=conflict_target(["user", "year", "month"]),
+                update_fields=REPORT_UPDATE_FIELDS,
+            )
+        else:
+            MonthlyReport.objects.bulk_create(reports, ignore_conflicts=True)
+
+    return {
+        "generated": len(reports),
+        "skipped": len(skipped_ids),
+        "failed": failed,
+        "elapsed": time.monotonic() - started,
+    }
+
+
+def init_report_worker() -> None:
+    """进程池子进程初始化：确保 Django 已加载，并丢弃从父进程继承的数据库连接。"""
+    import django
+    from django.db import connections
+
+    django.setup()
+    connections.close_all()
@@ -0,0 +1,241 @@
+"""
+只读列表的轻量序列化：直接从 .values() 行构建响应字典，不为每一行实例化模型与序列化器。
+
+每个投影类的输出与对应的序列化器逐字段一致（键的顺序也相同）：
+- MoodProjection -> MoodSerializer
+- TagProjection -> TagSerializer
+- CheckInProjection -> TestAccountCheckInSerializer
+- ShortTermGoalProjection -> ShortTermGoalSerializer
+- UploadProjection -> UserUploadSerializer
+
+字段定义为 (输出键, .values() 字段, 格式化器)：
+- 格式化器为 None 时原样输出（数据库返回的 int/str/bool 与序列化器输出相同）
+- 日期时间字段复用 DRF 字段的 to_representation，保持时区与格式设置；使用默认的 ISO 8601
+  格式时，日期时间在构建投影时取一次当前时区后直接格式化，输出与 DateTimeField 相同
+- .values() 字段为 None 时调用 get_<输出键>(row) 计算，例如图片链接
+值为 None 时与序列化器一样输出 None，不调用格式化器。
+
+修改序列化器的输出字段时需同步修改对应的投影类（见 ProjectionParityTests）。
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+from core.models import Tag, UserUpload
+
+DATETIME = serializers.DateTimeField()
+DATE = serializers.DateField()
+
+
+class Projection:
+    fields: Sequence[Tuple[str, Optional[str], Optional[serializers.Field]]] = ()
+    # 计算字段额外需要读取的 .values() 字段
+    extra_values: Sequence[str] = ()
+
+    def __init__(self, request=None, **context):
+        self.request = request
+        self.context = context
+        self._columns = [self._compile(key, source, formatter) for key, source, formatter in self.fields]
+
+    def _compile(self, key: str, source: Optional[str], formatter) -> Tuple[str, Callable[[dict], Any]]:
+        if source is None:
+            return key, getattr(self, f"get_{key}")
+        if formatter is None:
+            return key, lambda row: row[source]
+        if formatter is DATETIME and settings.USE_TZ and api_settings.DATETIME_FORMAT.lower() == ISO_8601:
+            return key, self._iso_datetime_column(source)
+        to_representation = formatter.to_representation
+
+        def column(row):
+            value = row[source]
+            return None if value is None else to_representation(value)
+
+        return key, column
+
+    @staticmethod
+    def _iso_datetime_column(source: str) -> Callable[[dict], Any]:
+        # 等价于 DateTimeField.to_representation：转换到当前时区，UTC 偏移输出为 Z
+        current_timezone = timezone.get_current_timezone()
+
+        def column(row):
+            value = row[source]
+            if value is None:
+                return None
+            if value.tzinfo is None:
+                return DATETIME.to_representation(value)
+            text = value.astimezone(current_timezone).isoformat()
+            return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+        return column
+
+    def get_values_fields(self) -> List[str]:
+        values_fields = [source for _, source, _ in self.fields if source is not None]
+        values_fields.extend(name for name in self.extra_values if name not in values_fields)
+        return values_fields
+
+    def prepare(self, rows: List[dict]) -> None:
+        """构建输出前的批量准备（例如一次查询多对多关联），默认不做处理。"""
+
+    def to_representation(self, row: dict) -> Dict[str, Any]:
+        return {key: column(row) for key, column in self._columns}
+
+    def values(self, queryset: QuerySet) -> QuerySet:
+        """将模型查询集转换为投影需要的 .values() 查询集（保留过滤与排序，去掉 select_related/prefetch_related）。"""
+        return queryset.select_related(None).prefetch_related(None).values(*self.get_values_fields())
+
+    def project(self, queryset: QuerySet | Iterable[dict]) -> List[Dict[str, Any]]:
+        """构建列表响应，参数可以是模型查询集，也可以是 values() 取出的行（例如分页后的一页）。"""
+        if isinstance(queryset, QuerySet) and not queryset._fields:
+            queryset = self.values(queryset)
+        rows = list(queryset)
+        self.prepare(rows)
+        return [self.to_representation(row) for row in rows]
+
+
+class MoodProjection(Projection):
+    fields = (
+        ("id", "id", None),
+        ("name", "name", None),
+        ("display_order", "display_order", None),
+        ("is_active", "is_active", None),
+        ("created_at", "created_at", DATETIME),
+        ("updated_at", "updated_at", DATETIME),
+    )
+
+
+class TagProjection(Projection):
+    fields = (
+        ("id", "id", None),
+        ("name", "name", None),
+        ("is_preset", "is_preset", None),
+        ("is_hidden", "is_hidden", None),
+        ("display_order", "display_order", None),
+        ("usage_count", "usage_count", None),
+        ("created_at", "created_at", DATETIME),
+        ("updated_at", "updated_at", DATETIME),
+    )
+
+
+class CheckInProjection(Projection):
+    fields = (
+        ("id", "id", None),
+        ("date", "date", DATE),
+        ("checked_at", "checked_at", DATETIME),
+        ("source", "source", None),
+    )
+
+
+class ShortTermGoalProjection(Projection):
+    fields = (
+        ("id", "id", None),
+        ("title", "title", None),
+        ("duration_days", "duration_days", None),
+        ("plan_type", "plan_type", None),
+        ("schedule", None, None),
+        ("status", None, None),
+        ("started_at", "started_at", DATETIME),
+        ("created_at", "created_at", DATETIME),
+        ("updated_at", "updated_at", DATETIME),
+    )
+    extra_values = ("schedule", "status")
+
+    def __init__(self, request=None, today: date | None = None, **context):
+        if today is None:
+            from core.views import get_today_shanghai
+
+            today = get_today_shanghai()
+        self.today = today
+        super().__init__(request, **context)
+
+    def get_schedule(self, row: dict) -> Optional[List[Dict[str, Any]]]:
+        # 与 ShortTermGoalDaySerializer/ShortTermGoalTaskItemSerializer 一致：只输出声明的字段，subtitle 可缺省
+        if row["schedule"] is None:
+            return None
+        schedule = []
+        for day in row["schedule"]:
+            tasks = []
+            for task in day["tasks"]:
+                item = {"task_id": str(task["task_id"]), "title": str(task["title"])}
+                if "subtitle" in task:
+                    item["subtitle"] = None if task["subtitle"] is None else str(task["subtitle"])
+                tasks.append(item)
+            schedule.append({"day_index": int(day["day_index"]), "tasks": tasks})
+        return schedule
+
+    def get_status(self, row: dict) -> str:
+        from core.short_term_goal_status import get_effective_status_from_values
+
+        return get_effective_status_from_values(row["status"], row["created_at"], row["duration_days"], self.today)
+
+
+class UploadProjection(Projection):
+    fields = (
+        ("id", "id", None),
+        ("title", "title", None),
+        ("description", "notes", None),
+        ("uploaded_at", "uploaded_at", DATETIME),
+        ("self_rating", "self_rating", None),
+        ("mood_id", "mood_id", None),
+        ("mood_label", None, None),
+        ("tags", None, None),
+        ("tag_ids", None, None),
+        ("duration_minutes", "duration_minutes", None),
+        ("image", None, None),
+        ("thumbnail", None, None),
+        ("created_at", "created_at", DATETIME),
+        ("updated_at", "updated_at", DATETIME),
+    )
+    extra_values = ("mood__name", "mood_label", "image", "thumbnail")
+
+    def __init__(self, request=None, **context):
+        from core.serializers import UserUploadSerializer
+
+        super().__init__(request, **context)
+        # 图片链接与序列化器的 _get_image_url 使用同一构建函数（代理链接/TOS 直链与访问令牌）
+        self._image_url = UserUploadSerializer._image_url_builder(request)
+        self._image_field = UserUpload._meta.get_field("image")
+        self._thumbnail_field = UserUpload._meta.get_field("thumbnail")
+        self._tag_ids: Dict[int, List[int]] = {}
+
+    def prepare(self, rows: List[dict]) -> None:
+        # 一次查询所有行的标签ID，顺序与 prefetch_related("tags") 相同（Tag 的默认排序）
+        tag_ids = defaultdict(list)
+        upload_ids = [row["id"] for row in rows]
+        if upload_ids:
+            links = Tag.objects.filter(uploads__in=upload_ids).values_list("uploads", "id")
+            for upload_id, tag_id in links:
+                tag_ids[upload_id].append(tag_id)
+        self._tag_ids = tag_ids
+
+    def _file(self, field, name):
+        # 构造 FieldFile 以便 TOS 直链读取 .url（不查询数据库）
+        return field.attr_class(None, field, name)
+
+    def get_mood_label(self, row: dict) -> str:
+        if row["mood_id"] is not None:
+            return row["mood__name"]
+        # 兼容旧数据：如果mood为空但mood_label有值，返回mood_label
+        return row["mood_label"] or ""
+
+    def get_tags(self, row: dict) -> List[int]:
+        return list(self._tag_ids.get(row["id"], ()))
+
+    def get_tag_ids(self, row: dict) -> List[int]:
+        return list(self._tag_ids.get(row["id"], ()))
+
+    def get_image(self, row: dict) -> Optional[str]:
+        return self._image_url(self._file(self._image_field, row["image"]), row["id"])
+
+    def get_thumbnail(self, row: dict) -> Optional[str]:
+        # 如果没有缩略图，使用完整图作为回退（向后兼容）
+        if not row["thumbnail"]:
+            return self.get_image(row)
+        return self._image_url(self._file(self._thumbnail_field, row["thumbnail"]), row["id"])
@@ -0,0 +1,291 @@
+"""
+基于缓存的限流计数器：登录失败次数、验证码发送频率等防滥用规则不再对数据库做 COUNT 查询。
+
+- SlidingWindowCounter：滑动窗口计数。窗口按固定宽度切分为若干分桶，每个分桶是一个
+  cache.incr 计数键，统计时一次 get_many 读取覆盖窗口的所有分桶；一次计数最多比
+  精确窗口多保留一个分桶宽度，不会提前失效
+- SlidingWindowCounter.hit_distinct：窗口内不同成员的个数（例如同一 IP 使用的不同邮箱）
+- Cooldown：两次操作的最小间隔
+- DailyCounter：按中国时区自然日计数
+
+计数键中的标识（邮箱、IP）做摘要后再拼接，缓存中不保存明文。
+LoginAttempt / EmailVerification 记录仍然写入（用于审计），缓存读取失败时计数器回退到
+对这些记录的 COUNT 查询，限流在缓存故障期间继续生效（异步写入的审计记录可能略有延迟）。
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from core.models import SHANGHAI_TZ, EmailVerification, LoginAttempt, to_shanghai_date
+
+logger = logging.getLogger(__name__)
+
+# 缓存键前缀
+CACHE_PREFIX = "rate_limit"
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:32]
+
+
+class SlidingWindowCounter:
+    """
+    fallback(identity, since) 返回 since 之后的数据库记录（含 created_at），缓存读取失败时据此计数；
+    distinct_field 为 hit_distinct 计数的成员字段。
+    """
+
+    def __init__(
+        self,
+        scope: str,
+        window: int,
+        buckets: int = 15,
+        fallback: Optional[Callable[[str, datetime], QuerySet]] = None,
+        distinct_field: Optional[str] = None,
+    ):
+        if window % buckets:
+            raise ValueError("window 必须能被 buckets 整除")
+        self.scope = scope
+        self.window = window
+        self.fallback = fallback
+        self.distinct_field = distinct_field
+        self.bucket_width = window // buckets
+        # 分桶在最后一次可能被统计之后再过期
+        self.bucket_ttl = window + 2 * self.bucket_width
+
+    def _prefix(self, identity: str) -> str:
+        return f"{CACHE_PREFIX}:{self.scope}:{_digest(identity)}"
+
+    def _bucket_keys(self, identity: str, now: float) -> dict:
+        # 结束时间晚于 now - window 的分桶：{缓存键: 分桶序号}
+        prefix = self._prefix(identity)
+        first = int((now - self.window) // self.bucket_width)
+        last = int(now // self.bucket_width)
+        return {f"{prefix}:{index}": index for index in range(first, last + 1)}
+
+    def _fallback_records(self, identity: str, now: float) -> Optional[QuerySet]:
+        logger.warning(f"读取限流计数失败，改为查询数据库: {self.scope}", exc_info=True)
+        if self.fallback is None:
+            return None
+        since = datetime.fromtimestamp(now, tz=SHANGHAI_TZ) - timedelta(seconds=self.window)
+        return self.fallback(identity, since)
+
+    def count(self, identity: str, now: Optional[float] = None) -> int:
+        """窗口内的计数。"""
+        now = time.time() if now is None else now
+        try:
+            return sum(cache.get_many(list(self._bucket_keys(identity, now))).values())
+        except Exception:
+            records = self._fallback_records(identity, now)
+        if records is None:
+            return 0
+        if self.distinct_field:
+            return records.values(self.distinct_field).distinct().count()
+        return records.count()
+
+    def hit(self, identity: str, now: Optional[float] = None) -> None:
+        """计数加一。"""
+        now = time.time() if now is None else now
+        key = f"{self._prefix(identity)}:{int(now // self.bucket_width)}"
+        try:
+            cache.add(key, 0, self.bucket_ttl)
+            try:
+                cache.incr(key)
+            except ValueError:
+                # 分桶在 add 与 incr 之间过期
+                cache.set(key, 1, self.bucket_ttl)
+        except Exception:
+            logger.warning(f"写入限流计数失败: {self.scope}", exc_info=True)
+
+    def hit_distinct(self, identity: str, member: str, now: Optional[float] = None) -> None:
+        """
+        记录成员：同一成员在窗口内只计一次，count() 返回不同成员的个数。
+
+        成员标记在首次记录后保留一个窗口，期间再次出现不重复计数。
+        """
+        marker = f"{self._prefix(identity)}:member:{_digest(member)}"
+        try:
+            added = cache.add(marker, 1, self.window)
+        except Exception:
+            logger.warning(f"写入限流计数失败: {self.scope}", exc_info=True)
+            return
+        if added:
+            self.hit(identity, now)
+
+    def retry_after(self, identity: str, now: Optional[float] = None) -> int:
+        """最早的一次计数离开窗口还需的秒数（窗口内没有计数时为 0）。"""
+        now = time.time() if now is None else now
+        bucket_keys = self._bucket_keys(identity, now)
+        try:
+            counts = cache.get_many(list(bucket_keys))
+        except Exception:
+            records = self._fallback_records(identity, now)
+            oldest = None if records is None else (
+                records.order_by("created_at").values_list("created_at", flat=True).first()
+            )
+            if oldest is None:
+                return 0
+            return max(math.ceil(oldest.timestamp() + self.window - now), 0)
+        occupied = [bucket_keys[key] for key, value in counts.items() if value]
+        if not occupied:
+            return 0
+        expires_at = (min(occupied) + 1) * self.bucket_width + self.window
+        return max(math.ceil(expires_at - now), 0)
+
+    def reset(self, identity: str, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        try:
+            cache.delete_many(list(self._bucket_keys(identity, now)))
+        except Exception:
+            logger.warning(f"清除限流计数失败: {self.scope}", exc_info=True)
+
+
+class Cooldown:
+    """fallback(identity) 返回最近一次操作的时间，缓存读取失败时使用。"""
+
+    def __init__(self, scope: str, interval: int, fallback: Optional[Callable[[str], Optional[datetime]]] = None):
+        self.scope = scope
+        self.interval = interval
+        self.fallback = fallback
+
+    def _key(self, identity: str) -> str:
+        return f"{CACHE_PREFIX}:{self.scope}:{_digest(identity)}"
+
+    def remaining(self, identity: str, now: Optional[float] = None) -> int:
+        """距离允许下一次操作的秒数（0 表示可以操作）。"""
+        now = time.time() if now is None else now
+        try:
+            started_at = cache.get(self._key(identity))
+        except Exception:
+            logger.warning(f"读取限流计数失败，改为查询数据库: {self.scope}", exc_info=True)
+            latest = self.fallback(identity) if self.fallback else None
+            started_at = latest.timestamp() if latest else None
+        if started_at is None:
+            return 0
+        return max(self.interval - int(now - started_at), 0)
+
+    def start(self, identity: str, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        try:
+            cache.set(self._key(identity), now, self.interval)
+        except Exception:
+            logger.warning(f"写入限流计数失败: {self.scope}", exc_info=True)
+
+
+class DailyCounter:
+    """
+    按中国时区自然日计数，次日零点起重新计数。
+
+    fallback(identity, day_start) 返回当天零点之后的数据库记录，缓存读取失败时据此计数。
+    """
+
+    def __init__(self, scope: str, fallback: Optional[Callable[[str, datetime], QuerySet]] = None):
+        self.scope = scope
+        self.fallback = fallback
+
+    def _key(self, identity: str, now: Optional[datetime]) -> str:
+        day = to_shanghai_date(now or timezone.now())
+        return f"{CACHE_PREFIX}:{self.scope}:{_digest(identity)}:{day.isoformat()}"
+
+    def count(self, identity: str, now: Optional[datetime] = None) -> int:
+        try:
+            return cache.get(self._key(identity, now)) or 0
+        except Exception:
+            logger.warning(f"读取限流计数失败，改为查询数据库: {self.scope}", exc_info=True)
+        if self.fallback is None:
+            return 0
+        day = to_shanghai_date(now or timezone.now())
+        return self.fallback(identity, datetime.combine(day, datetime.min.time(), tzinfo=SHANGHAI_TZ)).count()
+
+    def hit(self, identity: str, now: Optional[datetime] = None) -> None:
+        key = self._key(identity, now)
+        try:
+            # 保留两天，覆盖跨零点的请求
+            cache.add(key, 0, 2 * 24 * 60 * 60)
+            cache.incr(key)
+        except Exception:
+            logger.warning(f"写入限流计数失败: {self.scope}", exc_info=True)
+
+
+def _login_failures_by_email(email: str, since: datetime) -> QuerySet:
+    return LoginAttempt.objects.filter(email__iexact=email, success=False, created_at__gte=since)
+
+
+def _login_failures_by_ip(ip_address: str, since: datetime) -> QuerySet:
+    return LoginAttempt.objects.filter(ip_address=ip_address, success=False, created_at__gte=since)
+
+
+def _latest_verification(identity: str) -> Optional[datetime]:
+    purpose, email = identity.split(":", 1)
+    return (
+        EmailVerification.objects.filter(email__iexact=email, purpose=purpose)
+        .order_by("-created_at")
+        .values_list("created_at", flat=True)
+        .first()
+    )
+
+
+def _verifications_by_ip(ip_address: str, since: datetime) -> QuerySet:
+    return EmailVerification.objects.filter(ip_address=ip_address, created_at__gte=since)
+
+
+def _verifications_by_email(email: str, since: datetime) -> QuerySet:
+    return EmailVerification.objects.filter(email__iexact=email, created_at__gte=since)
+
+
+# 登录：15 分钟内同一邮箱或同一 IP 的失败次数
+LOGIN_FAILURES_BY_EMAIL = SlidingWindowCounter(
+    "login_failures:email", window=15 * 60, fallback=_login_failures_by_email
+)
+LOGIN_FAILURES_BY_IP = SlidingWindowCounter("login_failures:ip", window=15 * 60, fallback=_login_failures_by_ip)
+
+# 验证码：同一邮箱与用途的发送间隔（标识为 "用途:邮箱"）、每个 IP 每小时的发送次数与不同邮箱数、
+# 每个邮箱每天的发送次数
+VERIFICATION_RESEND = Cooldown("verification:resend", interval=60, fallback=_latest_verification)
+VERIFICATION_SENDS_BY_IP = SlidingWindowCounter(
+    "verification:ip", window=60 * 60, buckets=60, fallback=_verifications_by_ip
+)
+VERIFICATION_EMAILS_BY_IP = SlidingWindowCounter(
+    "verification:ip_emails", window=60 * 60, buckets=60, fallback=_verifications_by_ip, distinct_field="email"
+)
+VERIFICATION_SENDS_BY_EMAIL_DAILY = DailyCounter("verification:email_daily", fallback=_verifications_by_email)
+
+
+def record_login_attempt(email: str, ip_address: str, success: bool) -> None:
+    """
+    写入登录尝试的审计记录。
+
+    启用 Celery 时在事务提交后交给任务队列写入，不占用登录请求；
+    未启用或投递失败时同步写入。
+    """
+    if getattr(settings, "CELERY_ENABLED", False):
+        attempted_at = timezone.now()
+        from core.tasks import record_login_attempt_task
+
+        def _enqueue():
+            try:
+                record_login_attempt_task.delay(email, ip_address, success, attempted_at.isoformat())
+            except Exception:
+                logger.warning("登录审计记录投递失败，改为同步写入", exc_info=True)
+                save_login_attempt(email, ip_address, success, attempted_at)
+
+        transaction.on_commit(_enqueue)
+        return
+    save_login_attempt(email, ip_address, success)
+
+
+def save_login_attempt(email: str, ip_address: str, success: bool, attempted_at: Optional[datetime] = None) -> None:
+    attempt = LoginAttempt.objects.create(email=email, ip_address=ip_address, success=success)
+    if attempted_at is not None:
+        # created_at 为 auto_now_add，异步写入时改回实际尝试时间
+        LoginAttempt.objects.filter(pk=attempt.pk).update(created_at=attempted_at)
@@ -0,0 +1,247 @@
+"""
+认证审计表的数据保留：按主键分批删除过期记录，MySQL 上可选按月分区。
+
+分批删除：每批按主键顺序取出最多 batch_size 条过期记录的ID，用 DELETE ... WHERE id IN (...)
+删除，批次之间休眠 sleep 秒。每批是一个短事务，避免一次大范围 DELETE 长时间持有锁、
+撑大 undo 日志，也给主从复制留出追赶时间。
+
+按月分区（仅 MySQL，需通过 partition_auth_tables 命令显式启用）：
+LoginAttempt / EmailVerification 按 created_at 的月份 RANGE 分区，分区名为 pYYYYMM，
+另有一个 pmax 分区接收超出已建分区的记录。清理时整月过期的分区直接 DROP PARTITION，
+截止时间所在月份的剩余记录仍按主键分批删除。分区边界为 UTC（USE_TZ 下数据库保存 UTC 时间）。
+
+MySQL 要求分区列包含在每个唯一键中，启用分区时主键改为 (id, created_at)；
+AuthToken 的 key、user 均为唯一键，不能分区，始终分批删除。
+其他数据库（包括测试使用的 SQLite）只走分批删除。
+"""
+from __future__ import annotations
+
+import logging
+import re
+import time
+from datetime import date, datetime, timezone as dt_timezone
+from typing import Dict, List, Optional, Tuple
+
+from django.db import connection
+from django.db.models import Min, Model, QuerySet
+
+from core.models import EmailVerification, LoginAttempt
+
+logger = logging.getLogger(__name__)
+
+# 每批删除的记录数
+DEFAULT_BATCH_SIZE = 1000
+# 批次之间的休眠时间（秒）
+DEFAULT_SLEEP = 0.1
+# 可以按月分区的模型（按 created_at 分区）
+PARTITIONED_MODELS = (LoginAttempt, EmailVerification)
+
+_PARTITION_NAME = re.compile(r"^p(\d{4})(\d{2})$")
+
+
+def purge_in_batches(
+    queryset: QuerySet,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    sleep: float = DEFAULT_SLEEP,
+    max_batches: Optional[int] = None,
+) -> int:
+    """
+    按主键顺序分批删除查询集中的记录。
+
+    没有信号接收者和级联关系的模型每批只执行一条 DELETE；
+    有 post_delete 信号的模型（例如 AuthToken 需要清除鉴权缓存）由 Django 逐条发送信号。
+
+    Returns:
+        删除的记录数
+    """
+    model = queryset.model
+    deleted = 0
+    last_pk = None
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        pending = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        ids = list(pending.order_by("pk").values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+        # 不包在外层事务中：每批单独提交
+        count, _ = model.objects.filter(pk__in=ids).delete()
+        deleted += count
+        last_pk = ids[-1]
+        batches += 1
+        if len(ids) < batch_size:
+            break
+        if sleep:
+            time.sleep(sleep)
+    return deleted
+
+
+def is_mysql() -> bool:
+    return connection.vendor in ("mysql", "mariadb")
+
+
+def _month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+def last_partition_month(today: date, months_ahead: int) -> date:
+    """提前创建分区时最后一个分区的月份。"""
+    month = _month_start(today)
+    for _ in range(months_ahead):
+        month = _next_month(month)
+    return month
+
+
+def _partition_definition(month: date) -> str:
+    return f"PARTITION p{month:%Y%m} VALUES LESS THAN (TO_DAYS('{_next_month(month).isoformat()}'))"
+
+
+def build_partition_sql(table: str, first_month: date, last_month: date) -> str:
+    """
+    将表改为按 created_at 月份 RANGE 分区的 ALTER TABLE 语句。
+
+    first_month 之前的记录进入第一个分区，last_month 之后的记录进入 pmax。
+    """
+    months = []
+    month = _month_start(first_month)
+    while month <= last_month:
+        months.append(month)
+        month = _next_month(month)
+    partitions = [_partition_definition(month) for month in months]
+    partitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    return (
+        f"ALTER TABLE `{table}` DROP PRIMARY KEY, ADD PRIMARY KEY (`id`, `created_at`) "
+        f"PARTITION BY RANGE (TO_DAYS(`created_at`)) ({', '.join(partitions)})"
+    )
+
+
+def build_add_partitions_sql(table: str, months: List[date]) -> str:
+    """从 pmax 中拆出新的月份分区（pmax 中没有对应记录时只修改元数据）。"""
+    partitions = [_partition_definition(month) for month in months]
+    partitions.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    return f"ALTER TABLE `{table}` REORGANIZE PARTITION pmax INTO ({', '.join(partitions)})"
+
+
+def build_drop_partitions_sql(table: str, names: List[str]) -> str:
+    return f"ALTER TABLE `{table}` DROP PARTITION {', '.join(names)}"
+
+
+def get_partitions(model: type[Model]) -> Dict[str, Tuple[date, int]]:
+    """
+    表的月份分区：{分区名: (分区月份, 估算行数)}，不含 pmax。
+
+    行数取自 INFORMATION_SCHEMA 的统计值（InnoDB 为估算值），避免为统计而扫描分区。
+    非 MySQL 或表未分区时返回空字典。
+    """
+    if not is_mysql():
+        return {}
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT PARTITION_NAME, TABLE_ROWS
+            FROM INFORMATION_SCHEMA.PARTITIONS
+            WHERE TABLE_SCHEMA = DATABASE()
+            AND TABLE_NAME = %s
+            AND PARTITION_NAME IS NOT NULL
+            """,
+            [model._meta.db_table],
+        )
+        rows = cursor.fetchall()
+    partitions = {}
+    for name, table_rows in rows:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            partitions[name] = (date(int(match.group(1)), int(match.group(2)), 1), table_rows or 0)
+    return partitions
+
+
+def enable_partitioning(model: type[Model], months_ahead: int, today: date) -> str:
+    """
+    将表改为按月分区（会重建整张表，应在低峰期执行）。
+
+    Returns:
+        执行的 SQL
+    """
+    oldest = model.objects.aggregate(oldest=Min("created_at"))["oldest"]
+    first_month = _month_start(oldest.astimezone(dt_timezone.utc).date() if oldest else today)
+    last_month = last_partition_month(today, months_ahead)
+    sql = build_partition_sql(model._meta.db_table, first_month, last_month)
+    with connection.cursor() as cursor:
+        cursor.execute(sql)
+    return sql
+
+
+def ensure_future_partitions(model: type[Model], months_ahead: int, today: date) -> List[str]:
+    """
+    为已分区的表补齐到 today 之后 months_ahead 个月的分区。
+
+    Returns:
+        新建的分区名
+    """
+    partitions = get_partitions(model)
+    if not partitions:
+        return []
+    months = []
+    month = _next_month(max(month for month, _ in partitions.values()))
+    last_month = last_partition_month(today, months_ahead)
+    while month <= last_month:
+        months.append(month)
+        month = _next_month(month)
+    if months:
+        with connection.cursor() as cursor:
+            cursor.execute(build_add_partitions_sql(model._meta.db_table, months))
+    return [f"p{month:%Y%m}" for month in months]
+
+
+def drop_expired_partitions(model: type[Model], cutoff: datetime) -> Tuple[List[str], int]:
+    """
+    删除整月都早于 cutoff 的分区。
+
+    Returns:
+        (删除的分区名, 分区中的估算记录数)
+    """
+    partitions = get_partitions(model)
+    cutoff_date = cutoff.astimezone(dt_timezone.utc).date()
+    expired = sorted(name for name, (month, _) in partitions.items() if _next_month(month) <= cutoff_date)
+    # 保留最近的月份分区，作为 ensure_future_partitions 补齐后续分区的起点
+    if expired and len(expired) == len(partitions):
+        expired = expired[:-1]
+    if not expired:
+        return [], 0
+    with connection.cursor() as cursor:
+        cursor.execute(build_drop_partitions_sql(model._meta.db_table, expired))
+    return expired, sum(partitions[name][1] for name in expired)
+
+
+def purge(
+    queryset: QuerySet,
+    cutoff: Optional[datetime] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    sleep: float = DEFAULT_SLEEP,
+    max_batches: Optional[int] = None,
+) -> Dict[str, object]:
+    """
+    删除过期记录：已分区的表先删除整月过期的分区（需要传入 cutoff），再分批删除剩余记录。
+
+    Returns:
+        deleted（删除的记录数，含分区中的估算记录数）/ partitions（删除的分区名）/
+        seconds（耗时）/ rows_per_second
+    """
+    started = time.monotonic()
+    dropped, deleted = [], 0
+    if cutoff is not None and queryset.model in PARTITIONED_MODELS:
+        dropped, deleted = drop_expired_partitions(queryset.model, cutoff)
+    deleted += purge_in_batches(queryset, batch_size=batch_size, sleep=sleep, max_batches=max_batches)
+    seconds = time.monotonic() - started
+    if deleted:
+        logger.info(f"清理 {queryset.model.__name__}: {deleted} 条, {seconds:.1f} 秒")
+    return {
+        "deleted": deleted,
+        "partitions": dropped,
+        "seconds": seconds,
+        "rows_per_second": deleted / seconds if seconds > 0 else 0.0,
+    }
+
@@ -26,6 +26,7 @@ from core.models import (
     EncouragementMessage,
     HolidayMessage,
     LongTermGoal,
+    LongTermGoalCheckpointCrossing,
     LongTermPlanCopy,
     Mood,
     MonthlyReportTemplate,
@@ -72,10 +73,11 @@ class TagSerializer(serializers.ModelSerializer):
             "is_preset",
             "is_hidden",
             "display_order",
+            "usage_count",
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["id", "created_at", "updated_at"]
+        read_only_fields = ["id", "usage_count", "created_at", "updated_at"]
     
     def validate_name(self, value: str) -> str:
         text = (value or "").strip()
@@ -293,7 +295,8 @@ class UserUploadSerializer(serializers.ModelSerializer):
 
     def get_tags(self, obj):
         """返回标签ID列表，前端会根据ID转换为名称显示"""
-        return list(obj.tags.values_list("id", flat=True))
+        # 使用 .all() 以便复用视图中 prefetch_related("tags") 的结果
+        return [tag.id for tag in obj.tags.all()]
 
     @staticmethod
     def _rename_with_format(original_name: str, fmt: str) -> str:
@@ -604,9 +607,15 @@ class UserUploadSerializer(serializers.ModelSerializer):
 
     def _get_image_url(self, image_field, instance_pk, request):
         """获取图片URL的辅助方法，处理代理和直链逻辑"""
-        if not image_field:
-            return None
-        
+        return self._image_url_builder(request)(image_field, instance_pk)
+
+    @staticmethod
+    def _image_url_builder(request):
+        """
+        返回 (image_field, instance_pk) -> 图片URL 的函数。
+
+        存储设置、域名与访问令牌只读取一次，列表中的每一行只需拼接作品ID（见 core.projections）。
+        """
         from django.conf import settings as dj_settings
         use_tos_storage = getattr(dj_settings, "USE_TOS_STORAGE", False)
         force_proxy_url = getattr(dj_settings, "FORCE_IMAGE_PROXY_URL", False)
@@ -615,25 +624,33 @@ class UserUploadSerializer(serializers.ModelSerializer):
         
         if use_tos_storage and not should_use_proxy:
             # 使用 TOS 直链
-            return image_field.url
+            return lambda image_field, instance_pk: image_field.url if image_field else None
+
+        # 使用代理 URL：用占位ID生成一次完整链接，再替换为实际的作品ID
+        placeholder = "9081726354"
+        proxy_url = reverse("core:user-upload-image", args=[int(placeholder)])
+        if request:
+            image_url = request.build_absolute_uri(proxy_url)
         else:
-            # 使用代理 URL
-            proxy_url = reverse("core:user-upload-image", args=[instance_pk])
-            if request:
-                image_url = request.build_absolute_uri(proxy_url)
-            else:
-                image_url = proxy_url
-            
-            token = getattr(getattr(request, "auth", None), "key", None)
-            if not token and request is not None:
-                token = getattr(request.user, "auth_token", None)
-                if token:
-                    token = getattr(token, "key", None)
-            
+            image_url = proxy_url
+        
+        token = getattr(getattr(request, "auth", None), "key", None)
+        if not token and request is not None:
+            token = getattr(request.user, "auth_token", None)
             if token:
-                separator = "&" if "?" in image_url else "?"
-                image_url = f"{image_url}{separator}token={token}"
-            return image_url
+                token = getattr(token, "key", None)
+        
+        if token:
+            separator = "&" if "?" in image_url else "?"
+            image_url = f"{image_url}{separator}token={token}"
+        prefix, suffix = image_url.split(placeholder, 1)
+
+        def build(image_field, instance_pk):
+            if not image_field:
+                return None
+            return f"{prefix}{instance_pk}{suffix}"
+
+        return build
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -947,6 +964,14 @@ class ShortTermGoalSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+    def to_representation(self, instance: ShortTermGoal) -> dict[str, Any]:
+        data = super().to_representation(instance)
+        # 已过期但尚未被定时任务更新的目标展示为已完成（不写数据库）
+        from core.short_term_goal_status import get_effective_status
+
+        data["status"] = get_effective_status(instance, self.context.get("today"))
+        return data
+
 
 class ShortTermTaskPresetSerializer(serializers.ModelSerializer):
     class Meta:
@@ -1285,150 +1310,88 @@ class LongTermGoalSerializer(serializers.ModelSerializer):
         if cache_key in cache:
             return cache[cache_key]
 
-        uploads = self._resolve_uploads(obj)
-        entries: list[dict[str, object]] = []
-        cumulative = 0
-        for upload in uploads:
-            minutes = self._safe_minutes(upload.duration_minutes)
-            if minutes <= 0:
-                continue
-            cumulative += minutes
-            entries.append({"upload": upload, "cumulative": cumulative})
+        # 累计时长与检查点达成记录由 core.goal_progress 增量维护
+        from core.goal_progress import get_goal_progress
 
-        checkpoints = self._build_checkpoints(obj, entries, uploads)
+        progress = get_goal_progress(obj)
+        checkpoints = self._build_checkpoints(obj, progress["crossings"])
 
         stats = {
-            "uploads": uploads,
-            "progress_entries": entries,
-            "total_minutes": cumulative,
+            "total_minutes": progress["total_minutes"],
             "checkpoints": checkpoints,
         }
         cache[cache_key] = stats
         return stats
 
-    def _resolve_uploads(self, obj: LongTermGoal) -> list[UserUpload]:
-        uploads = self.context.get("uploads")
-        if uploads is not None:
-            return uploads
-        # 修复：使用与views.py中相同的时区处理逻辑
-        # 确保查询时区一致，避免遗漏边界时间点的上传
-        from core.views import SHANGHAI_TZ
-        from django.conf import settings
-        from datetime import datetime
-        
-        started_at = obj.started_at
-        if timezone.is_naive(started_at):
-            started_at = timezone.make_aware(started_at)
-        
-        # 获取started_at的日期（上海时区），用于更准确的查询
-        if SHANGHAI_TZ is not None:
-            started_at_shanghai = started_at.astimezone(SHANGHAI_TZ)
-            # 使用当天的开始时间（00:00:00）作为查询起点，确保包含当天所有上传
-            start_date = started_at_shanghai.date()
-            start_datetime = timezone.make_aware(
-                datetime.combine(start_date, datetime.min.time()),
-                timezone=SHANGHAI_TZ
-            )
-            # 转换为UTC用于数据库查询
-            if settings.USE_TZ:
-                start_datetime = start_datetime.astimezone(timezone.utc)
-        else:
-            # 回退：使用原始started_at，但确保时区正确
-            start_datetime = started_at
-        
-        return list(
-            UserUpload.objects.filter(
-                user=obj.user, 
-                uploaded_at__gte=start_datetime
-            ).order_by("uploaded_at", "id")
-        )
+    def _resolve_custom_uploads(self, obj: LongTermGoal, upload_ids: set[int]) -> dict[int, UserUpload]:
+        """批量获取检查点自定义展示的上传（仅限计划开始以来的上传）"""
+        if not upload_ids:
+            return {}
+        from core.goal_progress import get_window_start
+
+        return UserUpload.objects.filter(
+            user_id=obj.user_id,
+            uploaded_at__gte=get_window_start(obj.started_at),
+        ).select_related("mood").prefetch_related("tags").in_bulk(upload_ids)
 
     def _build_checkpoints(
         self,
         obj: LongTermGoal,
-        entries: list[dict[str, object]],
-        uploads: list[UserUpload],
+        crossings: dict[int, LongTermGoalCheckpointCrossing],
     ) -> list[dict[str, object]]:
+        from core.goal_progress import get_checkpoint_thresholds
+
         checkpoints: list[dict[str, object]] = []
-        # 确保类型正确（防止从数据库读取时是字符串）
-        target_hours = float(obj.target_hours) if obj.target_hours is not None else 0.0
-        checkpoint_count = int(obj.checkpoint_count) if obj.checkpoint_count is not None else 1
-        per_checkpoint_minutes = target_hours * 60 / checkpoint_count
+        thresholds = get_checkpoint_thresholds(obj)
         first_open_index: int | None = None
 
-        for index in range(checkpoint_count):
-            threshold_minutes = per_checkpoint_minutes * (index + 1)
-            
-            # 从metadata中读取checkpoint的自定义数据
+        # 从metadata中读取checkpoint的自定义数据
+        metadata = obj.metadata if isinstance(getattr(obj, "metadata", None), dict) else {}
+        checkpoint_metadata_map: dict[int, dict] = {}
+        for index in range(len(thresholds)):
+            checkpoint_metadata = metadata.get(f"checkpoint_{index + 1}", {})
+            checkpoint_metadata_map[index + 1] = (
+                checkpoint_metadata if isinstance(checkpoint_metadata, dict) else {}
+            )
+        custom_upload_ids = {
+            checkpoint_metadata["upload_id"]
+            for checkpoint_metadata in checkpoint_metadata_map.values()
+            if isinstance(checkpoint_metadata.get("upload_id"), int)
+            and checkpoint_metadata["upload_id"]
+        }
+        custom_uploads = self._resolve_custom_uploads(obj, custom_upload_ids)
+
+        for index, threshold_minutes in enumerate(thresholds):
             checkpoint_index = index + 1
-            checkpoint_key = f"checkpoint_{checkpoint_index}"
-            checkpoint_metadata = {}
-            try:
-                if hasattr(obj, "metadata") and obj.metadata is not None:
-                    if isinstance(obj.metadata, dict):
-                        checkpoint_metadata = obj.metadata.get(checkpoint_key, {})
-            except (AttributeError, TypeError):
-                checkpoint_metadata = {}
-            
+            checkpoint_metadata = checkpoint_metadata_map[checkpoint_index]
+
             # 如果metadata中指定了upload_id，优先使用指定的upload
-            custom_upload_id = checkpoint_metadata.get("upload_id") if isinstance(checkpoint_metadata, dict) else None
-            if custom_upload_id and uploads:
-                try:
-                    custom_upload = next((u for u in uploads if u.id == custom_upload_id), None)
-                    if custom_upload:
-                        status = "completed"
-                        reached_minutes = None  # 使用自定义upload时，不设置reached_minutes
-                        reached_at = timezone.localtime(custom_upload.uploaded_at)
-                        upload_payload = self._serialize_upload(custom_upload)
-                    else:
-                        # 如果指定的upload不存在，回退到原来的逻辑
-                        entry = next((item for item in entries if item["cumulative"] >= threshold_minutes), None)
-                        if entry:
-                            status = "completed"
-                            reached_minutes = entry["cumulative"]
-                            upload = entry["upload"]
-                            reached_at = timezone.localtime(upload.uploaded_at)
-                            upload_payload = self._serialize_upload(upload)
-                        else:
-                            status = "upcoming"
-                            reached_minutes = None
-                            reached_at = None
-                            upload_payload = None
-                except (StopIteration, AttributeError):
-                    # 如果出错，回退到原来的逻辑
-                    entry = next((item for item in entries if item["cumulative"] >= threshold_minutes), None)
-                    if entry:
-                        status = "completed"
-                        reached_minutes = entry["cumulative"]
-                        upload = entry["upload"]
-                        reached_at = timezone.localtime(upload.uploaded_at)
-                        upload_payload = self._serialize_upload(upload)
-                    else:
-                        status = "upcoming"
-                        reached_minutes = None
-                        reached_at = None
-                        upload_payload = None
+            custom_upload_id = checkpoint_metadata.get("upload_id")
+            custom_upload = custom_uploads.get(custom_upload_id) if custom_upload_id else None
+            crossing = crossings.get(checkpoint_index)
+            if custom_upload:
+                status = "completed"
+                reached_minutes = None  # 使用自定义upload时，不设置reached_minutes
+                reached_at = timezone.localtime(custom_upload.uploaded_at)
+                upload_payload = self._serialize_upload(custom_upload)
+            elif crossing:
+                # 没有自定义upload（或指定的upload不存在），使用累计时长达到阈值的upload
+                status = "completed"
+                reached_minutes = crossing.cumulative_minutes
+                reached_at = timezone.localtime(crossing.upload.uploaded_at)
+                upload_payload = self._serialize_upload(crossing.upload)
             else:
-                # 没有自定义upload，使用原来的逻辑
-                entry = next((item for item in entries if item["cumulative"] >= threshold_minutes), None)
-                if entry:
-                    status = "completed"
-                    reached_minutes = entry["cumulative"]
-                    upload = entry["upload"]
-                    reached_at = timezone.localtime(upload.uploaded_at)
-                    upload_payload = self._serialize_upload(upload)
-                else:
-                    status = "upcoming"
-                    reached_minutes = None
-                    reached_at = None
-                    upload_payload = None
+                status = "upcoming"
+                reached_minutes = None
+                reached_at = None
+                upload_payload = None
 
             if status == "upcoming" and first_open_index is None:
                 status = "current"
                 first_open_index = index
             
             # 从metadata中读取completionNote
-            completion_note = checkpoint_metadata.get("completion_note") if isinstance(checkpoint_metadata, dict) else None
+            completion_note = checkpoint_metadata.get("completion_note")
 
             checkpoint_payload = {
                 "index": checkpoint_index,
@@ -1447,42 +1410,7 @@ class LongTermGoalSerializer(serializers.ModelSerializer):
 
     def _serialize_upload(self, upload: UserUpload) -> dict[str, object]:
         localized = timezone.localtime(upload.uploaded_at)
-        request = self.context.get("request")
-        image_url = None
-        if upload.image:
-            # 使用与 UserUploadSerializer 相同的逻辑来决定使用代理 URL 还是直链
-            # 生产环境（DEBUG=false）默认使用 TOS 直链，开发环境（DEBUG=true）自动使用代理
-            from django.conf import settings as dj_settings
-            use_tos_storage = getattr(dj_settings, "USE_TOS_STORAGE", False)
-            force_proxy_url = getattr(dj_settings, "FORCE_IMAGE_PROXY_URL", False)
-            is_debug = getattr(dj_settings, "DEBUG", False)
-            should_use_proxy = force_proxy_url or (use_tos_storage and is_debug)
-            
-            if use_tos_storage and not should_use_proxy:
-                # 使用 TOS 直链
-                image_url = upload.image.url
-            else:
-                # 使用代理 URL（通过 Django 返回，自动处理 CORS）
-                from django.urls import reverse
-                proxy_url = reverse("core:user-upload-image", args=[upload.pk])
-                
-                if request:
-                    image_url = request.build_absolute_uri(proxy_url)
-                else:
-                    image_url = proxy_url
-                
-                # 添加 token 参数
-                token = getattr(getattr(request, "auth", None), "key", None)
-                if not token and request is not None:
-                    token = getattr(request.user, "auth_token", None)
-                    if token:
-                        token = getattr(token, "key", None)
-                
-                if token:
-                    separator = "&" if "?" in image_url else "?"
-                    image_url = f"{image_url}{separator}token={token}"
-
-        return {
+        payload = {
             "id": upload.id,
             "title": upload.title,
             "description": upload.notes,
@@ -1491,15 +1419,80 @@ class LongTermGoalSerializer(serializers.ModelSerializer):
             "durationMinutes": upload.duration_minutes,
             "selfRating": upload.self_rating,
             "moodLabel": upload.mood.name if upload.mood else (upload.mood_label or ""),
-            "tags": list(upload.tags.values_list("name", flat=True)),
-            "image": image_url,
+            "tags": [tag.name for tag in upload.tags.all()],
+            "image": None,
         }
+        image_name = upload.image.name if upload.image else None
+        if self.context.get("defer_image_urls"):
+            # 归档快照中只保存文件名，读取时再生成链接（链接依赖请求和令牌）
+            payload[DEFERRED_IMAGE_KEY] = image_name
+        elif image_name:
+            payload["image"] = build_upload_image_url(upload.pk, image_name, self.context.get("request"))
+        return payload
 
-    @staticmethod
-    def _safe_minutes(value: int | None) -> int:
-        if value is None:
-            return 0
-        return max(int(value), 0)
+
+# 归档快照中记录图片文件名的字段，读取时替换为 image 链接
+DEFERRED_IMAGE_KEY = "_imageName"
+
+
+def build_upload_image_url(upload_pk: int, image_name: str, request=None) -> str:
+    """
+    生成上传图片的访问链接。
+    
+    使用与 UserUploadSerializer 相同的逻辑来决定使用代理 URL 还是直链：
+    生产环境（DEBUG=false）默认使用 TOS 直链，开发环境（DEBUG=true）自动使用代理。
+    """
+    from django.conf import settings as dj_settings
+    use_tos_storage = getattr(dj_settings, "USE_TOS_STORAGE", False)
+    force_proxy_url = getattr(dj_settings, "FORCE_IMAGE_PROXY_URL", False)
+    is_debug = getattr(dj_settings, "DEBUG", False)
+    should_use_proxy = force_proxy_url or (use_tos_storage and is_debug)
+    
+    if use_tos_storage and not should_use_proxy:
+        # 使用 TOS 直链
+        return UserUpload._meta.get_field("image").storage.url(image_name)
+    
+    # 使用代理 URL（通过 Django 返回，自动处理 CORS）
+    from django.urls import reverse
+    proxy_url = reverse("core:user-upload-image", args=[upload_pk])
+    
+    if request:
+        image_url = request.build_absolute_uri(proxy_url)
+    else:
+        image_url = proxy_url
+    
+    # 添加 token 参数
+    token = getattr(getattr(request, "auth", None), "key", None)
+    if not token and request is not None:
+        token = getattr(request.user, "auth_token", None)
+        if token:
+            token = getattr(token, "key", None)
+    
+    if token:
+        separator = "&" if "?" in image_url else "?"
+        image_url = f"{image_url}{separator}token={token}"
+    return image_url
+
+
+def get_signed_image_url_expiry() -> int | None:
+    """
+    图片链接为预签名 TOS 直链时返回签名有效期（秒），否则返回 None。
+
+    未配置 TOS_CUSTOM_DOMAIN 时 S3Boto3Storage 生成带过期时间的预签名链接，
+    缓存响应（ETag/304）时需要考虑链接过期。
+    """
+    from django.conf import settings as dj_settings
+    use_tos_storage = getattr(dj_settings, "USE_TOS_STORAGE", False)
+    force_proxy_url = getattr(dj_settings, "FORCE_IMAGE_PROXY_URL", False)
+    is_debug = getattr(dj_settings, "DEBUG", False)
+    should_use_proxy = force_proxy_url or (use_tos_storage and is_debug)
+    if not use_tos_storage or should_use_proxy:
+        return None
+
+    storage = UserUpload._meta.get_field("image").storage
+    if not getattr(storage, "querystring_auth", False) or getattr(storage, "custom_domain", None):
+        return None
+    return int(getattr(storage, "querystring_expire", 3600))
 
 
 class LongTermGoalSetupSerializer(serializers.Serializer):
@@ -0,0 +1,167 @@
+"""
+短期目标状态流转：进行中的目标在以下任一条件满足时变为已完成：
+1. 完成所有打卡天数（按日期去重的任务完成记录数 >= 持续天数）
+2. 时间期限已到（今天 > 创建日期 + 持续天数 - 1，按中国时区）
+
+- 定时任务 sweep_short_term_goal_statuses 用集合查询批量更新所有到期目标
+- 写入任务完成记录后调用 update_goal_status 立即检查单个目标
+- 读取接口不写数据库，只用 get_effective_status 在内存中反映已过期但尚未被扫描的目标
+"""
+from __future__ import annotations
+
+import logging
+from datetime import date, timedelta
+from typing import Dict, List
+
+from django.db.models import Count, F
+from django.utils import timezone
+
+from core.models import ShortTermGoal, to_shanghai_date
+
+logger = logging.getLogger(__name__)
+
+# 批量更新时每条 UPDATE 语句包含的最大 ID 数
+UPDATE_BATCH_SIZE = 1000
+
+
+def _safe_int(value) -> int:
+    # 确保 duration_days 是整数类型（处理可能的字符串类型）
+    try:
+        return int(value) if value is not None else 0
+    except (ValueError, TypeError):
+        return 0
+
+
+def get_goal_end_date(created_at, duration_days: int) -> date | None:
+    """计算目标的结束日期（创建日期 + 持续天数 - 1，因为第一天是创建日）。"""
+    if created_at is None or duration_days <= 0:
+        return None
+    return to_shanghai_date(created_at) + timedelta(days=duration_days - 1)
+
+
+def is_goal_expired(goal: ShortTermGoal, today: date) -> bool:
+    """进行中的目标是否已超过期限（不查询数据库）。"""
+    return _is_expired(goal.status, goal.created_at, goal.duration_days, today)
+
+
+def _is_expired(status: str, created_at, duration_days, today: date) -> bool:
+    if status != ShortTermGoal.STATUS_ACTIVE:
+        return False
+    end_date = get_goal_end_date(created_at, _safe_int(duration_days))
+    return end_date is not None and today > end_date
+
+
+def get_effective_status(goal: ShortTermGoal, today: date | None = None) -> str:
+    """
+    返回目标在读取时应展示的状态。
+
+    已过期但尚未被定时任务更新的目标展示为已完成，不写数据库。
+    """
+    return get_effective_status_from_values(goal.status, goal.created_at, goal.duration_days, today)
+
+
+def get_effective_status_from_values(status: str, created_at, duration_days, today: date | None = None) -> str:
+    """与 get_effective_status 相同，参数为 .values() 行中的字段值。"""
+    if today is None:
+        from core.views import get_today_shanghai
+
+        today = get_today_shanghai()
+    if _is_expired(status, created_at, duration_days, today):
+        return ShortTermGoal.STATUS_COMPLETED
+    return status
+
+
+def update_goal_status(goal: ShortTermGoal, today: date | None = None) -> bool:
+    """
+    检查单个进行中目标是否已完成，满足条件时更新状态为completed。
+
+    Returns:
+        True 表示状态已更新，False 表示未更新
+    """
+    if goal.status != ShortTermGoal.STATUS_ACTIVE:
+        return False
+
+    duration_days = _safe_int(goal.duration_days)
+    if duration_days <= 0:
+        logger.warning(
+            f"短期目标 duration_days 无效: goal_id={goal.id}, duration_days={goal.duration_days}"
+        )
+        return False
+
+    completed_days = (
+        goal.task_completions.order_by().values("date").distinct().count()
+    )
+    if today is None:
+        from core.views import get_today_shanghai
+
+        today = get_today_shanghai()
+
+    if completed_days < duration_days and not is_goal_expired(goal, today):
+        return False
+
+    goal.status = ShortTermGoal.STATUS_COMPLETED
+    goal.save(update_fields=["status", "updated_at"])
+    logger.info(
+        f"短期目标自动完成: goal_id={goal.id}, user_id={goal.user_id}, "
+        f"completed_days={completed_days}, duration_days={duration_days}"
+    )
+    return True
+
+
+def _complete_goals(goal_ids: List[int]) -> int:
+    updated = 0
+    now = timezone.now()
+    for start in range(0, len(goal_ids), UPDATE_BATCH_SIZE):
+        batch = goal_ids[start : start + UPDATE_BATCH_SIZE]
+        # 条件中保留 status=active，避免覆盖并发期间被修改的状态
+        updated += ShortTermGoal.objects.filter(
+            id__in=batch, status=ShortTermGoal.STATUS_ACTIVE
+        ).update(status=ShortTermGoal.STATUS_COMPLETED, updated_at=now)
+    return updated
+
+
+def sweep_short_term_goal_statuses(today: date | None = None) -> Dict[str, int]:
+    """
+    批量更新所有到期的进行中目标。
+
+    Returns:
+        {"completed": 因完成所有打卡天数而完成的目标数, "expired": 因期限已到而完成的目标数}
+    """
+    if today is None:
+        from core.views import get_today_shanghai
+
+        today = get_today_shanghai()
+
+    active_goals = ShortTermGoal.objects.filter(
+        status=ShortTermGoal.STATUS_ACTIVE, duration_days__gt=0
+    ).order_by()
+
+    # 检查1：按日期去重的任务完成记录数达到持续天数
+    completed_ids = list(
+        active_goals.annotate(
+            completed_days=Count("task_completions__date", distinct=True)
+        )
+        .filter(completed_days__gte=F("duration_days"))
+        .values_list("id", flat=True)
+    )
+
+    # 检查2：时间期限已到（结束日期依赖中国时区的创建日期，在内存中计算）
+    completed_set = set(completed_ids)
+    expired_ids = []
+    deadlines = active_goals.values_list("id", "created_at", "duration_days")
+    for goal_id, created_at, duration_days in deadlines.iterator():
+        if goal_id in completed_set:
+            continue
+        end_date = get_goal_end_date(created_at, duration_days)
+        if end_date is not None and today > end_date:
+            expired_ids.append(goal_id)
+
+    result = {
+        "completed": _complete_goals(completed_ids),
+        "expired": _complete_goals(expired_ids),
+    }
+    if result["completed"] or result["expired"]:
+        logger.info(
+            f"短期目标状态扫描: 完成打卡 {result['completed']} 个, 期限已到 {result['expired']} 个"
+        )
+    return result
@@ -0,0 +1,231 @@
+"""
+模型信号处理：维护依赖上传记录的派生数据与缓存。
+"""
+from __future__ import annotations
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from core import (
+    auth_token_cache,
+    goal_progress,
+    goal_snapshots,
+    homepage_cache,
+    tag_usage,
+    task_completion_cache,
+    upload_quota,
+    upload_sync,
+)
+from core.models import (
+    AuthToken,
+    DailyHistoryMessage,
+    EncouragementMessage,
+    HolidayMessage,
+    ShortTermGoal,
+    ShortTermGoalTaskCompletion,
+    Tag,
+    UserUpload,
+)
+
+
+def _deleted_with_user(origin) -> bool:
+    """删除是否由删除用户级联触发（相关派生数据会一并删除，无需维护）。"""
+    origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return origin_model is get_user_model()
+
+
+def _touches_progress(update_fields) -> bool:
+    return update_fields is None or bool(goal_progress.PROGRESS_FIELDS & set(update_fields))
+
+
+@receiver(pre_save, sender=UserUpload, dispatch_uid="core.upload_progress_pre_save")
+def remember_upload_progress_fields(sender, instance: UserUpload, raw=False, update_fields=None, **kwargs):
+    """记录修改前的上传时间与时长，供保存后判断是否需要重建长期目标进度。"""
+    instance._previous_progress_fields = None
+    if raw or instance.pk is None or not _touches_progress(update_fields):
+        return
+    instance._previous_progress_fields = (
+        UserUpload.objects.filter(pk=instance.pk)
+        .values_list("uploaded_at", "duration_minutes")
+        .first()
+    )
+
+
+@receiver(post_save, sender=UserUpload, dispatch_uid="core.upload_progress_post_save")
+def update_goal_progress_on_save(sender, instance: UserUpload, created=False, raw=False, update_fields=None, **kwargs):
+    """维护长期目标进度，并丢弃受影响目标的快照。"""
+    if raw:
+        return
+    rebuilt = []
+    if _touches_progress(update_fields):
+        previous = getattr(instance, "_previous_progress_fields", None)
+        if created or previous is None:
+            rebuilt = goal_progress.on_upload_created(instance)
+        else:
+            rebuilt = goal_progress.on_upload_changed(instance, previous)
+    if created:
+        # 新上传不会是已有快照的展示作品，只需处理重建了进度的目标
+        goal_snapshots.discard_goal_snapshots(goal.pk for goal in rebuilt)
+    else:
+        goal_snapshots.discard_snapshots_for_upload(instance, rebuilt)
+
+
+@receiver(post_delete, sender=UserUpload, dispatch_uid="core.upload_progress_post_delete")
+def update_goal_progress_on_delete(sender, instance: UserUpload, origin=None, **kwargs):
+    if _deleted_with_user(origin):
+        return
+    rebuilt = goal_progress.on_upload_deleted(instance)
+    goal_snapshots.discard_snapshots_for_upload(instance, rebuilt)
+
+
+@receiver(post_save, sender=ShortTermGoalTaskCompletion, dispatch_uid="core.task_completion_cache_post_save")
+@receiver(post_delete, sender=ShortTermGoalTaskCompletion, dispatch_uid="core.task_completion_cache_post_delete")
+def invalidate_task_completions_on_completion_change(sender, instance: ShortTermGoalTaskCompletion, **kwargs):
+    if ShortTermGoalTaskCompletion.goal.is_cached(instance):
+        user_id = instance.goal.user_id
+    else:
+        # 只查询目标的用户ID，不加载整个目标
+        user_id = ShortTermGoal.objects.filter(pk=instance.goal_id).values_list("user_id", flat=True).first()
+    if user_id is not None:
+        task_completion_cache.bump_version(user_id)
+
+
+@receiver(post_save, sender=UserUpload, dispatch_uid="core.task_completion_cache_upload_post_save")
+@receiver(post_delete, sender=UserUpload, dispatch_uid="core.task_completion_cache_upload_post_delete")
+def invalidate_task_completions_on_upload_change(sender, instance: UserUpload, raw=False, **kwargs):
+    """任务完成记录响应中包含上传的标题与图片，上传修改或删除时同样失效。"""
+    if raw:
+        return
+    task_completion_cache.bump_version(instance.user_id)
+
+
+@receiver(post_delete, sender=UserUpload, dispatch_uid="core.upload_sync_post_delete")
+def record_upload_tombstone(sender, instance: UserUpload, origin=None, **kwargs):
+    """记录删除供客户端增量同步；随用户一起删除时无需记录。"""
+    if _deleted_with_user(origin):
+        return
+    upload_sync.record_tombstone(instance)
+
+
+@receiver(m2m_changed, sender=UserUpload.tags.through, dispatch_uid="core.upload_sync_tags_changed")
+def touch_uploads_on_tags_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """标签变化不经过 UserUpload.save，单独分配变更序号。"""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            upload_sync.touch_uploads([instance.pk])
+        return
+    # 从标签一侧修改：pk_set 为上传ID；clear 时在清除前记录关联的上传
+    if action == "pre_clear":
+        instance._cleared_upload_ids = list(instance.uploads.values_list("id", flat=True))
+    elif action in ("post_add", "post_remove"):
+        upload_sync.touch_uploads(pk_set or [])
+    elif action == "post_clear":
+        upload_sync.touch_uploads(getattr(instance, "_cleared_upload_ids", []))
+
+
+@receiver(pre_delete, sender=Tag, dispatch_uid="core.upload_sync_tag_pre_delete")
+def touch_uploads_on_tag_delete(sender, instance: Tag, **kwargs):
+    upload_sync.touch_uploads(instance.uploads.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=UserUpload, dispatch_uid="core.upload_quota_post_save")
+def increment_upload_month_counter(sender, instance: UserUpload, created=False, raw=False, **kwargs):
+    if created and not raw:
+        upload_quota.increment(instance.user_id, instance.created_at)
+
+
+@receiver(post_delete, sender=UserUpload, dispatch_uid="core.upload_quota_post_delete")
+def decrement_upload_month_counter(sender, instance: UserUpload, origin=None, **kwargs):
+    if _deleted_with_user(origin):
+        return
+    upload_quota.decrement(instance.user_id, instance.created_at)
+
+
+@receiver(m2m_changed, sender=UserUpload.tags.through, dispatch_uid="core.tag_usage_tags_changed")
+def update_tag_usage_on_tags_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    维护标签使用次数。
+
+    post_add 的 pk_set 只包含新增的关联；remove 的 pk_set 可能包含原本不存在的关联，
+    因此 remove 与 clear 在执行前先记录实际存在的关联。
+    """
+    if not reverse:
+        # 从画作一侧修改：instance 为画作，pk_set 为标签ID
+        if action == "post_add":
+            tag_usage.adjust({tag_id: 1 for tag_id in pk_set})
+        elif action in ("pre_remove", "pre_clear"):
+            instance._removed_tag_ids = tag_usage.linked_tag_ids(
+                instance.pk, pk_set if action == "pre_remove" else None
+            )
+        elif action in ("post_remove", "post_clear"):
+            tag_usage.adjust({tag_id: -1 for tag_id in getattr(instance, "_removed_tag_ids", [])})
+        return
+
+    # 从标签一侧修改：instance 为标签，pk_set 为画作ID
+    if action == "post_add":
+        tag_usage.adjust({instance.pk: len(pk_set)})
+    elif action in ("pre_remove", "pre_clear"):
+        instance._removed_upload_count = tag_usage.count_linked_uploads(
+            instance.pk, pk_set if action == "pre_remove" else None
+        )
+    elif action in ("post_remove", "post_clear"):
+        tag_usage.adjust({instance.pk: -getattr(instance, "_removed_upload_count", 0)})
+
+
+@receiver(pre_delete, sender=UserUpload, dispatch_uid="core.tag_usage_upload_pre_delete")
+def update_tag_usage_on_upload_delete(sender, instance: UserUpload, origin=None, **kwargs):
+    """画作删除时关联记录随之级联删除（不触发 m2m_changed），在删除前减少标签使用次数。"""
+    if _deleted_with_user(origin):
+        # 由 update_shared_tag_usage_on_user_delete 一次处理
+        return
+    tag_usage.adjust({tag_id: -1 for tag_id in tag_usage.linked_tag_ids(instance.pk)})
+
+
+@receiver(pre_delete, sender=get_user_model(), dispatch_uid="core.tag_usage_user_pre_delete")
+def update_shared_tag_usage_on_user_delete(sender, instance, **kwargs):
+    """
+    删除用户时用户自己的标签随之删除，无需维护；画作关联的预设标签（不属于该用户）保留，
+    在关联记录级联删除前按标签分组一次减少使用次数。
+    """
+    tag_usage.adjust({tag_id: -count for tag_id, count in tag_usage.count_shared_tag_links(instance.pk).items()})
+
+
+@receiver(pre_save, sender=AuthToken, dispatch_uid="core.auth_token_cache_pre_save")
+def remember_previous_token_key(sender, instance: AuthToken, raw=False, **kwargs):
+    """记录修改前的令牌，令牌更换后旧令牌的缓存同样失效。"""
+    instance._previous_key = None
+    if raw or instance.pk is None:
+        return
+    instance._previous_key = AuthToken.objects.filter(pk=instance.pk).values_list("key", flat=True).first()
+
+
+@receiver(post_save, sender=AuthToken, dispatch_uid="core.auth_token_cache_post_save")
+@receiver(post_delete, sender=AuthToken, dispatch_uid="core.auth_token_cache_post_delete")
+def revoke_token_cache_on_token_change(sender, instance: AuthToken, raw=False, **kwargs):
+    if raw:
+        return
+    auth_token_cache.revoke_keys([instance.key, getattr(instance, "_previous_key", None)])
+
+
+@receiver(post_save, sender=get_user_model(), dispatch_uid="core.auth_token_cache_user_post_save")
+def revoke_token_cache_on_user_change(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """鉴权缓存中包含用户对象：修改密码、停用账号等用户信息变化后立即失效。"""
+    if raw or created:
+        return
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    auth_token_cache.revoke_user(instance.pk)
+
+
+@receiver(post_save, sender=DailyHistoryMessage, dispatch_uid="core.homepage_history_post_save")
+@receiver(post_delete, sender=DailyHistoryMessage, dispatch_uid="core.homepage_history_post_delete")
+@receiver(post_save, sender=EncouragementMessage, dispatch_uid="core.homepage_encouragement_post_save")
+@receiver(post_delete, sender=EncouragementMessage, dispatch_uid="core.homepage_encouragement_post_delete")
+@receiver(post_save, sender=HolidayMessage, dispatch_uid="core.homepage_holiday_post_save")
+@receiver(post_delete, sender=HolidayMessage, dispatch_uid="core.homepage_holiday_post_delete")
+def bump_homepage_content_version(sender, instance, **kwargs):
+    """首页文案变化后使按天片段与进程内的通用文案抽样器失效（事务提交后递增版本号）。"""
+    transaction.on_commit(homepage_cache.bump_content_version)
@@ -0,0 +1,72 @@
+"""
+标签使用次数（Tag.usage_count）的增量维护。
+
+画作与标签的关联变化（m2m_changed）及画作删除时用 F() 表达式原子增减，
+标签列表可直接按使用次数排序，删除标签时无需统计关联画作。
+通过 bulk_create、直接 SQL 修改关联表时不会触发维护，可运行
+reconcile_tag_usage_counts 管理命令校正。
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, Optional
+
+from django.db.models import Case, Count, F, Value, When
+
+from core.models import Tag, UserUpload
+
+UploadTag = UserUpload.tags.through
+
+
+def adjust(deltas: Dict[int, int]) -> None:
+    """按 {标签ID: 增量} 调整使用次数（减少时不低于 0）。"""
+    by_delta: Dict[int, list] = {}
+    for tag_id, delta in deltas.items():
+        if delta:
+            by_delta.setdefault(delta, []).append(tag_id)
+    for delta, tag_ids in by_delta.items():
+        if delta > 0:
+            expression = F("usage_count") + delta
+        else:
+            # usage_count 在 MySQL 上是 INT UNSIGNED，减出负数会直接报错（1690），
+            # 不能先减再取 Greatest；次数不足时（计数漂移）直接置 0
+            expression = Case(
+                When(usage_count__gte=-delta, then=F("usage_count") + delta),
+                default=Value(0),
+            )
+        Tag.objects.filter(pk__in=tag_ids).update(usage_count=expression)
+
+
+def linked_tag_ids(upload_id: int, tag_ids: Optional[Iterable[int]] = None) -> list[int]:
+    """画作当前关联的标签ID（可限定在 tag_ids 范围内）。"""
+    links = UploadTag.objects.filter(userupload_id=upload_id)
+    if tag_ids is not None:
+        links = links.filter(tag_id__in=list(tag_ids))
+    return list(links.values_list("tag_id", flat=True))
+
+
+def count_linked_uploads(tag_id: int, upload_ids: Optional[Iterable[int]] = None) -> int:
+    """标签当前关联的画作数量（可限定在 upload_ids 范围内）。"""
+    links = UploadTag.objects.filter(tag_id=tag_id)
+    if upload_ids is not None:
+        links = links.filter(userupload_id__in=list(upload_ids))
+    return links.count()
+
+
+def count_shared_tag_links(user_id: int) -> Dict[int, int]:
+    """用户画作关联的、不属于该用户的标签（预设标签）：{标签ID: 关联画作数}。"""
+    return dict(
+        UploadTag.objects.filter(userupload__user_id=user_id)
+        .exclude(tag__user_id=user_id)
+        .values("tag_id")
+        .annotate(count=Count("id"))
+        .order_by()
+        .values_list("tag_id", "count")
+    )
+
+
+def compute_usage_counts(tag_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+    """从关联表重新统计使用次数：{标签ID: 次数}（只包含次数大于 0 的标签）。"""
+    links = UploadTag.objects.all()
+    if tag_ids is not None:
+        links = links.filter(tag_id__in=list(tag_ids))
+    return dict(links.values("tag_id").annotate(count=Count("id")).order_by().values_list("tag_id", "count"))
@@ -0,0 +1,125 @@
+"""
+短期目标任务完成记录接口的响应缓存。
+
+提供：
+- 按日期分组的任务完成记录（一次 select_related 查询）
+- 响应缓存：键包含目标ID、目标修改时间与用户的完成记录版本号
+- 版本号：任务完成记录新增/删除、上传记录修改/删除时递增，使旧响应自动失效
+
+缓存中只保存上传ID与图片文件名，图片链接在读取时生成：TOS 直链带签名、有效期短于缓存时间，
+代理链接依赖当前请求的令牌。
+"""
+from __future__ import annotations
+
+import uuid
+from typing import Any, Dict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.models import ShortTermGoal, ShortTermGoalTaskCompletion
+from core.serializers import DEFERRED_IMAGE_KEY, build_upload_image_url
+
+# 缓存键前缀
+CACHE_PREFIX = "task_completions"
+# 响应缓存保留时间（秒）
+RESPONSE_TTL = 24 * 60 * 60
+# 缓存数据格式版本：格式变化时递增，避免读取旧格式的缓存
+PAYLOAD_FORMAT = 2
+
+
+def _version_key(user_id: int) -> str:
+    return f"{CACHE_PREFIX}:version:{user_id}"
+
+
+def get_version(user_id: int) -> str:
+    """获取用户的完成记录版本号，版本号丢失时生成新的随机版本号。"""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(user_id: int) -> None:
+    """
+    在当前事务提交后递增用户的完成记录版本号，使该用户所有目标的响应缓存失效。
+
+    提交后再递增，避免并发请求在提交前读到旧数据并写入新版本的缓存。
+    """
+    transaction.on_commit(lambda: cache.set(_version_key(user_id), uuid.uuid4().hex, None))
+
+
+def _response_key(goal: ShortTermGoal) -> str:
+    updated_at = goal.updated_at.timestamp() if goal.updated_at else 0
+    return f"{CACHE_PREFIX}:response:v{PAYLOAD_FORMAT}:{goal.user_id}:{goal.pk}:{updated_at}:{get_version(goal.user_id)}"
+
+
+def build_payload(goal: ShortTermGoal) -> Dict[str, Any]:
+    """
+    按日期和任务ID组织目标的任务完成记录。
+
+    每天的打卡时间使用当天最早的任务完成记录创建时间（而不是DailyCheckIn的时间）。
+    """
+    completions = (
+        ShortTermGoalTaskCompletion.objects.filter(goal=goal)
+        .select_related("upload")
+        .only(
+            "date",
+            "task_id",
+            "created_at",
+            "upload__id",
+            "upload__title",
+            "upload__image",
+            "upload__uploaded_at",
+        )
+        .order_by("date", "task_id")
+    )
+
+    result: Dict[str, Dict[str, Any]] = {}
+    earliest = {}
+    for completion in completions:
+        date_key = completion.date.isoformat()
+        day = result.setdefault(date_key, {})
+        if date_key not in earliest or completion.created_at < earliest[date_key]:
+            earliest[date_key] = completion.created_at
+
+        upload = completion.upload
+        day[completion.task_id] = {
+            "id": upload.id,
+            "title": upload.title,
+            DEFERRED_IMAGE_KEY: upload.image.name or None,
+            "uploaded_at": upload.uploaded_at.isoformat(),
+        }
+
+    return {
+        "completions": result,
+        "checkin_times": {date_key: created_at.isoformat() for date_key, created_at in earliest.items()},
+    }
+
+
+def render_payload(payload: Dict[str, Any], request=None) -> Dict[str, Any]:
+    """为缓存的响应生成图片链接（不修改缓存中的数据）。"""
+    completions = {}
+    for date_key, tasks in payload["completions"].items():
+        day = completions[date_key] = {}
+        for task_id, item in tasks.items():
+            image_name = item[DEFERRED_IMAGE_KEY]
+            day[task_id] = {
+                "id": item["id"],
+                "title": item["title"],
+                "image": build_upload_image_url(item["id"], image_name, request) if image_name else None,
+                "uploaded_at": item["uploaded_at"],
+            }
+    return {"completions": completions, "checkin_times": payload["checkin_times"]}
+
+
+def get_payload(goal: ShortTermGoal, request=None) -> Dict[str, Any]:
+    """获取目标的任务完成记录响应（优先读取缓存）。"""
+    key = _response_key(goal)
+    payload = cache.get(key)
+    if payload is None:
+        payload = build_payload(goal)
+        cache.set(key, payload, RESPONSE_TTL)
+    return render_payload(payload, request)
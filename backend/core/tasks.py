@@ -2,18 +2,25 @@
 Celery 任务定义
 """
 import logging
-from typing import Dict, Any
+from datetime import timedelta
+from typing import Dict, Any, Optional
 
-from celery import shared_task
+from celery import group, shared_task
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
 from django.utils import timezone
 
-from core.models import ImageAnalysisTask
+from core.models import ImageAnalysisTask, ReportGenerationRun
 from core.image_analysis import analyze_image_simplified
 
 logger = logging.getLogger(__name__)
 User = get_user_model()
 
+# 运行记录停留在"生成中"超过该时长时视为中断，允许重新认领
+REPORT_RUN_STALE_AFTER = timedelta(hours=6)
+
 
 @shared_task(
     bind=True,
@@ -183,3 +190,238 @@ def analyze_image_comprehensive_task(self, result_id: int, image_url: str, user_
         
         # 重新抛出异常，让 Celery 知道任务失败
         raise
+
+
+@shared_task(
+    name="core.tasks.generate_monthly_report_chunk_task",
+    soft_time_limit=600,
+    time_limit=720,
+)
+def generate_monthly_report_chunk_task(user_ids: list, year: int, month: int, force: bool = False) -> Dict[str, Any]:
+    """
+    为一批用户生成月报（批量模式下由 Celery group 分发）
+    
+    Args:
+        user_ids: 本批次的用户ID列表
+        year: 年份
+        month: 月份
+        force: 是否覆盖已存在的月报
+    
+    Returns:
+        本批次统计：generated / skipped / failed / elapsed
+    """
+    from core.monthly_reports import generate_reports_for_users
+    
+    return generate_reports_for_users(user_ids, year, month, force=force)
+
+
+def _claim_report_run(year: int, month: int, task_id: str) -> Optional[ReportGenerationRun]:
+    """
+    认领指定月份的月报生成运行记录
+    
+    - 首次运行：创建记录
+    - 上次运行失败或中断（超时未完成）：重置计数后重新认领
+    - 正在运行或已完成：返回 None（定时任务重复触发时直接跳过）
+    """
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            return ReportGenerationRun.objects.create(
+                year=year, month=month, task_id=task_id, started_at=now
+            )
+    except IntegrityError:
+        pass
+    
+    # 条件更新保证并发触发时只有一个任务认领成功
+    claimed = ReportGenerationRun.objects.filter(
+        Q(status=ReportGenerationRun.STATUS_FAILED)
+        | Q(status=ReportGenerationRun.STATUS_RUNNING, started_at__lt=now - REPORT_RUN_STALE_AFTER),
+        year=year,
+        month=month,
+    ).update(
+        status=ReportGenerationRun.STATUS_RUNNING,
+        task_id=task_id,
+        total_users=0,
+        users_done=0,
+        users_failed=0,
+        error_message="",
+        started_at=now,
+        finished_at=None,
+    )
+    if not claimed:
+        return None
+    return ReportGenerationRun.objects.get(year=year, month=month)
+
+
+def _finish_report_run_if_complete(run_id: int) -> None:
+    """所有用户处理完毕后将运行记录标记为已完成"""
+    ReportGenerationRun.objects.filter(
+        pk=run_id,
+        status=ReportGenerationRun.STATUS_RUNNING,
+        total_users__lte=F("users_done") + F("users_failed"),
+    ).update(status=ReportGenerationRun.STATUS_COMPLETED, finished_at=timezone.now())
+
+
+@shared_task(
+    bind=True,
+    name="core.tasks.generate_monthly_reports_task",
+)
+def generate_monthly_reports_task(self, year: Optional[int] = None, month: Optional[int] = None) -> Dict[str, Any]:
+    """
+    定时生成月报（每月1号由 Celery Beat 触发，默认生成上个月的月报）
+    
+    为每个需要生成月报的用户分发一个限流的子任务，进度记录在 ReportGenerationRun 中。
+    同一月份重复触发时，已在运行或已完成的月份会被跳过。
+    
+    Args:
+        self: Celery任务实例（使用bind=True时自动传递）
+        year: 年份（默认上个月）
+        month: 月份（默认上个月）
+    
+    Returns:
+        运行摘要：status / run_id / total_users
+    """
+    from core.monthly_reports import get_previous_month, get_report_user_ids
+    from core.views import get_today_shanghai
+    
+    if year is None or month is None:
+        year, month = get_previous_month(get_today_shanghai())
+    
+    run = _claim_report_run(year, month, self.request.id or "")
+    if run is None:
+        logger.info(f"{year}年{month}月的月报已在生成或已完成，跳过")
+        return {"status": "skipped", "run_id": None, "total_users": 0}
+    
+    try:
+        user_ids = get_report_user_ids(year, month)
+        ReportGenerationRun.objects.filter(pk=run.pk).update(total_users=len(user_ids))
+        logger.info(f"开始生成 {year}年{month}月的月报: 运行 {run.pk}, 用户数 {len(user_ids)}")
+        
+        if not user_ids:
+            _finish_report_run_if_complete(run.pk)
+        else:
+            group(
+                generate_user_monthly_report_task.s(run.pk, user_id, year, month)
+                for user_id in user_ids
+            ).apply_async()
+    except Exception as e:
+        logger.exception(f"分发月报生成任务失败: 运行 {run.pk}")
+        ReportGenerationRun.objects.filter(pk=run.pk).update(
+            status=ReportGenerationRun.STATUS_FAILED,
+            error_message=str(e),
+            finished_at=timezone.now(),
+        )
+        raise
+    
+    return {"status": "dispatched", "run_id": run.pk, "total_users": len(user_ids)}
+
+
+@shared_task(
+    name="core.tasks.generate_user_monthly_report_task",
+    rate_limit=settings.MONTHLY_REPORT_TASK_RATE_LIMIT,
+)
+def generate_user_monthly_report_task(run_id: int, user_id: int, year: int, month: int) -> bool:
+    """
+    为单个用户生成月报，并累加所属运行记录的进度
+    
+    已存在的月报会被跳过，因此重复执行是安全的。
+    
+    Returns:
+        是否生成成功
+    """
+    from core.monthly_reports import generate_reports_for_users
+    
+    try:
+        succeeded = generate_reports_for_users([user_id], year, month)["failed"] == 0
+    except Exception:
+        logger.exception(f"生成月报失败: user={user_id}, {year}-{month:02d}")
+        succeeded = False
+    
+    counter = "users_done" if succeeded else "users_failed"
+    ReportGenerationRun.objects.filter(pk=run_id).update(**{counter: F(counter) + 1})
+    _finish_report_run_if_complete(run_id)
+    return succeeded
+
+
+@shared_task(
+    bind=True,
+    name="core.tasks.generate_monthly_report_for_user_task",
+)
+def generate_monthly_report_for_user_task(self, user_id: int, year: int, month: int) -> bool:
+    """
+    按需生成单个用户的月报（月报接口发现月报不存在时入队）
+    
+    任务ID即月报任务ID，执行状态写入缓存供进度接口查询。
+    
+    Returns:
+        是否生成成功
+    """
+    from core import monthly_report_jobs
+    from core.monthly_reports import generate_reports_for_users
+    
+    job_id = self.request.id
+    monthly_report_jobs.set_job_status(job_id, monthly_report_jobs.STATUS_RUNNING)
+    try:
+        stats = generate_reports_for_users([user_id], year, month)
+        if stats["failed"]:
+            monthly_report_jobs.set_job_status(job_id, monthly_report_jobs.STATUS_FAILURE, "生成月报失败")
+            return False
+        monthly_report_jobs.set_job_status(job_id, monthly_report_jobs.STATUS_SUCCESS)
+        return True
+    except Exception as e:
+        logger.exception(f"按需生成月报失败: user={user_id}, {year}-{month:02d}")
+        monthly_report_jobs.set_job_status(job_id, monthly_report_jobs.STATUS_FAILURE, str(e))
+        return False
+    finally:
+        monthly_report_jobs.release_lock(user_id, year, month)
+
+
+@shared_task(name="core.tasks.sweep_short_term_goal_statuses_task")
+def sweep_short_term_goal_statuses_task() -> Dict[str, int]:
+    """
+    定时批量更新短期目标状态（完成所有打卡天数或期限已到的目标标记为已完成）
+    
+    Returns:
+        本次扫描统计：completed / expired
+    """
+    from core.short_term_goal_status import sweep_short_term_goal_statuses
+    
+    return sweep_short_term_goal_statuses()
+
+
+@shared_task(name="core.tasks.purge_upload_tombstones_task")
+def purge_upload_tombstones_task() -> int:
+    """
+    定时清理超过保留期的上传墓碑记录
+    
+    Returns:
+        清理的墓碑记录数
+    """
+    from core.upload_sync import purge_expired_tombstones
+    
+    return purge_expired_tombstones()
+
+
+@shared_task(name="core.tasks.flush_auth_token_last_used_task")
+def flush_auth_token_last_used_task() -> int:
+    """
+    定时将合并后的令牌最近使用时间批量写入数据库
+    
+    Returns:
+        更新的令牌数
+    """
+    from core.auth_token_cache import flush_last_used
+    
+    return flush_last_used()
+
+
+@shared_task(name="core.tasks.record_login_attempt_task")
+def record_login_attempt_task(email: str, ip_address: str, success: bool, attempted_at: str) -> None:
+    """
+    写入登录尝试的审计记录（登录请求中异步投递）
+    """
+    from datetime import datetime
+
+    from core.rate_limit import save_login_attempt
+
+    save_login_attempt(email, ip_address, success, datetime.fromisoformat(attempted_at))
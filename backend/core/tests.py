@@ -1,13 +1,68 @@
 from __future__ import annotations
 
-from datetime import date
+import json
+import os
+import gzip
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.db import OperationalError, connection, transaction
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
 
-from core.models import AuthToken, DailyHistoryMessage, TestAccountProfile
+from config.middleware import ResponseCompressionMiddleware
+from config.renderers import ORJSONParser, ORJSONRenderer
+
+from core.authentication import AuthTokenAuthentication
+from core.check_in_stats import get_check_in_stats_bulk
+from core.goal_progress import compute_goal_progress, get_stored_progress
+from core.models import (
+    AuthToken,
+    DailyCheckIn,
+    DailyHistoryMessage,
+    EmailVerification,
+    EncouragementMessage,
+    HolidayMessage,
+    LoginAttempt,
+    LongTermGoal,
+    Mood,
+    ShortTermGoal,
+    ShortTermGoalTaskCompletion,
+    Tag,
+    TestAccountProfile,
+    UserStats,
+    UserUpload,
+)
+from core.views import get_today_shanghai
+from core.weighted_sampling import AliasSampler
+
+LOCMEM_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "echo-tests",
+    }
+}
 
 
 class AdminApiTests(APITestCase):
@@ -77,3 +132,2049 @@ class AdminApiTests(APITestCase):
         response = self.client.post(checkin_url, payload, format="json", **self.staff_headers)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
         self.assertEqual(profile.user.daily_checkins.count(), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class HomepageMessagesCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        user_model = get_user_model()
+        self.staff_user = user_model.objects.create_user(
+            username="staff@example.com",
+            email="staff@example.com",
+            password="SuperSecret123",
+            is_staff=True,
+        )
+        staff_token = AuthToken.issue_for_user(self.staff_user)
+        self.staff_headers = {"HTTP_AUTHORIZATION": f"Token {staff_token}"}
+        # 迁移中预置了文案数据，停用后再写入可预期的测试数据
+        for model in (DailyHistoryMessage, EncouragementMessage, HolidayMessage):
+            model.objects.update(is_active=False)
+        today = get_today_shanghai()
+        HolidayMessage.objects.create(month=today.month, day=today.day, headline="节日", text="节日快乐")
+        EncouragementMessage.objects.create(text="继续加油", weight=3)
+
+    def test_daily_fragments_cached_after_first_request(self):
+        url = reverse("core:homepage-messages")
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(first.json()["holiday"], {"headline": "节日", "text": "节日快乐"})
+        self.assertEqual(first.json()["general"], "继续加油")
+
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(second.json(), first.json())
+
+    def test_admin_write_bumps_content_version(self):
+        url = reverse("core:homepage-messages")
+        self.assertIsNone(self.client.get(url).json()["history"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("core:admin-home-history-list"),
+                {"date": get_today_shanghai().isoformat(), "text": "历史上的今天", "is_active": True},
+                format="json",
+                **self.staff_headers,
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.content)
+        self.assertEqual(self.client.get(url).json()["history"], {"headline": None, "text": "历史上的今天"})
+
+    def test_model_changes_outside_api_bump_content_version(self):
+        """Django admin、shell 等直接保存模型时同样使片段与通用文案抽样器失效。"""
+        url = reverse("core:homepage-messages")
+        self.assertEqual(self.client.get(url).json()["general"], "继续加油")
+
+        message = EncouragementMessage.objects.get(text="继续加油")
+        with self.captureOnCommitCallbacks(execute=True):
+            message.text = "今天也要画画"
+            message.save()
+        self.assertEqual(self.client.get(url).json()["general"], "今天也要画画")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            HolidayMessage.objects.filter(is_active=True).get().delete()
+        self.assertIsNone(self.client.get(url).json()["holiday"])
+
+
+class AliasSamplerTests(SimpleTestCase):
+    def test_empirical_distribution_matches_weights(self):
+        weights = {"a": 1, "b": 2, "c": 3, "d": 10, "e": 0}
+        sampler = AliasSampler(list(weights), list(weights.values()))
+        rng = random.Random(20240501)
+        draws = 200_000
+        counts = Counter(sampler.sample(rng) for _ in range(draws))
+
+        total_weight = sum(weights.values())
+        chi_square = 0.0
+        for item, weight in weights.items():
+            expected = draws * weight / total_weight
+            if expected == 0:
+                self.assertEqual(counts[item], 0)
+                continue
+            chi_square += (counts[item] - expected) ** 2 / expected
+        # 自由度为 3，p=0.001 时的临界值约为 16.27
+        self.assertLess(chi_square, 16.27)
+
+    def test_single_item_always_selected(self):
+        sampler = AliasSampler(["only"], [5])
+        self.assertEqual({sampler.sample() for _ in range(100)}, {"only"})
+
+    def test_rejects_invalid_weights(self):
+        with self.assertRaises(ValueError):
+            AliasSampler([], [])
+        with self.assertRaises(ValueError):
+            AliasSampler(["a", "b"], [0, 0])
+        with self.assertRaises(ValueError):
+            AliasSampler(["a"], [1, 2])
+
+
+class GoalsCalendarTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="painter@example.com",
+            email="painter@example.com",
+            password="Password123",
+        )
+        token = AuthToken.issue_for_user(self.user)
+        self.headers = {"HTTP_AUTHORIZATION": f"Token {token}"}
+        # UTC 3月31日 17:00 = 上海 4月1日 01:00；同一上海日再上传一次
+        for hour in (17, 20):
+            UserUpload.objects.create(
+                user=self.user,
+                uploaded_at=datetime(2024, 3, 31, hour, 0, tzinfo=dt_timezone.utc),
+            )
+
+    @staticmethod
+    def _status_by_date(month_payload):
+        return {day["date"]: day["status"] for day in month_payload["days"]}
+
+    def test_upload_bucketed_by_shanghai_date(self):
+        response = self.client.get(
+            reverse("core:goals-calendar"), {"year": 2024, "month": 4}, **self.headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        statuses = self._status_by_date(response.json())
+        self.assertEqual(statuses["2024-04-01"], "upload")
+        self.assertEqual(statuses["2024-03-31"], "none")
+        self.assertEqual(response.json()["summary"]["upload_days"], 1)
+
+    def test_range_returns_consecutive_months_with_two_queries(self):
+        with self.assertNumQueries(3):  # 鉴权（最近使用时间由定时任务合并写入） + 打卡 + 上传
+            response = self.client.get(
+                reverse("core:goals-calendar-range"),
+                {"year": 2024, "month": 3, "months": 2},
+                **self.headers,
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        months = response.json()["months"]
+        self.assertEqual([(m["year"], m["month"]) for m in months], [(2024, 3), (2024, 4)])
+        single = self.client.get(
+            reverse("core:goals-calendar"), {"year": 2024, "month": 4}, **self.headers
+        ).json()
+        self.assertEqual(months[1], single)
+
+    def test_range_rejects_too_many_months(self):
+        response = self.client.get(
+            reverse("core:goals-calendar-range"), {"months": 13}, **self.headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UserUploadLocalDateTests(APITestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="local@example.com",
+            email="local@example.com",
+            password="Password123",
+        )
+
+    def test_local_date_follows_uploaded_at(self):
+        upload = UserUpload.objects.create(
+            user=self.user,
+            uploaded_at=datetime(2024, 3, 31, 16, 30, tzinfo=dt_timezone.utc),
+        )
+        self.assertEqual(upload.local_date, date(2024, 4, 1))
+
+        upload.uploaded_at = datetime(2024, 3, 31, 15, 30, tzinfo=dt_timezone.utc)
+        upload.save(update_fields=["uploaded_at"])
+        upload.refresh_from_db()
+        self.assertEqual(upload.local_date, date(2024, 3, 31))
+
+    def test_backfill_command_repairs_rows_written_without_save(self):
+        upload = UserUpload.objects.create(
+            user=self.user,
+            uploaded_at=datetime(2024, 5, 1, 18, 0, tzinfo=dt_timezone.utc),
+        )
+        UserUpload.objects.filter(pk=upload.pk).update(local_date=None)
+
+        call_command("backfill_upload_local_date", stdout=StringIO())
+        upload.refresh_from_db()
+        self.assertEqual(upload.local_date, date(2024, 5, 2))
+
+
+class CheckInStatsBulkTests(APITestCase):
+    today = date(2024, 6, 15)
+
+    @staticmethod
+    def _reference_stats(dates, today):
+        if not dates:
+            return {"checked_today": False, "current_streak": 0, "total_checkins": 0, "latest_checkin": None}
+        latest = max(dates)
+        streak = 0
+        cursor = latest
+        while cursor in dates:
+            streak += 1
+            cursor -= timedelta(days=1)
+        return {
+            "checked_today": today in dates,
+            "current_streak": streak,
+            "total_checkins": len(dates),
+            "latest_checkin": latest.isoformat(),
+        }
+
+    def test_matches_reference_for_random_calendars(self):
+        rng = random.Random(7)
+        user_model = get_user_model()
+        expected = {}
+        for index in range(6):
+            user = user_model.objects.create_user(
+                username=f"bulk{index}@example.com",
+                email=f"bulk{index}@example.com",
+                password="Password123",
+            )
+            offsets = rng.sample(range(0, 40), rng.randint(0, 15)) if index else []
+            checkin_days = {self.today - timedelta(days=o) for o in offsets[::2]}
+            upload_days = {self.today - timedelta(days=o) for o in offsets[1::2]}
+            for day in checkin_days:
+                DailyCheckIn.objects.create(user=user, date=day)
+            for day in upload_days:
+                # 上海时间当天 08:30 = UTC 00:30
+                UserUpload.objects.create(
+                    user=user,
+                    uploaded_at=datetime(day.year, day.month, day.day, 0, 30, tzinfo=dt_timezone.utc),
+                )
+            expected[user.id] = self._reference_stats(checkin_days | upload_days, self.today)
+
+        with self.assertNumQueries(2):
+            stats = get_check_in_stats_bulk(list(expected), today=self.today)
+        self.assertEqual(stats, expected)
+
+    def test_update_user_stats_command_upserts_in_batches(self):
+        user_model = get_user_model()
+        users = [
+            user_model.objects.create_user(
+                username=f"stats{index}@example.com",
+                email=f"stats{index}@example.com",
+                password="Password123",
+            )
+            for index in range(3)
+        ]
+        DailyCheckIn.objects.create(user=users[0], date=get_today_shanghai())
+
+        call_command("update_user_stats", "--force", "--batch-size", "2", stdout=StringIO())
+        call_command("update_user_stats", "--force", "--batch-size", "2", stdout=StringIO())
+
+        self.assertEqual(UserStats.objects.filter(user__in=users).count(), 3)
+        stats = UserStats.objects.get(user=users[0])
+        self.assertEqual(stats.total_checkins, 1)
+        self.assertTrue(stats.checked_today)
+
+    def test_update_for_users_without_conflict_target(self):
+        """MySQL 不支持指定冲突目标：unique_fields 为空时按唯一约束匹配（用 SQLite 的无目标 upsert 模拟）。"""
+        from core.db_utils import conflict_target
+        from core.user_stats_cache import update_for_users
+
+        user = get_user_model().objects.create_user(
+            username="stats-mysql@example.com", email="stats-mysql@example.com", password="Password123"
+        )
+        update_for_users([user])
+        DailyCheckIn.objects.create(user=user, date=get_today_shanghai())
+
+        def on_conflict_suffix_sql(fields, on_conflict, update_fields, unique_fields):
+            self.assertEqual(list(unique_fields), [])
+            updates = ", ".join(f"{field} = EXCLUDED.{field}" for field in map(connection.ops.quote_name, update_fields))
+            return f"ON CONFLICT DO UPDATE SET {updates}"
+
+        with mock.patch.object(connection.features, "supports_update_conflicts_with_target", False), \
+                mock.patch.object(connection.ops, "on_conflict_suffix_sql", side_effect=on_conflict_suffix_sql):
+            self.assertIsNone(conflict_target(["user"]))
+            update_for_users([user])
+
+        stats = UserStats.objects.get(user=user)
+        self.assertEqual(stats.total_checkins, 1)
+
+
+GOLDEN_DIR = Path(__file__).resolve().parent / "test_data"
+
+
+def _shanghai(year, month, day, hour, minute=0):
+    """构造上海时区时间（UTC+8）对应的 UTC 时间。"""
+    return datetime(year, month, day, hour, minute, tzinfo=dt_timezone.utc) - timedelta(hours=8)
+
+
+def seed_monthly_report_uploads(user):
+    """为月报测试写入 2024 年 4 月前后的上传数据（覆盖跨月、跨零点、并列标签等情况）。"""
+    sketch = Tag.objects.create(user=user, name="速写", display_order=10)
+    paint = Tag.objects.create(user=user, name="厚涂", display_order=20)
+    practice = Tag.objects.create(user=user, name="日常", display_order=5)
+    rows = [
+        # (上海时间, 时长, 自评分, 标签)
+        (_shanghai(2024, 3, 31, 23, 50), 20, 70, [sketch]),  # 上月，不计入
+        (_shanghai(2024, 4, 1, 0, 30), 30, 80, [sketch]),
+        (_shanghai(2024, 4, 1, 10), None, 0, [sketch, practice]),
+        (_shanghai(2024, 4, 2, 23, 30), 90, 60, [paint]),
+        (_shanghai(2024, 4, 3, 8), 45, None, []),
+        (_shanghai(2024, 4, 10, 9), 60, 90, [paint, practice]),
+        (_shanghai(2024, 4, 10, 14), 15, 40, [sketch]),
+        (_shanghai(2024, 4, 10, 21, 15), 120, 75, [practice]),
+        (_shanghai(2024, 4, 20, 7), 50, 55, [paint]),
+        (_shanghai(2024, 4, 20, 18), 10, None, [sketch]),
+        (_shanghai(2024, 4, 28, 12), 35, 65, []),
+        (_shanghai(2024, 4, 29, 1), 25, 85, [practice]),
+        (_shanghai(2024, 4, 30, 23, 59), 40, 95, [paint]),
+        (_shanghai(2024, 5, 1, 0, 10), 30, 50, [sketch]),  # 下月，不计入
+    ]
+    uploads = []
+    for uploaded_at, duration, rating, tags in rows:
+        upload = UserUpload.objects.create(
+            user=user,
+            uploaded_at=uploaded_at,
+            duration_minutes=duration,
+            self_rating=rating,
+        )
+        upload.tags.set(tags)
+        uploads.append(upload)
+    return uploads
+
+
+def enable_celery_eager(testcase):
+    """在测试期间让 Celery 任务同步执行（等同 CELERY_TASK_ALWAYS_EAGER=True）。"""
+    from config.celery import app as celery_app
+
+    previous = {
+        "task_always_eager": celery_app.conf.task_always_eager,
+        "task_eager_propagates": celery_app.conf.task_eager_propagates,
+    }
+    celery_app.conf.update(task_always_eager=True, task_eager_propagates=True)
+    testcase.addCleanup(celery_app.conf.update, **previous)
+
+
+class MonthlyReportGoldenTests(APITestCase):
+    """月报统计与金标准文件逐字节比对（金标准按中国时区计算）。"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="report@example.com",
+            email="report@example.com",
+            password="Password123",
+        )
+        self.uploads = seed_monthly_report_uploads(self.user)
+
+    def _render(self, report_data):
+        # 上传 ID 与数据库自增值有关，替换为种子数据中的序号
+        positions = {upload.id: index for index, upload in enumerate(self.uploads)}
+        report_data = dict(report_data)
+        report_data["upload_ids"] = [positions[upload_id] for upload_id in report_data["upload_ids"]]
+        return json.dumps(report_data, cls=DjangoJSONEncoder, ensure_ascii=False, indent=2) + "\n"
+
+    def _assert_matches_golden(self, name, year, month):
+        from core.management.commands.generate_monthly_report import Command
+
+        with mock.patch.dict(os.environ, {"MOCK_DATE": "2024-05-01"}):
+            rendered = self._render(Command()._generate_report_data(self.user, year, month))
+        golden_path = GOLDEN_DIR / name
+        if os.getenv("UPDATE_GOLDEN"):
+            golden_path.write_text(rendered, encoding="utf-8")
+        self.assertEqual(rendered, golden_path.read_text(encoding="utf-8"))
+
+    def test_report_with_uploads_matches_golden(self):
+        self._assert_matches_golden("monthly_report_2024_04.json", 2024, 4)
+
+    def test_empty_month_matches_golden(self):
+        self._assert_matches_golden("monthly_report_2024_02.json", 2024, 2)
+
+    def test_query_count_independent_of_upload_count(self):
+        from core.monthly_reports import generate_report_data
+
+        with self.assertNumQueries(7):
+            generate_report_data(self.user, 2024, 4)
+
+
+class MonthlyReportBulkTests(APITestCase):
+    """批量模式生成月报：批量写入、断点续跑与强制覆盖。"""
+
+    def setUp(self):
+        User = get_user_model()
+        self.users = [
+            User.objects.create_user(
+                username=f"bulk{index}@example.com",
+                email=f"bulk{index}@example.com",
+                password="Password123",
+            )
+            for index in range(3)
+        ]
+        for user in self.users:
+            seed_monthly_report_uploads(user)
+
+    def _run(self, *args):
+        out = StringIO()
+        with mock.patch.dict(os.environ, {"MOCK_DATE": "2024-05-01"}):
+            call_command(
+                "generate_monthly_report", "--bulk", "--chunk-size", "2", *args, stdout=out
+            )
+        return out.getvalue()
+
+    def test_bulk_generates_reports_matching_single_user_path(self):
+        from core.models import MonthlyReport
+        from core.monthly_reports import generate_report_data
+
+        output = self._run()
+
+        self.assertIn("批次 1/2", output)
+        self.assertIn("批次 2/2", output)
+        self.assertEqual(MonthlyReport.objects.filter(year=2024, month=4).count(), 3)
+        report = MonthlyReport.objects.get(user=self.users[0], year=2024, month=4)
+        with mock.patch.dict(os.environ, {"MOCK_DATE": "2024-05-01"}):
+            expected = generate_report_data(self.users[0], 2024, 4)
+        self.assertEqual(report.upload_ids, expected["upload_ids"])
+        self.assertEqual(report.tag_stats, expected["tag_stats"])
+
+    def test_rerun_skips_existing_and_force_overwrites(self):
+        from core.models import MonthlyReport
+
+        self._run()
+        MonthlyReport.objects.filter(user=self.users[1]).delete()
+        MonthlyReport.objects.filter(user=self.users[0]).update(total_uploads=0)
+
+        self._run()
+        self.assertEqual(MonthlyReport.objects.filter(year=2024, month=4).count(), 3)
+        self.assertEqual(MonthlyReport.objects.get(user=self.users[0]).total_uploads, 0)
+
+        self._run("--force")
+        self.assertGreater(MonthlyReport.objects.get(user=self.users[0]).total_uploads, 0)
+
+
+class GenerateMonthlyReportsTaskTests(APITestCase):
+    """定时月报任务：在 Celery 同步执行模式下分发子任务并记录运行状态。"""
+
+    def setUp(self):
+        enable_celery_eager(self)
+
+        User = get_user_model()
+        self.users = [
+            User.objects.create_user(
+                username=f"beat{index}@example.com",
+                email=f"beat{index}@example.com",
+                password="Password123",
+            )
+            for index in range(2)
+        ]
+        for user in self.users:
+            seed_monthly_report_uploads(user)
+
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+    def test_generates_reports_and_records_run(self):
+        from core.models import MonthlyReport, ReportGenerationRun
+        from core.tasks import generate_monthly_reports_task
+
+        with mock.patch.dict(os.environ, {"MOCK_DATE": "2024-05-01"}):
+            result = generate_monthly_reports_task.delay().get()
+
+        self.assertEqual(result["status"], "dispatched")
+        self.assertEqual(MonthlyReport.objects.filter(year=2024, month=4).count(), 2)
+        run = ReportGenerationRun.objects.get(year=2024, month=4)
+        self.assertEqual(run.status, ReportGenerationRun.STATUS_COMPLETED)
+        self.assertEqual((run.total_users, run.users_done, run.users_failed), (2, 2, 0))
+        self.assertIsNotNone(run.finished_at)
+
+    @override_settings(CELERY_TASK_ALWAYS_EAGER=True)
+    def test_second_beat_fire_is_skipped_and_failed_run_is_retried(self):
+        from core.models import MonthlyReport, ReportGenerationRun
+        from core.tasks import generate_monthly_reports_task
+
+        generate_monthly_reports_task.delay(2024, 4).get()
+        MonthlyReport.objects.filter(user=self.users[0]).delete()
+
+        result = generate_monthly_reports_task.delay(2024, 4).get()
+        self.assertEqual(result["status"], "skipped")
+        self.assertFalse(MonthlyReport.objects.filter(user=self.users[0]).exists())
+
+        ReportGenerationRun.objects.filter(year=2024, month=4).update(
+            status=ReportGenerationRun.STATUS_FAILED
+        )
+        generate_monthly_reports_task.delay(2024, 4).get()
+        run = ReportGenerationRun.objects.get(year=2024, month=4)
+        self.assertEqual(run.status, ReportGenerationRun.STATUS_COMPLETED)
+        self.assertEqual(run.users_done, 2)
+        self.assertTrue(MonthlyReport.objects.filter(user=self.users[0]).exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES, CELERY_ENABLED=True, CELERY_TASK_ALWAYS_EAGER=True)
+class MonthlyReportOnDemandTests(APITestCase):
+    """月报不存在时在后台生成：返回 202 与任务ID，完成后返回已保存的月报。"""
+
+    def setUp(self):
+        cache.clear()
+        enable_celery_eager(self)
+        self.user = get_user_model().objects.create_user(
+            username="ondemand@example.com",
+            email="ondemand@example.com",
+            password="Password123",
+        )
+        seed_monthly_report_uploads(self.user)
+        token = AuthToken.issue_for_user(self.user)
+        self.headers = {"HTTP_AUTHORIZATION": f"Token {token}"}
+
+    def _get_report(self):
+        with mock.patch.dict(os.environ, {"MOCK_DATE": "2024-05-01"}):
+            return self.client.get(
+                reverse("core:monthly-report"), {"year": 2024, "month": 4}, **self.headers
+            )
+
+    def test_missing_report_is_generated_in_background(self):
+        from core.models import MonthlyReport
+
+        response = self._get_report()
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        payload = response.json()
+        self.assertFalse(payload["exists"])
+        self.assertTrue(MonthlyReport.objects.filter(user=self.user, year=2024, month=4).exists())
+
+        progress = self.client.get(payload["progressUrl"], **self.headers)
+        self.assertEqual(progress.status_code, status.HTTP_200_OK)
+        self.assertEqual(progress.json()["status"], "success")
+        self.assertTrue(progress.json()["report"]["exists"])
+
+        response = self._get_report()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.json()["exists"])
+
+    def test_concurrent_requests_share_one_job(self):
+        from core import monthly_report_jobs
+
+        with mock.patch("core.tasks.generate_monthly_report_for_user_task.apply_async") as apply_async:
+            first = self._get_report().json()
+            second = self._get_report().json()
+
+        self.assertEqual(apply_async.call_count, 1)
+        self.assertEqual(first["jobId"], second["jobId"])
+        self.assertEqual(monthly_report_jobs.get_job(first["jobId"])["status"], "pending")
+
+    def test_progress_of_other_users_job_is_not_found(self):
+        other = get_user_model().objects.create_user(
+            username="other@example.com", email="other@example.com", password="Password123"
+        )
+        job_id = self._get_report().json()["jobId"]
+        token = AuthToken.issue_for_user(other)
+        response = self.client.get(
+            reverse("core:monthly-report-job", args=[job_id]),
+            HTTP_AUTHORIZATION=f"Token {token}",
+        )
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LongTermGoalProgressTests(APITestCase):
+    """长期目标进度增量统计：与从头计算的结果保持一致。"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="goal@example.com",
+            email="goal@example.com",
+            password="Password123",
+        )
+        token = AuthToken.issue_for_user(self.user)
+        self.headers = {"HTTP_AUTHORIZATION": f"Token {token}"}
+        # 目标 2 小时、4 个检查点：每 30 分钟一个检查点
+        self.goal = LongTermGoal.objects.create(
+            user=self.user,
+            title="万小时",
+            target_hours=2,
+            checkpoint_count=4,
+            started_at=_shanghai(2024, 4, 1, 9),
+        )
+
+    def _upload(self, day, hour, minutes):
+        return UserUpload.objects.create(
+            user=self.user,
+            uploaded_at=_shanghai(2024, 4, day, hour),
+            duration_minutes=minutes,
+        )
+
+    def _assert_consistent(self):
+        self.goal.refresh_from_db()
+        stored = get_stored_progress(self.goal)
+        self.assertEqual(stored, compute_goal_progress(self.goal))
+        return stored
+
+    def test_progress_follows_upload_create_edit_and_delete(self):
+        # 计划开始当天 00:00（中国时区）之后的上传都计入
+        first = self._upload(1, 1, 20)
+        second = self._upload(2, 10, 20)
+        third = self._upload(3, 10, 40)
+        self._upload(3, 11, 0)
+        self.assertEqual(
+            self._assert_consistent(),
+            (80, [(1, second.id, 40), (2, third.id, 80)]),
+        )
+
+        # 补录更早的上传
+        backdated = self._upload(1, 12, 15)
+        self.assertEqual(
+            self._assert_consistent(),
+            (95, [(1, backdated.id, 35), (2, third.id, 95), (3, third.id, 95)]),
+        )
+
+        first.duration_minutes = 60
+        first.save()
+        self.assertEqual(
+            self._assert_consistent(),
+            (135, [(1, first.id, 60), (2, first.id, 60), (3, second.id, 95), (4, third.id, 135)]),
+        )
+
+        backdated.delete()
+        third.delete()
+        self.assertEqual(self._assert_consistent(), (80, [(1, first.id, 60), (2, first.id, 60)]))
+
+    def test_account_deletion_skips_progress_rebuild(self):
+        self._upload(2, 10, 45)
+        self._upload(3, 10, 45)
+        with mock.patch("core.goal_progress.on_upload_deleted") as on_upload_deleted:
+            self.user.delete()
+        on_upload_deleted.assert_not_called()
+        self.assertFalse(LongTermGoal.objects.exists())
+
+    def test_reading_goal_does_not_scan_uploads(self):
+        def count_queries():
+            # 令牌缓存在事务提交后才失效（TestCase 中不会提交），每次测量前清空缓存，鉴权都查询数据库
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.get(
+                    reverse("core:goals-long-term"), {"type": "10000-hours"}, **self.headers
+                )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            return len(context.captured_queries), response.json()
+
+        self._upload(2, 10, 45)
+        baseline, payload = count_queries()
+        self.assertEqual(payload["progress"]["spentMinutes"], 45)
+        self.assertEqual(payload["checkpoints"][0]["status"], "completed")
+        self.assertEqual(payload["checkpoints"][1]["status"], "current")
+
+        for day in range(3, 13):
+            self._upload(day, 10, 1)
+        queries, payload = count_queries()
+        self.assertEqual(payload["progress"]["spentMinutes"], 55)
+        self.assertEqual(queries, baseline)
+
+    def test_reconcile_command_repairs_drift(self):
+        self._upload(2, 10, 45)
+        UserUpload.objects.filter(user=self.user).update(duration_minutes=90)
+
+        out = StringIO()
+        call_command("reconcile_long_term_goal_progress", "--dry-run", stdout=out)
+        self.assertIn("累计分钟数 已保存 45，应为 90", out.getvalue())
+        self.goal.refresh_from_db()
+        self.assertEqual(self.goal.progress_minutes, 45)
+
+        call_command("reconcile_long_term_goal_progress", stdout=StringIO())
+        self.assertEqual(self._assert_consistent()[0], 90)
+
+
+class CompletedLongTermGoalSnapshotTests(APITestCase):
+    """已完成长期目标：读取冻结的归档快照，图片链接在读取时生成。"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="snapshot@example.com",
+            email="snapshot@example.com",
+            password="Password123",
+        )
+        self.token = AuthToken.issue_for_user(self.user)
+        self.headers = {"HTTP_AUTHORIZATION": f"Token {self.token}"}
+        self.goals = []
+        for index in range(3):
+            goal = LongTermGoal.objects.create(
+                user=self.user,
+                title=f"目标{index}",
+                target_hours=1,
+                checkpoint_count=2,
+                started_at=_shanghai(2024, 4, 1, 9),
+                is_archived=index < 2,
+            )
+            self.goals.append(goal)
+        self.upload = UserUpload.objects.create(
+            user=self.user,
+            uploaded_at=_shanghai(2024, 4, 2, 10),
+            duration_minutes=60,
+            image="uploads/finished.png",
+        )
+
+    def _get(self, **params):
+        response = self.client.get(
+            reverse("core:goals-long-term-completed"), params, **self.headers
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_completed_goals_are_served_from_frozen_snapshots(self):
+        from core.models import LongTermGoalSnapshot
+
+        payload = self._get()
+        self.assertEqual([goal["id"] for goal in payload], [goal.id for goal in reversed(self.goals)])
+        self.assertEqual(LongTermGoalSnapshot.objects.count(), 3)
+        image = payload[0]["checkpoints"][1]["upload"]["image"]
+        self.assertTrue(image.endswith(f"token={self.token}"))
+        self.assertNotIn("_imageName", payload[0]["checkpoints"][1]["upload"])
+
+        # 完成后的新上传不再改变已冻结的快照
+        UserUpload.objects.create(
+            user=self.user, uploaded_at=_shanghai(2024, 4, 3, 10), duration_minutes=30
+        )
+        self.assertEqual(self._get()[0]["progress"]["spentMinutes"], 60)
+
+    def test_pagination_over_snapshots(self):
+        payload = self._get(page=1, page_size=2)
+        self.assertEqual(payload["count"], 3)
+        self.assertEqual(len(payload["results"]), 2)
+        self.assertEqual(payload["results"][0]["id"], self.goals[2].id)
+
+    def test_regenerate_command_rebuilds_outdated_snapshots(self):
+        from core.models import LongTermGoalSnapshot
+
+        from core.goal_snapshots import SNAPSHOT_SCHEMA_VERSION
+
+        self._get()
+        LongTermGoalSnapshot.objects.filter(goal=self.goals[0]).update(schema_version=0)
+
+        out = StringIO()
+        call_command("regenerate_long_term_goal_snapshots", stdout=out)
+        self.assertIn("待重新生成快照数: 1", out.getvalue())
+        self.assertEqual(
+            LongTermGoalSnapshot.objects.get(goal=self.goals[0]).schema_version, SNAPSHOT_SCHEMA_VERSION
+        )
+        self.assertEqual(LongTermGoalSnapshot.objects.count(), 3)
+
+    def test_upload_delete_discards_snapshots_below_completion(self):
+        from core.models import LongTermGoalSnapshot
+
+        self._get()
+        self.assertEqual(LongTermGoalSnapshot.objects.count(), 3)
+
+        # 删除检查点上传后目标已不满足完成条件
+        self.upload.delete()
+        self.assertEqual(LongTermGoalSnapshot.objects.count(), 0)
+        self.assertEqual(self._get(), [])
+
+    def test_checkpoint_upload_edit_discards_snapshot(self):
+        self._get()
+
+        self.upload.title = "改过的标题"
+        self.upload.save()
+        payload = self._get()
+        self.assertEqual(len(payload), 3)
+        self.assertEqual(payload[0]["checkpoints"][1]["upload"]["title"], "改过的标题")
+
+    def test_unchanged_incomplete_goals_are_not_reserialized(self):
+        from core import goal_snapshots
+
+        LongTermGoal.objects.create(
+            user=self.user,
+            title="长线目标",
+            target_hours=100,
+            checkpoint_count=10,
+            started_at=_shanghai(2024, 4, 1, 9),
+        )
+        self._get()
+
+        with mock.patch.object(
+            goal_snapshots, "LongTermGoalSerializer", wraps=goal_snapshots.LongTermGoalSerializer
+        ) as serializer:
+            self.assertEqual(len(self._get()), 3)
+            serializer.assert_not_called()
+
+            # 进度变化后重新判断一次
+            UserUpload.objects.create(
+                user=self.user, uploaded_at=_shanghai(2024, 4, 3, 10), duration_minutes=30
+            )
+            self._get()
+            self._get()
+            self.assertEqual(serializer.call_count, 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ShortTermGoalStatusTests(APITestCase):
+    """短期目标状态：读取不写数据库，到期目标由定时任务批量更新。"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="short-goal@example.com",
+            email="short-goal@example.com",
+            password="Password123",
+        )
+        self.headers = {"HTTP_AUTHORIZATION": f"Token {AuthToken.issue_for_user(self.user)}"}
+        self.today = get_today_shanghai()
+
+    def _create_goal(self, duration_days: int, days_ago: int) -> ShortTermGoal:
+        goal = ShortTermGoal.objects.create(
+            user=self.user,
+            title=f"{duration_days}天挑战",
+            duration_days=duration_days,
+            status=ShortTermGoal.STATUS_ACTIVE,
+        )
+        created_at = timezone.now() - timedelta(days=days_ago)
+        ShortTermGoal.objects.filter(pk=goal.pk).update(created_at=created_at)
+        goal.refresh_from_db()
+        return goal
+
+    def _list(self):
+        response = self.client.get(reverse("core:goals-short-term"), **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {item["id"]: item for item in response.json()}
+
+    def test_list_is_read_only_and_shows_expired_goals_as_completed(self):
+        expired = self._create_goal(duration_days=3, days_ago=5)
+        running = self._create_goal(duration_days=7, days_ago=1)
+        updated_at = ShortTermGoal.objects.get(pk=expired.pk).updated_at
+
+        payload = self._list()
+        self.assertEqual(payload[expired.id]["status"], ShortTermGoal.STATUS_COMPLETED)
+        self.assertEqual(payload[running.id]["status"], ShortTermGoal.STATUS_ACTIVE)
+        stored = ShortTermGoal.objects.get(pk=expired.pk)
+        self.assertEqual(stored.status, ShortTermGoal.STATUS_ACTIVE)
+        self.assertEqual(stored.updated_at, updated_at)
+
+    def test_list_query_count_does_not_grow_with_goal_count(self):
+        self._create_goal(duration_days=3, days_ago=5)
+        # 每次测量前清空缓存（含令牌缓存），各次测量的鉴权查询一致
+        cache.clear()
+        with CaptureQueriesContext(connection) as small:
+            self._list()
+        for days_ago in range(10):
+            self._create_goal(duration_days=3, days_ago=days_ago)
+        cache.clear()
+        with CaptureQueriesContext(connection) as large:
+            self._list()
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_sweep_completes_expired_and_fully_checked_in_goals(self):
+        from core.short_term_goal_status import sweep_short_term_goal_statuses
+
+        expired = self._create_goal(duration_days=3, days_ago=5)
+        finished = self._create_goal(duration_days=2, days_ago=1)
+        running = self._create_goal(duration_days=7, days_ago=1)
+        for offset in range(2):
+            upload = UserUpload.objects.create(user=self.user, duration_minutes=10)
+            ShortTermGoalTaskCompletion.objects.create(
+                goal=finished,
+                task_id="task-1",
+                upload=upload,
+                date=self.today - timedelta(days=offset),
+            )
+
+        result = sweep_short_term_goal_statuses(today=self.today)
+        self.assertEqual(result, {"completed": 1, "expired": 1})
+        statuses = dict(ShortTermGoal.objects.values_list("id", "status"))
+        self.assertEqual(statuses[expired.id], ShortTermGoal.STATUS_COMPLETED)
+        self.assertEqual(statuses[finished.id], ShortTermGoal.STATUS_COMPLETED)
+        self.assertEqual(statuses[running.id], ShortTermGoal.STATUS_ACTIVE)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CheckInTaskImagesTests(APITestCase):
+    """打卡时的任务图片关联：事务外一次校验，事务内一条语句批量写入。"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="task-images@example.com",
+            email="task-images@example.com",
+            password="Password123",
+        )
+        self.headers = {"HTTP_AUTHORIZATION": f"Token {AuthToken.issue_for_user(self.user)}"}
+        self.goal = ShortTermGoal.objects.create(
+            user=self.user,
+            title="30天挑战",
+            duration_days=30,
+            status=ShortTermGoal.STATUS_ACTIVE,
+        )
+        self.uploads = [
+            UserUpload.objects.create(user=self.user, duration_minutes=10) for _ in range(8)
+        ]
+        self.today = get_today_shanghai()
+
+    def _check_in(self, target_date: date, task_images: dict):
+        return self.client.post(
+            reverse("core:goals-check-in"),
+            {"date": target_date.isoformat(), "goal_id": self.goal.id, "task_images": task_images},
+            format="json",
+            **self.headers,
+        )
+
+    def test_query_count_does_not_grow_with_image_count(self):
+        counts = []
+        for offset, image_count in ((1, 2), (2, 8)):
+            task_images = {f"task-{index}": upload.id for index, upload in enumerate(self.uploads[:image_count])}
+            # 每次测量前清空缓存（含令牌缓存），各次测量的鉴权查询一致
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self._check_in(self.today - timedelta(days=offset), task_images)
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            counts.append(len(queries.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(ShortTermGoalTaskCompletion.objects.filter(goal=self.goal).count(), 10)
+
+    def test_existing_completion_is_relinked_and_invalid_entries_skipped(self):
+        other_user = get_user_model().objects.create_user(
+            username="other-images@example.com",
+            email="other-images@example.com",
+            password="Password123",
+        )
+        foreign_upload = UserUpload.objects.create(user=other_user, duration_minutes=10)
+        target_date = self.today - timedelta(days=1)
+        existing = ShortTermGoalTaskCompletion.objects.create(
+            goal=self.goal, task_id="task-a", date=target_date, upload=self.uploads[0]
+        )
+
+        response = self._check_in(
+            target_date,
+            {"task-a": self.uploads[1].id, "task-b": foreign_upload.id, "task-c": "abc", " ": self.uploads[2].id},
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        completions = ShortTermGoalTaskCompletion.objects.filter(goal=self.goal)
+        self.assertEqual(list(completions.values_list("task_id", flat=True)), ["task-a"])
+        relinked = completions.get()
+        self.assertEqual(relinked.upload_id, self.uploads[1].id)
+        self.assertEqual(relinked.created_at, existing.created_at)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ShortTermGoalTaskCompletionsCacheTests(APITestCase):
+    """任务完成记录接口：响应按用户版本号缓存，完成记录或上传变化时失效。"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="completions@example.com",
+            email="completions@example.com",
+            password="Password123",
+        )
+        self.headers = {"HTTP_AUTHORIZATION": f"Token {AuthToken.issue_for_user(self.user)}"}
+        self.goal = ShortTermGoal.objects.create(
+            user=self.user, title="7天挑战", duration_days=7, status=ShortTermGoal.STATUS_ACTIVE
+        )
+        self.upload = UserUpload.objects.create(user=self.user, title="第一天", duration_minutes=10)
+        self.today = get_today_shanghai()
+        self.first = ShortTermGoalTaskCompletion.objects.create(
+            goal=self.goal, task_id="task-b", date=self.today, upload=self.upload
+        )
+        ShortTermGoalTaskCompletion.objects.create(
+            goal=self.goal, task_id="task-a", date=self.today, upload=self.upload
+        )
+        self.url = reverse("core:goals-short-term-task-completions", args=[self.goal.id])
+
+    def _get(self):
+        response = self.client.get(self.url, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()
+
+    def test_payload_groups_by_day_and_is_served_from_cache(self):
+        date_key = self.today.isoformat()
+        payload = self._get()
+        self.assertEqual(sorted(payload["completions"][date_key]), ["task-a", "task-b"])
+        self.assertEqual(payload["completions"][date_key]["task-a"]["title"], "第一天")
+        self.assertEqual(payload["checkin_times"][date_key], self.first.created_at.isoformat())
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self._get(), payload)
+        # 仅认证与目标归属校验，不再查询完成记录
+        self.assertFalse(
+            any("core_shorttermgoaltaskcompletion" in query["sql"] for query in queries.captured_queries)
+        )
+
+    def test_completion_and_upload_changes_invalidate_cache(self):
+        date_key = self.today.isoformat()
+        self._get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.first.delete()
+        self.assertEqual(list(self._get()["completions"][date_key]), ["task-a"])
+
+        self.upload.title = "改名"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.upload.save(update_fields=["title"])
+        self.assertEqual(self._get()["completions"][date_key]["task-a"]["title"], "改名")
+
+        yesterday = self.today - timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("core:goals-check-in"),
+                {"date": yesterday.isoformat(), "goal_id": self.goal.id, "task_images": {"task-a": self.upload.id}},
+                format="json",
+                **self.headers,
+            )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn(yesterday.isoformat(), self._get()["completions"])
+
+
+    def test_image_links_built_at_read_time(self):
+        UserUpload.objects.filter(pk=self.upload.pk).update(image="uploads/completions/day1.png")
+        date_key = self.today.isoformat()
+        image = self._get()["completions"][date_key]["task-a"]["image"]
+        self.assertIn(reverse("core:user-upload-image", args=[self.upload.id]), image)
+
+        # 缓存中只有文件名，链接随请求的令牌生成
+        other_key = AuthToken.issue_for_user(self.user)
+        response = self.client.get(self.url, HTTP_AUTHORIZATION=f"Token {other_key}")
+        self.assertIn(other_key, response.json()["completions"][date_key]["task-a"]["image"])
+
+    def test_completion_delete_looks_up_only_user_id(self):
+        completion = ShortTermGoalTaskCompletion.objects.get(pk=self.first.pk)
+        with CaptureQueriesContext(connection) as queries:
+            completion.delete()
+        goal_queries = [query["sql"] for query in queries.captured_queries if "core_shorttermgoal\"" in query["sql"]]
+        self.assertEqual(len(goal_queries), 1)
+        self.assertIn('SELECT "core_shorttermgoal"."user_id"', goal_queries[0])
+
+
+class CalendarAnalyticsPropertyTests(SimpleTestCase):
+    """日历统计在随机日历上与逐日扫描的参考实现逐项比对。"""
+
+    ORIGIN = date(2023, 12, 20)
+
+    def _random_calendar(self, rng: random.Random) -> list[date]:
+        density = rng.random()
+        days = [
+            self.ORIGIN + timedelta(days=offset)
+            for offset in range(rng.randint(0, 90))
+            if rng.random() < density
+        ]
+        # 重复日期与乱序输入
+        days += rng.choices(days, k=rng.randint(0, len(days))) if days else []
+        rng.shuffle(days)
+        return days
+
+    @staticmethod
+    def _reference_runs(days: list[date]) -> list[tuple[date, int]]:
+        runs = []
+        for day in sorted(set(days)):
+            if runs and runs[-1][0] + timedelta(days=runs[-1][1]) == day:
+                runs[-1] = (runs[-1][0], runs[-1][1] + 1)
+            else:
+                runs.append((day, 1))
+        return runs
+
+    def test_matches_reference_on_random_calendars(self):
+        from core import calendar_analytics
+
+        rng = random.Random(20240401)
+        for _ in range(300):
+            days = self._random_calendar(rng)
+            array = calendar_analytics.to_days(days)
+            runs = self._reference_runs(days)
+            unique = sorted(set(days))
+
+            starts, lengths = calendar_analytics.streak_runs(array)
+            self.assertEqual(list(zip(starts.tolist(), lengths.tolist())), runs)
+            self.assertEqual(calendar_analytics.longest_streak(array), max((n for _, n in runs), default=0))
+
+            gaps = [(b - a).days - 1 for a, b in zip(unique, unique[1:])]
+            self.assertEqual(calendar_analytics.longest_gap(array), max(gaps, default=0))
+
+            end = self.ORIGIN + timedelta(days=rng.randint(-5, 95))
+            expected_streak = 0
+            while end - timedelta(days=expected_streak) in unique:
+                expected_streak += 1
+            self.assertEqual(calendar_analytics.streak_ending_at(array, end), expected_streak)
+
+            start = self.ORIGIN + timedelta(days=rng.randint(-10, 60))
+            stop = start + timedelta(days=rng.randint(0, 40))
+            histogram = calendar_analytics.calendar_histogram(array, start, stop).tolist()
+            counts = Counter(days)
+            self.assertEqual(
+                histogram,
+                [counts[start + timedelta(days=offset)] for offset in range((stop - start).days + 1)],
+            )
+
+    def test_shanghai_days_split_at_local_midnight(self):
+        from core import calendar_analytics
+
+        moments = [
+            datetime(2024, 3, 31, 15, 59, tzinfo=dt_timezone.utc),
+            datetime(2024, 3, 31, 16, 0, tzinfo=dt_timezone.utc),
+            _shanghai(2024, 4, 30, 23, 59),
+        ]
+        self.assertEqual(
+            calendar_analytics.shanghai_days(moments).tolist(),
+            [date(2024, 3, 31), date(2024, 4, 1), date(2024, 4, 30)],
+        )
+
+
+class UserUploadListPaginationTests(APITestCase):
+    """上传列表：可选的游标分页与基于 ETag 的条件请求。"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="gallery@example.com",
+            email="gallery@example.com",
+            password="Password123",
+        )
+        self.headers = {"HTTP_AUTHORIZATION": f"Token {AuthToken.issue_for_user(self.user)}"}
+        self.url = reverse("core:user-uploads")
+        # 两条上传时间相同，验证按 id 区分先后
+        moments = [_shanghai(2024, 4, day, 10) for day in (1, 2, 2, 3, 4)]
+        self.uploads = [
+            UserUpload.objects.create(user=self.user, title=f"作品{index}", uploaded_at=moment)
+            for index, moment in enumerate(moments)
+        ]
+        self.expected_order = [
+            upload.id for upload in sorted(self.uploads, key=lambda u: (u.uploaded_at, u.id), reverse=True)
+        ]
+
+    def test_legacy_request_returns_full_array(self):
+        response = self.client.get(self.url, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item["id"] for item in response.json()], self.expected_order)
+
+    def test_cursor_pages_walk_history_without_overlap(self):
+        seen = []
+        response = self.client.get(self.url, {"page_size": 2}, **self.headers)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            payload = response.json()
+            seen += [item["id"] for item in payload["results"]]
+            if not payload["next"]:
+                break
+            response = self.client.get(payload["next"], **self.headers)
+        self.assertEqual(seen, self.expected_order)
+
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"}, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unchanged_gallery_returns_304(self):
+        response = self.client.get(self.url, **self.headers)
+        etag = response["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+        self.uploads[0].title = "新标题"
+        self.uploads[0].save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+    @override_settings(USE_TOS_STORAGE=True, DEBUG=False, FORCE_IMAGE_PROXY_URL=False)
+    def test_presigned_image_links_expire_etag(self):
+        from core.serializers import get_signed_image_url_expiry
+
+        image_field = UserUpload._meta.get_field("image")
+        signed = mock.Mock(querystring_auth=True, custom_domain=None, querystring_expire=3600)
+        with mock.patch.object(image_field, "storage", mock.Mock(querystring_auth=True, custom_domain="cdn.example.com")):
+            self.assertIsNone(get_signed_image_url_expiry())
+        with mock.patch.object(image_field, "storage", signed):
+            self.assertEqual(get_signed_image_url_expiry(), 3600)
+
+        now = timezone.now()
+        with mock.patch("core.views.get_signed_image_url_expiry", return_value=3600), \
+                mock.patch("core.views.timezone.now", return_value=now):
+            etag = self.client.get(self.url, **self.headers)["ETag"]
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.headers)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # 超过半个签名有效期后不再返回 304，重新生成链接
+        with mock.patch("core.views.get_signed_image_url_expiry", return_value=3600), \
+                mock.patch("core.views.timezone.now", return_value=now + timedelta(seconds=1800)):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class UploadListQueryCountTests(APITestCase):
+    """列出上传记录的接口使用预取的标签与心情，查询次数与结果数量无关。"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="prefetch@example.com",
+            email="prefetch@example.com",
+            password="Password123",
+        )
+        self.admin = get_user_model().objects.create_user(
+            username="prefetch-admin@example.com",
+            email="prefetch-admin@example.com",
+            password="Password123",
+            is_staff=True,
+        )
+        self.mood = Mood.objects.create(name="平静")
+        self.tags = [Tag.objects.create(user=self.user, name=name) for name in ("速写", "厚涂")]
+        self.day = 0
+
+    def _add_uploads(self, count: int) -> None:
+        for _ in range(count):
+            self.day += 1
+            upload = UserUpload.objects.create(
+                user=self.user,
+                mood=self.mood,
+                duration_minutes=30,
+                uploaded_at=_shanghai(2024, 4, 1, 10) + timedelta(days=self.day),
+            )
+            upload.tags.set(self.tags)
+
+    def _count_queries(self, user, url, params=None) -> int:
+        headers = {"HTTP_AUTHORIZATION": f"Token {AuthToken.issue_for_user(user)}"}
+        # 每次测量前清空缓存（含令牌缓存），各次测量的鉴权查询一致
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {}, **headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries.captured_queries)
+
+    def _assert_constant(self, user, url, params=None) -> None:
+        self._add_uploads(2)
+        small = self._count_queries(user, url, params)
+        self._add_uploads(8)
+        self.assertEqual(self._count_queries(user, url, params), small)
+
+    def test_upload_list(self):
+        self._assert_constant(self.user, reverse("core:user-uploads"))
+
+    def test_upload_list_cursor_page(self):
+        self._assert_constant(self.user, reverse("core:user-uploads"), {"page_size": 50})
+
+    def test_admin_user_uploads(self):
+        self._assert_constant(self.admin, reverse("core:admin-user-uploads"), {"user_id": self.user.id})
+
+    def test_long_term_goal_checkpoint_uploads(self):
+        LongTermGoal.objects.create(
+            user=self.user,
+            title="长期目标",
+            target_hours=10,
+            checkpoint_count=50,
+            started_at=_shanghai(2024, 4, 1, 9),
+        )
+        self._assert_constant(self.user, reverse("core:goals-long-term-active"))
+
+
+class UploadManifestSyncTests(APITestCase):
+    """上传增量同步：任意交错的修改与多端同步后，客户端清单与服务端一致。"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="sync@example.com",
+            email="sync@example.com",
+            password="Password123",
+        )
+        self.headers = {"HTTP_AUTHORIZATION": f"Token {AuthToken.issue_for_user(self.user)}"}
+        self.url = reverse("core:user-uploads-manifest")
+        self.tags = [Tag.objects.create(user=self.user, name=name) for name in ("速写", "厚涂")]
+
+    def _sync(self, client_state: dict, **params) -> dict:
+        if client_state["token"] is not None:
+            params["since"] = client_state["token"]
+        response = self.client.get(self.url, params, **self.headers)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            payload = response.json()
+            if payload["reset"]:
+                client_state["uploads"] = {}
+            for upload_id in payload["deleted"]:
+                client_state["uploads"].pop(upload_id, None)
+            for item in payload["uploads"]:
+                client_state["uploads"][item["id"]] = (item["title"], sorted(item["tags"]))
+            if not payload["next"]:
+                break
+            response = self.client.get(payload["next"], **self.headers)
+        client_state["token"] = payload["syncToken"]
+        return payload
+
+    def _server_state(self) -> dict:
+        return {
+            upload.id: (upload.title, sorted(tag.id for tag in upload.tags.all()))
+            for upload in UserUpload.objects.filter(user=self.user).prefetch_related("tags")
+        }
+
+    def test_random_interleavings_converge(self):
+        rng = random.Random(43)
+        devices = [{"token": None, "uploads": {}} for _ in range(2)]
+        for step in range(120):
+            uploads = list(UserUpload.objects.filter(user=self.user))
+            action = rng.choice(["create", "edit", "retag", "delete", "sync", "sync"])
+            if action == "create" or not uploads:
+                UserUpload.objects.create(user=self.user, title=f"作品{step}")
+            elif action == "edit":
+                upload = rng.choice(uploads)
+                upload.title = f"修改{step}"
+                upload.save(update_fields=["title"])
+            elif action == "retag":
+                rng.choice(uploads).tags.set(rng.sample(self.tags, rng.randint(0, 2)))
+            elif action == "delete":
+                rng.choice(uploads).delete()
+            else:
+                device = rng.choice(devices)
+                self._sync(device)
+                self.assertEqual(device["uploads"], self._server_state())
+
+        for device in devices:
+            self._sync(device)
+            self.assertEqual(device["uploads"], self._server_state())
+
+    def test_steady_state_sync_is_empty(self):
+        UserUpload.objects.create(user=self.user, title="作品")
+        device = {"token": None, "uploads": {}}
+        self.assertTrue(self._sync(device)["reset"])
+        payload = self._sync(device)
+        self.assertEqual((payload["reset"], payload["uploads"], payload["deleted"]), (False, [], []))
+
+    def test_stale_token_after_tombstone_purge_forces_reset(self):
+        from core.upload_sync import purge_expired_tombstones
+
+        kept = UserUpload.objects.create(user=self.user, title="保留")
+        device = {"token": None, "uploads": {}}
+        self._sync(device)
+        UserUpload.objects.create(user=self.user, title="删除").delete()
+
+        self.assertEqual(purge_expired_tombstones(now=timezone.now() + timedelta(days=31)), 1)
+        payload = self._sync(device)
+        self.assertTrue(payload["reset"])
+        self.assertEqual(list(device["uploads"]), [kept.id])
+
+        response = self.client.get(self.url, {"since": "abc"}, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_reset_manifest_is_paged_at_first_page_token(self):
+        uploads = [UserUpload.objects.create(user=self.user, title=f"作品{index}") for index in range(5)]
+        response = self.client.get(self.url, {"page_size": 2}, **self.headers)
+        first = response.json()
+        self.assertTrue(first["reset"])
+        self.assertEqual(len(first["uploads"]), 2)
+        self.assertIn("page_size=2", first["next"])
+
+        # 翻页期间的修改与删除不影响后续页，由下一次增量同步返回
+        uploads[0].title = "翻页时修改"
+        uploads[0].save(update_fields=["title"])
+        uploads[1].delete()
+        later_ids, next_url = [], first["next"]
+        while next_url:
+            page = self.client.get(next_url, **self.headers).json()
+            self.assertEqual((page["reset"], page["syncToken"]), (False, first["syncToken"]))
+            later_ids.extend(item["id"] for item in page["uploads"])
+            next_url = page["next"]
+        self.assertEqual(sorted(later_ids), sorted(upload.id for upload in uploads[2:3]))
+
+        device = {"token": None, "uploads": {}}
+        self._sync(device, page_size=2)
+        self.assertEqual(device["uploads"], self._server_state())
+        self._sync(device, page_size=2)
+        self.assertEqual(device["uploads"], self._server_state())
+
+        response = self.client.get(self.url, {"cursor": first["next"].rsplit("cursor=", 1)[1]}, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class UploadMonthCounterTests(APITestCase):
+    """上传限额：每月上传计数随上传增删维护，限额检查只读取计数行。"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="quota@example.com",
+            email="quota@example.com",
+            password="Password123",
+        )
+        self.headers = {"HTTP_AUTHORIZATION": f"Token {AuthToken.issue_for_user(self.user)}"}
+
+    def _monthly_count(self) -> int:
+        response = self.client.get(reverse("core:user-uploads-check-limit"), **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json()["monthly_count"]
+
+    def test_counter_follows_creates_and_deletes(self):
+        from core.models import UserUploadMonthCounter
+
+        uploads = [UserUpload.objects.create(user=self.user, title=f"作品{index}") for index in range(3)]
+        self.assertEqual(self._monthly_count(), 3)
+        uploads[0].delete()
+        self.assertEqual(self._monthly_count(), 2)
+
+        # 认证之外只读取一次计数行
+        with CaptureQueriesContext(connection) as queries:
+            self._monthly_count()
+        counter_queries = [q for q in queries.captured_queries if "core_userupload" in q["sql"]]
+        self.assertEqual(len(counter_queries), 1)
+        self.assertIn("core_useruploadmonthcounter", counter_queries[0]["sql"])
+        self.assertEqual(UserUploadMonthCounter.objects.get(user=self.user).count, 2)
+
+    def test_non_member_limit_uses_counter(self):
+        url = reverse("core:user-uploads")
+        response = self.client.post(url, {"title": "第一张"}, format="json", **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.client.post(url, {"title": "第二张"}, format="json", **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(UserUpload.objects.filter(user=self.user).count(), 1)
+
+    def test_reconcile_command_repairs_drift(self):
+        from core.models import UserUploadMonthCounter
+
+        UserUpload.objects.create(user=self.user, title="作品")
+        UserUploadMonthCounter.objects.filter(user=self.user).update(count=7)
+        UserUploadMonthCounter.objects.create(user=self.user, year_month="2020-01", count=3)
+
+        out = StringIO()
+        call_command("reconcile_upload_month_counters", "--dry-run", stdout=out)
+        self.assertIn("发现差异: 2", out.getvalue())
+        self.assertEqual(self._monthly_count(), 7)
+
+        call_command("reconcile_upload_month_counters", stdout=StringIO())
+        self.assertEqual(self._monthly_count(), 1)
+        self.assertFalse(UserUploadMonthCounter.objects.filter(year_month="2020-01").exists())
+
+
+class TagUsageCountTests(APITestCase):
+    """标签使用次数：任意方式修改画作标签后与关联表统计一致。"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="tag-usage@example.com",
+            email="tag-usage@example.com",
+            password="Password123",
+        )
+        self.headers = {"HTTP_AUTHORIZATION": f"Token {AuthToken.issue_for_user(self.user)}"}
+        self.tags = [Tag.objects.create(user=self.user, name=f"标签{index}") for index in range(4)]
+
+    def _assert_consistent(self):
+        from core.tag_usage import compute_usage_counts
+
+        expected = compute_usage_counts()
+        stored = dict(Tag.objects.values_list("id", "usage_count"))
+        self.assertEqual(stored, {tag_id: expected.get(tag_id, 0) for tag_id in stored})
+
+    def test_random_tag_edits_keep_counts_consistent(self):
+        rng = random.Random(45)
+        uploads = [UserUpload.objects.create(user=self.user) for _ in range(5)]
+        for _ in range(150):
+            upload = rng.choice(uploads)
+            tag = rng.choice(self.tags)
+            action = rng.choice(["add", "remove", "set", "clear", "tag_add", "tag_remove", "tag_clear", "delete"])
+            if action == "add":
+                upload.tags.add(*rng.sample(self.tags, 2))
+            elif action == "remove":
+                upload.tags.remove(*rng.sample(self.tags, 2))
+            elif action == "set":
+                upload.tags.set(rng.sample(self.tags, rng.randint(0, 4)))
+            elif action == "clear":
+                upload.tags.clear()
+            elif action == "tag_add":
+                tag.uploads.add(*rng.sample(uploads, 2))
+            elif action == "tag_remove":
+                tag.uploads.remove(*rng.sample(uploads, 2))
+            elif action == "tag_clear":
+                tag.uploads.clear()
+            else:
+                uploads.remove(upload)
+                upload.delete()
+                uploads.append(UserUpload.objects.create(user=self.user))
+            self._assert_consistent()
+
+    def test_popular_ordering_and_delete_guard(self):
+        upload = UserUpload.objects.create(user=self.user)
+        upload.tags.add(self.tags[2], self.tags[3])
+        UserUpload.objects.create(user=self.user).tags.add(self.tags[3])
+
+        response = self.client.get(reverse("core:tags-manage"), {"ordering": "popular"}, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()
+        results = results["results"] if isinstance(results, dict) else results
+        self.assertEqual([item["id"] for item in results[:2]], [self.tags[3].id, self.tags[2].id])
+        self.assertEqual(results[0]["usage_count"], 2)
+
+        detail = reverse("core:tags-manage-detail", args=[self.tags[2].id])
+        self.assertEqual(self.client.delete(detail, **self.headers).status_code, status.HTTP_400_BAD_REQUEST)
+        upload.delete()
+        self.assertEqual(self.client.delete(detail, **self.headers).status_code, status.HTTP_204_NO_CONTENT)
+
+    def test_drifted_count_does_not_break_delete(self):
+        upload = UserUpload.objects.create(user=self.user)
+        upload.tags.add(self.tags[0], self.tags[1])
+        # 计数漂移：使用次数低于实际关联数
+        Tag.objects.filter(pk=self.tags[0].pk).update(usage_count=0)
+
+        detail = reverse("core:tags-manage-detail", args=[self.tags[0].id])
+        response = self.client.delete(detail, **self.headers)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Tag.objects.filter(pk=self.tags[0].pk).exists())
+
+        # 减少时次数不足则置 0，不生成负数
+        upload.delete()
+        counts = dict(Tag.objects.filter(pk__in=[self.tags[0].pk, self.tags[1].pk]).values_list("pk", "usage_count"))
+        self.assertEqual(counts, {self.tags[0].pk: 0, self.tags[1].pk: 0})
+
+    def test_account_deletion_decrements_preset_tags(self):
+        preset = Tag.objects.create(name="预设", is_preset=True)
+        for _ in range(2):
+            UserUpload.objects.create(user=self.user).tags.add(self.tags[0], self.tags[1], preset)
+        other = get_user_model().objects.create_user(
+            username="tag-usage-other@example.com",
+            email="tag-usage-other@example.com",
+            password="Password123",
+        )
+        UserUpload.objects.create(user=other).tags.add(preset)
+        self.assertEqual(Tag.objects.get(pk=preset.pk).usage_count, 3)
+
+        user_id = self.user.pk
+        self.user.delete()
+        self.assertFalse(Tag.objects.filter(user_id=user_id).exists())
+        self.assertEqual(Tag.objects.get(pk=preset.pk).usage_count, 1)
+        self._assert_consistent()
+
+    def test_reconcile_command_repairs_drift(self):
+        UserUpload.objects.create(user=self.user).tags.add(self.tags[0])
+        Tag.objects.filter(pk=self.tags[0].pk).update(usage_count=5)
+        Tag.objects.filter(pk=self.tags[1].pk).update(usage_count=2)
+
+        out = StringIO()
+        call_command("reconcile_tag_usage_counts", stdout=out)
+        self.assertIn("已修复: 2", out.getvalue())
+        self._assert_consistent()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TagUsageConcurrencyTests(TransactionTestCase):
+    """并发为同一标签添加画作时，使用次数不丢失更新。"""
+
+    def test_parallel_assignment(self):
+        user = get_user_model().objects.create_user(
+            username="tag-parallel@example.com",
+            email="tag-parallel@example.com",
+            password="Password123",
+        )
+        tag = Tag.objects.create(user=user, name="并发")
+        uploads = [UserUpload.objects.create(user=user) for _ in range(8)]
+        barrier = threading.Barrier(len(uploads))
+        errors = []
+
+        def assign(upload):
+            try:
+                barrier.wait()
+                # SQLite 同一时刻只允许一个写事务：被锁时整体重试，其他数据库上真正并行
+                for _ in range(200):
+                    try:
+                        with transaction.atomic():
+                            upload.tags.add(tag)
+                        return
+                    except OperationalError as exc:
+                        if "locked" not in str(exc):
+                            raise
+                        time.sleep(0.01)
+                errors.append("重试次数耗尽")
+            except Exception as exc:
+                errors.append(repr(exc))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=assign, args=(upload,)) for upload in uploads]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        tag.refresh_from_db()
+        self.assertEqual(tag.usage_count, len(uploads))
+        self.assertEqual(tag.uploads.count(), len(uploads))
+
+
+class ORJSONRenderingTests(SimpleTestCase):
+    """orjson 渲染器/解析器与 DRF 默认实现的输出一致。"""
+
+    def test_render_matches_drf(self):
+        payload = {
+            "datetime_utc": datetime(2024, 4, 1, 2, 3, 4, 567891, tzinfo=dt_timezone.utc),
+            "datetime_local": _shanghai(2024, 4, 1, 10),
+            "date": date(2024, 4, 1),
+            "decimal": Decimal("12.50"),
+            "uuid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+            "text": "中文\u2028换行\u2029",
+            "int_keys": {1: "a", 2: [1.5, None, True]},
+            "big": 2**70,
+        }
+        expected = JSONRenderer().render(payload)
+        self.assertEqual(ORJSONRenderer().render(payload), expected)
+        self.assertEqual(ORJSONRenderer().render({"items": [payload]}), JSONRenderer().render({"items": [payload]}))
+        self.assertEqual(
+            ORJSONRenderer().render(payload, "application/json; indent=2"),
+            JSONRenderer().render(payload, "application/json; indent=2"),
+        )
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_parse(self):
+        body = json.dumps({"title": "作品", "tags": [1, 2]}, ensure_ascii=False).encode()
+        self.assertEqual(ORJSONParser().parse(BytesIO(body)), JSONParser().parse(BytesIO(body)))
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(BytesIO(b"{invalid"))
+        with self.assertRaises(ParseError):
+            ORJSONParser().parse(BytesIO(b'{"value": NaN}'))
+
+
+@override_settings(RESPONSE_COMPRESSION_MIN_SIZE=200)
+class ResponseCompressionTests(APITestCase):
+    """响应压缩：按大小与内容类型选择性压缩。"""
+
+    def _process(self, content: bytes, content_type="application/json", accept="gzip, deflate"):
+        request = RequestFactory().get("/", HTTP_ACCEPT_ENCODING=accept)
+        response = HttpResponse(content, content_type=content_type)
+        response["ETag"] = '"abc"'
+        return ResponseCompressionMiddleware(lambda req: response).process_response(request, response)
+
+    def test_compresses_large_json(self):
+        content = json.dumps([{"title": "作品", "id": index} for index in range(50)]).encode()
+        response = self._process(content)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), content)
+        self.assertEqual(response["Content-Length"], str(len(response.content)))
+        self.assertEqual(response["ETag"], 'W/"abc"')
+        self.assertIn("Accept-Encoding", response["Vary"])
+
+    def test_skips_small_binary_and_unaccepted(self):
+        large = b"x" * 1000
+        self.assertFalse(self._process(b"{}").has_header("Content-Encoding"))
+        self.assertFalse(self._process(large, content_type="image/png").has_header("Content-Encoding"))
+        self.assertFalse(self._process(large, accept="identity").has_header("Content-Encoding"))
+        self.assertFalse(self._process(large, accept="gzip;q=0").has_header("Content-Encoding"))
+
+    def test_html_never_uses_brotli(self):
+        fake_brotli = mock.Mock(MODE_TEXT=1)
+        fake_brotli.compress.side_effect = lambda content, **kwargs: content[:10]
+        content = b"<html>" + b"<input name='csrfmiddlewaretoken' value='secret'>" * 50 + b"</html>"
+        with mock.patch("config.middleware.brotli", fake_brotli):
+            self.assertEqual(self._process(content, accept="br, gzip")["Content-Encoding"], "br")
+            response = self._process(content, content_type="text/html", accept="br, gzip")
+            br_only = self._process(content, content_type="text/html", accept="br")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.content), content)
+        self.assertFalse(br_only.has_header("Content-Encoding"))
+
+    def test_uploads_list_etag_survives_compression(self):
+        user = get_user_model().objects.create_user(
+            username="compress@example.com",
+            email="compress@example.com",
+            password="Password123",
+        )
+        for index in range(5):
+            UserUpload.objects.create(user=user, title=f"作品{index}", notes="描述" * 20)
+        headers = {
+            "HTTP_AUTHORIZATION": f"Token {AuthToken.issue_for_user(user)}",
+            "HTTP_ACCEPT_ENCODING": "gzip",
+        }
+        url = reverse("core:user-uploads")
+
+        response = self.client.get(url, **headers)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(len(json.loads(gzip.decompress(response.content))), 5)
+        self.assertTrue(response["ETag"].startswith('W/"'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response["ETag"], **headers)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+class ProjectionParityTests(APITestCase):
+    """只读列表投影与对应序列化器的输出逐字节一致。"""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="projection@example.com",
+            email="projection@example.com",
+            password="Password123",
+        )
+        self.token = AuthToken.issue_for_user(self.user)
+        self.mood = Mood.objects.create(name="专注", display_order=1)
+        Mood.objects.create(name="停用", display_order=2, is_active=False)
+        tags = [Tag.objects.create(user=self.user, name=name, display_order=order) for order, name in enumerate("丙乙甲")]
+
+        with_mood = UserUpload.objects.create(
+            user=self.user,
+            title="有图",
+            notes="备注",
+            uploaded_at=_shanghai(2024, 4, 1, 10),
+            self_rating=80,
+            mood=self.mood,
+            duration_minutes=45,
+            image="uploads/1/a.webp",
+            thumbnail="uploads/1/a_thumb.webp",
+        )
+        with_mood.tags.set([tags[2], tags[0]])
+        UserUpload.objects.create(
+            user=self.user, uploaded_at=_shanghai(2024, 4, 2, 9), mood_label="旧状态", image="uploads/1/b.webp"
+        ).tags.set([tags[1]])
+        UserUpload.objects.create(user=self.user, uploaded_at=_shanghai(2024, 4, 3, 9))
+
+        for day in (1, 3):
+            DailyCheckIn.objects.create(user=self.user, date=date(2024, 4, day), source="app")
+
+        schedule = [{"day_index": 0, "tasks": [{"task_id": "t1", "title": "速写"}, {"task_id": "t2", "title": "色彩", "subtitle": "30分钟"}]}]
+        for goal_status in (ShortTermGoal.STATUS_SAVED, ShortTermGoal.STATUS_ACTIVE):
+            ShortTermGoal.objects.create(
+                user=self.user, title="挑战", duration_days=3, plan_type=ShortTermGoal.PLAN_TYPE_SAME,
+                schedule=schedule, status=goal_status,
+            )
+        # 已过期但尚未被扫描的目标
+        ShortTermGoal.objects.filter(status=ShortTermGoal.STATUS_ACTIVE).update(created_at=_shanghai(2024, 1, 1, 9))
+
+    def _request(self):
+        django_request = APIRequestFactory().get("/api/uploads/", HTTP_AUTHORIZATION=f"Token {self.token}")
+        request = Request(django_request, authenticators=[AuthTokenAuthentication()])
+        request.user  # 触发认证，设置 request.auth
+        return request
+
+    def _assert_parity(self, projection, serializer_class, queryset, **serializer_context):
+        request = self._request()
+        expected = serializer_class(queryset, many=True, context={"request": request, **serializer_context}).data
+        actual = projection(request).project(queryset)
+        self.assertTrue(actual)
+        self.assertEqual(ORJSONRenderer().render(actual), ORJSONRenderer().render(expected))
+
+    def test_parity(self):
+        from core.projections import (
+            CheckInProjection,
+            MoodProjection,
+            ShortTermGoalProjection,
+            TagProjection,
+            UploadProjection,
+        )
+        from core.serializers import (
+            MoodSerializer,
+            ShortTermGoalSerializer,
+            TagSerializer,
+            TestAccountCheckInSerializer,
+            UserUploadSerializer,
+        )
+
+        uploads = UserUpload.objects.filter(user=self.user).select_related("mood").prefetch_related("tags").order_by("-uploaded_at", "-id")
+        self._assert_parity(UploadProjection, UserUploadSerializer, uploads)
+        with override_settings(USE_TOS_STORAGE=True):
+            self._assert_parity(UploadProjection, UserUploadSerializer, uploads)
+        self._assert_parity(TagProjection, TagSerializer, Tag.objects.filter(user=self.user))
+        self._assert_parity(MoodProjection, MoodSerializer, Mood.objects.order_by("display_order", "name"))
+        self._assert_parity(CheckInProjection, TestAccountCheckInSerializer, DailyCheckIn.objects.filter(user=self.user))
+        self._assert_parity(ShortTermGoalProjection, ShortTermGoalSerializer, ShortTermGoal.objects.filter(user=self.user).order_by("id"))
+
+    def test_uploads_list_pagination_with_projection(self):
+        headers = {"HTTP_AUTHORIZATION": f"Token {self.token}"}
+        url = reverse("core:user-uploads")
+        tag_ids = dict(Tag.objects.filter(user=self.user).values_list("name", "id"))
+        full = self.client.get(url, **headers).json()
+        # 标签按 Tag 默认排序（display_order）输出
+        self.assertEqual([item["tags"] for item in full], [[], [tag_ids["乙"]], [tag_ids["丙"], tag_ids["甲"]]])
+
+        first = self.client.get(url, {"page_size": 2}, **headers).json()
+        second = self.client.get(first["next"], **headers).json()
+        self.assertEqual(first["results"] + second["results"], full)
+        self.assertIsNone(second["next"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AuthTokenCacheTests(APITestCase):
+    """Token 鉴权缓存：命中缓存时不查询数据库，last_used_at 合并后批量写入，变更后立即失效。"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="token-cache@example.com",
+            email="token-cache@example.com",
+            password="Password123",
+        )
+        self.key = AuthToken.issue_for_user(self.user)
+        self.url = reverse("core:moods-list")
+
+    def _get(self, key=None):
+        return self.client.get(self.url, HTTP_AUTHORIZATION=f"Token {key or self.key}")
+
+    def _token_queries(self):
+        context = CaptureQueriesContext(connection)
+        with context:
+            response = self._get()
+        return response, [query["sql"] for query in context.captured_queries if "core_authtoken" in query["sql"]]
+
+    def test_cached_token_skips_database(self):
+        response, queries = self._token_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0].startswith("SELECT"))
+
+        response, queries = self._token_queries()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(queries, [])
+
+    def test_last_used_at_flushed_in_batches(self):
+        from core import auth_token_cache
+
+        token = AuthToken.objects.get(key=self.key)
+        other = AuthToken.objects.get(key=AuthToken.issue_for_user(
+            get_user_model().objects.create_user(username="other@example.com", email="other@example.com", password="x")
+        ))
+        old = timezone.now() - timedelta(days=3)
+        AuthToken.objects.filter(pk__in=[token.pk, other.pk]).update(last_used_at=old)
+
+        for _ in range(3):
+            self.assertEqual(self._get().status_code, status.HTTP_200_OK)
+        self.assertEqual(self._get(other.key).status_code, status.HTTP_200_OK)
+        token.refresh_from_db()
+        self.assertEqual(token.last_used_at, old)
+
+        # 每个令牌每个间隔只记录一次
+        with self.assertNumQueries(1):
+            self.assertEqual(auth_token_cache.flush_last_used(), 2)
+        token.refresh_from_db()
+        other.refresh_from_db()
+        self.assertGreater(token.last_used_at, old)
+        self.assertGreater(other.last_used_at, old)
+        self.assertEqual(auth_token_cache.flush_last_used(), 0)
+
+    def test_revoked_on_token_delete_and_password_change(self):
+        self.assertEqual(self._get().status_code, status.HTTP_200_OK)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.set_password("NewPassword456")
+            self.user.save()
+        _, queries = self._token_queries()
+        self.assertEqual(len(queries), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            AuthToken.objects.filter(key=self.key).delete()
+        self.assertEqual(self._get().status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_rotated_key_revoked(self):
+        self.assertEqual(self._get().status_code, status.HTTP_200_OK)
+        token = AuthToken.objects.get(key=self.key)
+        with self.captureOnCommitCallbacks(execute=True):
+            token.key = "rotated-key"
+            token.save()
+        self.assertEqual(self._get().status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self._get("rotated-key").status_code, status.HTTP_200_OK)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, DEFAULT_FROM_EMAIL="noreply@example.com")
+class RateLimitTests(APITestCase):
+    """登录与验证码的限流计数保存在缓存中，数据库记录只用于审计。"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="limit@example.com",
+            email="limit@example.com",
+            password="Password123",
+        )
+        self.login_url = reverse("core:login")
+        self.send_code_url = reverse("core:send-code")
+
+    def test_sliding_window_counter(self):
+        from core.rate_limit import SlidingWindowCounter
+
+        counter = SlidingWindowCounter("tests", window=900, buckets=15)
+        start = 999_999_960.0  # 分桶边界
+        counter.hit("a", now=start)
+        counter.hit("a", now=start + 300)
+        counter.hit("b", now=start + 300)
+        self.assertEqual(counter.count("a", now=start + 300), 2)
+        self.assertEqual(counter.retry_after("a", now=start + 300), 660)
+
+        # 最早的一次计数离开窗口（至多多保留一个分桶宽度）
+        self.assertEqual(counter.count("a", now=start + 899), 2)
+        self.assertEqual(counter.count("a", now=start + 960), 1)
+        self.assertEqual(counter.count("a", now=start + 1260), 0)
+        self.assertEqual(counter.retry_after("a", now=start + 1260), 0)
+
+        counter.hit_distinct("emails", "x@example.com", now=start)
+        counter.hit_distinct("emails", "x@example.com", now=start + 10)
+        counter.hit_distinct("emails", "y@example.com", now=start + 20)
+        self.assertEqual(counter.count("emails", now=start + 20), 2)
+
+    def _login(self, password, ip="10.0.0.1"):
+        return self.client.post(
+            self.login_url,
+            {"email": "Limit@example.com", "password": password},
+            format="json",
+            REMOTE_ADDR=ip,
+        )
+
+    def test_login_failures_block_without_counting_rows(self):
+        for _ in range(5):
+            self.assertEqual(self._login("wrong").status_code, status.HTTP_400_BAD_REQUEST)
+
+        context = CaptureQueriesContext(connection)
+        with context:
+            response = self._login("Password123")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response.data["retry_after"], 900)
+        self.assertEqual(len(context.captured_queries), 0)
+
+        # 同一 IP 换邮箱同样受限，换 IP 后可以登录
+        response = self.client.post(
+            self.login_url, {"email": "other@example.com", "password": "x"}, format="json", REMOTE_ADDR="10.0.0.1"
+        )
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(self._login("Password123", ip="10.0.0.2").status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        cache.clear()
+        self.assertEqual(self._login("Password123", ip="10.0.0.2").status_code, status.HTTP_200_OK)
+
+        attempts = LoginAttempt.objects.filter(email="limit@example.com")
+        self.assertEqual(attempts.filter(success=False).count(), 5)
+        self.assertEqual(attempts.filter(success=True).count(), 1)
+
+    @override_settings(CELERY_ENABLED=True, CELERY_TASK_ALWAYS_EAGER=True)
+    def test_login_audit_written_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.assertEqual(self._login("wrong").status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(LoginAttempt.objects.exists())
+
+        attempted_at = timezone.now()
+        for callback in callbacks:
+            callback()
+        attempt = LoginAttempt.objects.get()
+        self.assertFalse(attempt.success)
+        self.assertEqual(attempt.ip_address, "10.0.0.1")
+        self.assertLess(attempt.created_at, attempted_at)
+
+    def _send_code(self, email, ip="10.0.0.1"):
+        with mock.patch("core.views.send_mail_async"):
+            return self.client.post(
+                self.send_code_url, {"email": email, "purpose": "register"}, format="json", REMOTE_ADDR=ip
+            )
+
+    def test_verification_code_limits(self):
+        self.assertEqual(self._send_code("new@example.com").status_code, status.HTTP_200_OK)
+        self.assertEqual(EmailVerification.objects.filter(email="new@example.com").count(), 1)
+
+        response = self._send_code("new@example.com")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(response.data["retry_after"], 0)
+
+        # 同一 IP 在一小时内超过 5 个不同邮箱
+        for index in range(5):
+            self.assertEqual(self._send_code(f"new{index}@example.com").status_code, status.HTTP_200_OK)
+        response = self._send_code("another@example.com")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(response.data["retry_after"], 3600)
+
+        # 其他 IP 不受影响，每个邮箱每天的发送次数单独计数
+        from core import rate_limit
+
+        for _ in range(20):
+            rate_limit.VERIFICATION_SENDS_BY_EMAIL_DAILY.hit("daily@example.com")
+        response = self._send_code("daily@example.com", ip="10.0.0.2")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("20次", response.data["detail"])
+
+        for _ in range(10):
+            rate_limit.VERIFICATION_SENDS_BY_IP.hit("10.0.0.3")
+        response = self._send_code("ip@example.com", ip="10.0.0.3")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(response.data["retry_after"], 3500)
+        self.assertEqual(self._send_code("ip@example.com", ip="10.0.0.4").status_code, status.HTTP_200_OK)
+
+
+    def test_cache_outage_falls_back_to_audit_rows(self):
+        broken_cache = mock.Mock()
+        for method in ("get", "get_many", "add", "incr", "set"):
+            getattr(broken_cache, method).side_effect = ConnectionError("cache down")
+
+        with mock.patch("core.rate_limit.cache", broken_cache):
+            for _ in range(5):
+                self.assertEqual(self._login("wrong").status_code, status.HTTP_400_BAD_REQUEST)
+            self.assertEqual(LoginAttempt.objects.filter(success=False).count(), 5)
+            response = self._login("Password123")
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+            self.assertEqual(self._send_code("outage@example.com").status_code, status.HTTP_200_OK)
+            response = self._send_code("outage@example.com")
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertGreater(response.data["retry_after"], 0)
+
+            now = timezone.now()
+            EmailVerification.objects.bulk_create(
+                EmailVerification(
+                    email=f"outage{index % 3}@example.com",
+                    purpose="register",
+                    code="000000",
+                    expires_at=now,
+                    ip_address="10.0.0.9",
+                )
+                for index in range(10)
+            )
+            response = self._send_code("fresh@example.com", ip="10.0.0.9")
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertGreater(response.data["retry_after"], 3500)
+
+            # 其他用途的发送同样计入每日上限（不触发本用途的发送间隔）
+            EmailVerification.objects.bulk_create(
+                EmailVerification(email="daily@example.com", purpose="reset_password", code="000000", expires_at=now)
+                for _ in range(20)
+            )
+            response = self._send_code("daily@example.com", ip="10.0.0.10")
+            self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+            self.assertIn("20次", response.data["detail"])
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AuthRecordRetentionTests(APITestCase):
+    """认证审计表按主键分批清理；按月分区的 SQL 只在 MySQL 上执行。"""
+
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.old_attempts = [LoginAttempt.objects.create(email=f"a{i}@example.com", ip_address="10.0.0.1") for i in range(5)]
+        LoginAttempt.objects.filter(pk__in=[a.pk for a in self.old_attempts]).update(created_at=now - timedelta(days=40))
+        self.recent_attempt = LoginAttempt.objects.create(email="recent@example.com", ip_address="10.0.0.1")
+        for i in range(3):
+            EmailVerification.objects.create(
+                email=f"v{i}@example.com", purpose="register", code="123456", expires_at=now
+            )
+        EmailVerification.objects.update(created_at=now - timedelta(days=8))
+        EmailVerification.objects.create(
+            email="fresh@example.com", purpose="register", code="123456", expires_at=now
+        )
+
+        user_model = get_user_model()
+        self.expired_user = user_model.objects.create_user(username="expired@example.com", email="expired@example.com", password="x")
+        self.active_user = user_model.objects.create_user(username="active@example.com", email="active@example.com", password="x")
+        self.expired_key = AuthToken.issue_for_user(self.expired_user)
+        AuthToken.issue_for_user(self.active_user)
+        AuthToken.objects.filter(user=self.expired_user).update(expires_at=now - timedelta(days=10))
+
+    def test_purge_in_batches(self):
+        from core import retention
+
+        queryset = LoginAttempt.objects.filter(created_at__lt=timezone.now() - timedelta(days=30))
+        # 每批一次查询ID、一次删除
+        with self.assertNumQueries(6):
+            self.assertEqual(retention.purge_in_batches(queryset, batch_size=2, sleep=0), 5)
+        self.assertEqual(list(LoginAttempt.objects.all()), [self.recent_attempt])
+
+        LoginAttempt.objects.filter(pk=self.recent_attempt.pk).update(created_at=timezone.now() - timedelta(days=40))
+        self.assertEqual(retention.purge_in_batches(queryset, batch_size=2, sleep=0, max_batches=1), 1)
+
+    def test_cleanup_command(self):
+        out = StringIO()
+        call_command("cleanup_auth_records", "--dry-run", stdout=out)
+        self.assertIn("5 条登录尝试记录", out.getvalue())
+        self.assertEqual(LoginAttempt.objects.count(), 6)
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("cleanup_auth_records", "--batch-size", "2", "--sleep", "0", stdout=out)
+        self.assertIn("删除 5 条登录尝试记录", out.getvalue())
+        self.assertIn("条/秒", out.getvalue())
+        self.assertEqual(LoginAttempt.objects.count(), 1)
+        self.assertEqual(list(EmailVerification.objects.values_list("email", flat=True)), ["fresh@example.com"])
+        self.assertEqual(list(AuthToken.objects.values_list("user_id", flat=True)), [self.active_user.pk])
+
+    def test_partition_sql(self):
+        from core import retention
+
+        sql = retention.build_partition_sql("core_loginattempt", date(2026, 11, 20), date(2027, 1, 1))
+        self.assertIn("ADD PRIMARY KEY (`id`, `created_at`)", sql)
+        self.assertIn("PARTITION p202611 VALUES LESS THAN (TO_DAYS('2026-12-01'))", sql)
+        self.assertIn("PARTITION p202612 VALUES LESS THAN (TO_DAYS('2027-01-01'))", sql)
+        self.assertIn("PARTITION p202701 VALUES LESS THAN (TO_DAYS('2027-02-01'))", sql)
+        self.assertTrue(sql.endswith("PARTITION pmax VALUES LESS THAN MAXVALUE)"))
+        self.assertEqual(retention.last_partition_month(date(2026, 11, 20), 2), date(2027, 1, 1))
+
+        # SQLite 上没有分区，只走分批删除
+        self.assertEqual(retention.get_partitions(LoginAttempt), {})
+        self.assertEqual(retention.ensure_future_partitions(LoginAttempt, 2, date(2026, 11, 20)), [])
@@ -0,0 +1,106 @@
+"""
+上传限额：每月上传计数（UserUploadMonthCounter）的维护与查询。
+
+- 非会员：总共只能上传 NON_MEMBER_MAX_UPLOADS 张
+- 会员：每月最多上传 MAX_MONTHLY_UPLOADS 张（按 created_at 的中国时区月份，
+  而不是 uploaded_at，用户可能把作品时间设置为过去的日期）
+
+计数在上传新增、删除时由信号在同一事务中增减，限额检查只需读取计数行；
+通过 bulk_create、queryset.update() 或直接 SQL 修改上传记录时不会触发维护，
+可运行 reconcile_upload_month_counters 管理命令校正。
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from core.models import SHANGHAI_TZ, UserUpload, UserUploadMonthCounter
+
+# 会员每月上传上限
+MAX_MONTHLY_UPLOADS = 150
+# 非会员总上传上限
+NON_MEMBER_MAX_UPLOADS = 1
+
+
+def get_year_month(moment: Optional[datetime] = None) -> str:
+    """返回时间点所在的中国时区月份（YYYY-MM），默认当前时间。"""
+    moment = moment or timezone.now()
+    return f"{moment.astimezone(SHANGHAI_TZ):%Y-%m}"
+
+
+def increment(user_id: int, created_at: datetime) -> None:
+    year_month = get_year_month(created_at)
+    with transaction.atomic():
+        counters = UserUploadMonthCounter.objects.filter(user_id=user_id, year_month=year_month)
+        if counters.update(count=F("count") + 1):
+            return
+        try:
+            with transaction.atomic():
+                UserUploadMonthCounter.objects.create(user_id=user_id, year_month=year_month, count=1)
+        except IntegrityError:
+            # 并发情况下计数行已被创建
+            counters.update(count=F("count") + 1)
+
+
+def decrement(user_id: int, created_at: datetime) -> None:
+    UserUploadMonthCounter.objects.filter(
+        user_id=user_id, year_month=get_year_month(created_at), count__gt=0
+    ).update(count=F("count") - 1)
+
+
+def get_monthly_count(user_id: int, year_month: Optional[str] = None) -> int:
+    """获取用户某月（默认本月）的上传数量。"""
+    count = (
+        UserUploadMonthCounter.objects.filter(user_id=user_id, year_month=year_month or get_year_month())
+        .values_list("count", flat=True)
+        .first()
+    )
+    return count or 0
+
+
+def get_total_count(user_id: int) -> int:
+    """获取用户的总上传数量（各月计数之和）。"""
+    return UserUploadMonthCounter.objects.filter(user_id=user_id).aggregate(total=Sum("count"))["total"] or 0
+
+
+def count_uploads_by_month(user_ids: Optional[Iterable[int]] = None) -> Dict[Tuple[int, str], int]:
+    """从上传记录重新统计每月上传数量：{(user_id, year_month): count}。"""
+    uploads = UserUpload.objects.all()
+    if user_ids is not None:
+        uploads = uploads.filter(user_id__in=list(user_ids))
+    rows = (
+        uploads.annotate(month=TruncMonth("created_at", tzinfo=SHANGHAI_TZ))
+        .values("user_id", "month")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    return {(row["user_id"], f"{row['month']:%Y-%m}"): row["count"] for row in rows}
+
+
+def get_stored_counts(user_ids: Optional[Iterable[int]] = None) -> Dict[Tuple[int, str], int]:
+    counters = UserUploadMonthCounter.objects.all()
+    if user_ids is not None:
+        counters = counters.filter(user_id__in=list(user_ids))
+    return {
+        (user_id, year_month): count
+        for user_id, year_month, count in counters.values_list("user_id", "year_month", "count")
+    }
+
+
+def apply_counts(
+    expected: Dict[Tuple[int, str], int], stored: Dict[Tuple[int, str], int]
+) -> None:
+    """将计数行校正为重新统计的结果（写入有差异的行，删除多余的行）。"""
+    with transaction.atomic():
+        for (user_id, year_month), count in expected.items():
+            if stored.get((user_id, year_month)) != count:
+                UserUploadMonthCounter.objects.update_or_create(
+                    user_id=user_id, year_month=year_month, defaults={"count": count}
+                )
+        for user_id, year_month in stored.keys() - expected.keys():
+            UserUploadMonthCounter.objects.filter(user_id=user_id, year_month=year_month).delete()
@@ -0,0 +1,134 @@
+"""
+上传记录增量同步。
+
+每个用户维护一个单调递增的变更序号（UploadSyncState）：
+- 新增、修改上传（UserUpload.save）时分配新序号写入 UserUpload.sync_seq
+- 标签变化（不经过 save）时通过 touch_uploads 分配新序号
+- 删除上传时写入墓碑记录（UploadTombstone），保留 UPLOAD_TOMBSTONE_RETENTION_DAYS 天
+
+客户端保存上次同步返回的 syncToken，下次只拉取序号更大的上传与墓碑；
+令牌早于已清理的墓碑时返回全量清单（reset=true），全量清单分页返回，
+各页都是第一页同步令牌时的上传记录（get_uploads_through）。
+"""
+from __future__ import annotations
+
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, QuerySet
+from django.utils import timezone
+
+from core.models import UploadSyncState, UploadTombstone, UserUpload
+
+logger = logging.getLogger(__name__)
+
+
+def get_retention() -> timedelta:
+    return timedelta(days=getattr(settings, "UPLOAD_TOMBSTONE_RETENTION_DAYS", 30))
+
+
+def touch_uploads(upload_ids: Iterable[int]) -> None:
+    """为上传分配新的变更序号（用于不经过 save 的修改，例如标签变化）。"""
+    upload_ids = set(upload_ids)
+    if not upload_ids:
+        return
+    by_user = defaultdict(list)
+    for user_id, upload_id in UserUpload.objects.filter(pk__in=upload_ids).values_list("user_id", "id"):
+        by_user[user_id].append(upload_id)
+
+    now = timezone.now()
+    for user_id, ids in by_user.items():
+        with transaction.atomic():
+            seq = UploadSyncState.allocate(user_id)
+            UserUpload.objects.filter(pk__in=ids).update(sync_seq=seq, updated_at=now)
+
+
+def record_tombstone(upload: UserUpload) -> None:
+    """记录上传删除（与删除操作处于同一事务）。"""
+    with transaction.atomic():
+        UploadTombstone.objects.create(
+            user_id=upload.user_id,
+            upload_id=upload.pk,
+            sync_seq=UploadSyncState.allocate(upload.user_id),
+        )
+
+
+def purge_expired_tombstones(now: Optional[datetime] = None) -> int:
+    """
+    清理超过保留期的墓碑记录，并记录每个用户已清理的最大序号。
+
+    Returns:
+        清理的墓碑记录数
+    """
+    cutoff = (now or timezone.now()) - get_retention()
+    with transaction.atomic():
+        expired = UploadTombstone.objects.filter(deleted_at__lt=cutoff)
+        purged_through = expired.values("user_id").annotate(max_seq=Max("sync_seq")).order_by()
+        for row in purged_through:
+            UploadSyncState.objects.filter(
+                user_id=row["user_id"], purged_through_seq__lt=row["max_seq"]
+            ).update(purged_through_seq=row["max_seq"])
+        deleted, _ = expired.delete()
+    if deleted:
+        logger.info(f"清理上传墓碑记录: {deleted} 条")
+    return deleted
+
+
+def parse_sync_token(token: str | None) -> Optional[int]:
+    """
+    解析客户端的同步令牌，为空时返回 None（全量同步）。
+
+    Raises:
+        ValueError: 令牌格式无效
+    """
+    if token is None or token == "":
+        return None
+    seq = int(token)
+    if seq < 0:
+        raise ValueError(token)
+    return seq
+
+
+def get_uploads_through(user, seq: int) -> QuerySet:
+    """变更序号不超过 seq 的上传，即同步令牌 seq 时的全量清单。"""
+    return UserUpload.objects.filter(user=user, sync_seq__lte=seq)
+
+
+def get_manifest_changes(user, since: Optional[int]) -> Dict[str, Any]:
+    """
+    获取自同步令牌 since 之后的变更。
+
+    Returns:
+        - sync_token: 新的同步令牌
+        - reset: 是否为全量清单（客户端应丢弃本地清单）
+        - uploads: 新增或修改的上传查询集
+        - deleted: 已删除的上传ID列表
+    """
+    last_seq, purged_through_seq = (
+        UploadSyncState.objects.filter(user=user)
+        .values_list("last_seq", "purged_through_seq")
+        .first()
+        or (0, 0)
+    )
+    # 已分配的序号都已提交（写入在提交前持有序号行锁），超出 last_seq 的变更留到下次同步
+    uploads = get_uploads_through(user, last_seq)
+    reset = since is None or since > last_seq or since < purged_through_seq
+    if reset:
+        deleted = []
+    else:
+        uploads = uploads.filter(sync_seq__gt=since)
+        deleted = list(
+            UploadTombstone.objects.filter(
+                user=user, sync_seq__gt=since, sync_seq__lte=last_seq
+            ).values_list("upload_id", flat=True)
+        )
+    return {
+        "sync_token": str(last_seq),
+        "reset": reset,
+        "uploads": uploads,
+        "deleted": deleted,
+    }
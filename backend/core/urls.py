@@ -153,10 +153,12 @@ urlpatterns = [
     path("payments/orders/<int:order_id>/status/", views.get_order_status, name="get-order-status"),
     path("uploads/", views.UserUploadListCreateView.as_view(), name="user-uploads"),
     path("uploads/check-limit/", views.check_upload_limit, name="user-uploads-check-limit"),
+    path("uploads/manifest/", views.upload_manifest, name="user-uploads-manifest"),
     path("uploads/<int:pk>/", views.UserUploadDetailView.as_view(), name="user-upload-detail"),
     path("uploads/<int:pk>/image/", views.UserUploadImageView.as_view(), name="user-upload-image"),
     path("homepage/messages/", views.homepage_messages, name="homepage-messages"),
     path("goals/calendar/", views.goals_calendar, name="goals-calendar"),
+    path("goals/calendar/range/", views.goals_calendar_range, name="goals-calendar-range"),
     path("goals/check-in/", views.check_in, name="goals-check-in"),
     path(
         "goals/short-term/",
@@ -263,6 +265,7 @@ urlpatterns = [
     path("moods/", views.moods_list, name="moods-list"),
     # 月报 API
     path("reports/monthly/", views.monthly_report, name="monthly-report"),
+    path("reports/monthly/jobs/<str:job_id>/", views.monthly_report_job, name="monthly-report-job"),
     # 视觉分析 API
     path("visual-analysis/", views.VisualAnalysisResultListCreateView.as_view(), name="visual-analysis-list"),
     path("visual-analysis/<int:pk>/", views.VisualAnalysisResultDetailView.as_view(), name="visual-analysis-detail"),
@@ -10,11 +10,14 @@ from __future__ import annotations
 
 import logging
 from datetime import timedelta
-from typing import Dict
+from typing import Dict, Iterable, List
 
 from django.core.cache import cache
+from django.db.models import Count
 from django.utils import timezone
 
+from core.check_in_stats import get_check_in_stats_bulk
+from core.db_utils import conflict_target
 from core.models import DailyCheckIn, UserStats, UserUpload
 
 logger = logging.getLogger(__name__)
@@ -156,6 +159,61 @@ def update_for_user(user) -> UserStats:
     return stats
 
 
+def update_for_users(users: Iterable) -> List[UserStats]:
+    """
+    批量强制更新多个用户的统计数据（使用物化表）。
+
+    无论用户数量多少，统计计算只需固定次数的分组查询，结果一次性写入，
+    适用于定时任务和管理命令中的批量刷新。
+
+    Args:
+        users: 用户对象列表
+
+    Returns:
+        更新后的 UserStats 对象列表
+    """
+    users = list(users)
+    if not users:
+        return []
+    user_ids = [user.id for user in users]
+
+    check_in_stats = get_check_in_stats_bulk(user_ids)
+    upload_counts = dict(
+        UserUpload.objects.filter(user_id__in=user_ids)
+        .order_by()
+        .values("user_id")
+        .annotate(total=Count("id"))
+        .values_list("user_id", "total")
+    )
+
+    stats_list = []
+    for user in users:
+        user_check_in_stats = check_in_stats[user.id]
+        stats_list.append(
+            UserStats(
+                user=user,
+                total_uploads=upload_counts.get(user.id, 0),
+                total_checkins=user_check_in_stats["total_checkins"],
+                current_streak=user_check_in_stats["current_streak"],
+                checked_today=user_check_in_stats["checked_today"],
+            )
+        )
+
+    # 一条语句写入整批数据：已存在的记录就地更新
+    return UserStats.objects.bulk_create(
+        stats_list,
+        update_conflicts=True,
+        unique_fields=conflict_target(["user"]),
+        update_fields=[
+            "total_uploads",
+            "total_checkins",
+            "current_streak",
+            "checked_today",
+            "last_updated",
+        ],
+    )
+
+
 def user_stats_to_dict(stats: UserStats) -> Dict[str, any]:
     """转换为字典格式"""
     return {
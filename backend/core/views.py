@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-import random
 import secrets
+import base64
 import calendar
+import hashlib
 import mimetypes
 import os
 import logging
@@ -14,21 +15,47 @@ from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.mail import send_mail
 from django.core.validators import validate_email
 from django.db import transaction, IntegrityError, models
-from django.db.models import Max
+from django.db.models import Count, Max, Q
 from django.http import FileResponse, Http404, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.http import parse_etags, quote_etag
 from rest_framework import generics, status, serializers
+from rest_framework.exceptions import NotFound
 from rest_framework.decorators import api_view, permission_classes, authentication_classes, throttle_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.views import APIView
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.utils.urls import replace_query_param
 from django.utils.decorators import method_decorator
 from django.views.decorators.cache import cache_page
 from django.views.decorators.csrf import csrf_exempt
+from config.renderers import ORJSONParser
+from core import (
+    auth_token_cache,
+    monthly_report_jobs,
+    rate_limit,
+    task_completion_cache,
+    upload_quota,
+    upload_sync,
+)
+from core.check_in_stats import get_check_in_stats_bulk
+from core.db_utils import conflict_target
 from core.email_utils import send_mail_async
+from core.goal_progress import rebuild_goal_progress
+from core.goal_snapshots import (
+    discard_goal_snapshot,
+    ensure_goal_snapshots,
+    refresh_existing_snapshot,
+    render_goal_snapshot,
+)
+from core.homepage_cache import get_daily_fragments, get_encouragement_sampler
+from core.monthly_reports import generate_reports_for_users
+from core.projections import MoodProjection, ShortTermGoalProjection, TagProjection, UploadProjection
+from core.short_term_goal_status import update_goal_status
 
 # 配置日志记录器
 logger = logging.getLogger(__name__)
@@ -137,21 +164,6 @@ def get_today_shanghai() -> date:
         return shanghai_time.date()
 
 
-def get_current_month_range_shanghai() -> tuple[date, date]:
-    """
-    获取中国时区（Asia/Shanghai）的当前月份的开始和结束日期。
-    返回 (month_start, month_end) 元组。
-    """
-    today = get_today_shanghai()
-    month_start = date(today.year, today.month, 1)
-    # 获取当月最后一天
-    if today.month == 12:
-        month_end = date(today.year + 1, 1, 1) - timedelta(days=1)
-    else:
-        month_end = date(today.year, today.month + 1, 1) - timedelta(days=1)
-    return (month_start, month_end)
-
-
 def is_valid_member(profile) -> bool:
     """
     检查用户是否为有效会员。
@@ -183,13 +195,10 @@ def is_valid_member(profile) -> bool:
 from core.models import (
     AuthToken,
     ConditionalMessage,
-    DailyHistoryMessage,
     DailyCheckIn,
     EmailVerification,
-    EncouragementMessage,
-    HolidayMessage,
-    LoginAttempt,
     LongTermGoal,
+    LongTermGoalSnapshot,
     VisualAnalysisResult,
     LongTermPlanCopy,
     Mood,
@@ -210,6 +219,7 @@ from core.models import (
     UserTaskPreset,
     UserUpload,
     YearlyGoalPreset,
+    to_shanghai_date,
 )
 from core.serializers import (
     LongTermGoalSerializer,
@@ -217,7 +227,6 @@ from core.serializers import (
     LongTermPlanCopyPublicSerializer,
     ShortTermGoalSerializer,
     ShortTermTaskPresetPublicSerializer,
-    MoodSerializer,
     TagSerializer,
     UserTaskPresetPublicSerializer,
     UserTaskPresetSerializer,
@@ -225,6 +234,7 @@ from core.serializers import (
     UserProfileSerializer,
     VisualAnalysisResultSerializer,
     YearlyGoalPresetPublicSerializer,
+    get_signed_image_url_expiry,
 )
 
 CODE_EXPIRY_MINUTES = 10
@@ -431,39 +441,25 @@ def send_verification_code(request):
     client_ip = get_client_ip(request)
     now = timezone.now()
     
+    # 限流计数保存在缓存中（core.rate_limit），EmailVerification 记录不参与计数
     # 1. 检查邮箱级别的发送频率限制（60秒间隔）
-    latest_record = (
-        EmailVerification.objects.filter(email__iexact=email, purpose=purpose)
-        .order_by("-created_at")
-        .first()
-    )
-
-    if latest_record and (now - latest_record.created_at).total_seconds() < RESEND_INTERVAL_SECONDS:
-        remaining = RESEND_INTERVAL_SECONDS - int(
-            (now - latest_record.created_at).total_seconds()
-        )
+    resend_identity = f"{purpose}:{email}"
+    remaining = rate_limit.VERIFICATION_RESEND.remaining(resend_identity)
+    if remaining > 0:
         return Response(
             {
                 "detail": f"请求过于频繁，请 {remaining} 秒后再试",
-                "retry_after": max(remaining, 0),
+                "retry_after": remaining,
             },
             status=status.HTTP_429_TOO_MANY_REQUESTS,
         )
     
     # 2. 检查IP级别的发送频率限制（每小时最多10次）
     # 增强：同时检查IP和邮箱的组合，防止通过多个邮箱绕过IP限流
-    # 性能优化：使用ip_address字段而不是metadata__ip，利用索引
-    one_hour_ago = now - timedelta(hours=1)
-    ip_send_count = EmailVerification.objects.filter(
-        ip_address=client_ip,
-        created_at__gte=one_hour_ago
-    ).count()
+    ip_send_count = rate_limit.VERIFICATION_SENDS_BY_IP.count(client_ip)
     
     # 检查该IP是否使用了过多不同的邮箱（可能是自动化攻击）
-    unique_emails_from_ip = EmailVerification.objects.filter(
-        ip_address=client_ip,
-        created_at__gte=one_hour_ago
-    ).values('email').distinct().count()
+    unique_emails_from_ip = rate_limit.VERIFICATION_EMAILS_BY_IP.count(client_ip)
     
     # 如果同一IP使用了超过5个不同邮箱，可能是攻击行为
     MAX_UNIQUE_EMAILS_PER_IP_PER_HOUR = 5
@@ -481,39 +477,18 @@ def send_verification_code(request):
         )
     
     if ip_send_count >= IP_RATE_LIMIT_PER_HOUR:
-        # 计算下次可用的时间
-        # 性能优化：使用ip_address字段而不是metadata__ip
-        oldest_in_hour = EmailVerification.objects.filter(
-            ip_address=client_ip,
-            created_at__gte=one_hour_ago
-        ).order_by('created_at').first()
-        if oldest_in_hour:
-            next_available = oldest_in_hour.created_at + timedelta(hours=1)
-            remaining_seconds = int((next_available - now).total_seconds())
-            return Response(
-                {
-                    "detail": f"该IP地址发送验证码过于频繁，请 {max(remaining_seconds // 60, 1)} 分钟后再试",
-                    "retry_after": max(remaining_seconds, 0),
-                },
-                status=status.HTTP_429_TOO_MANY_REQUESTS,
-            )
+        # 计算下次可用的时间（最早一次发送离开一小时窗口）
+        remaining_seconds = rate_limit.VERIFICATION_SENDS_BY_IP.retry_after(client_ip)
         return Response(
             {
-                "detail": f"该IP地址发送验证码过于频繁，请1小时后再试",
+                "detail": f"该IP地址发送验证码过于频繁，请 {max(remaining_seconds // 60, 1)} 分钟后再试",
+                "retry_after": remaining_seconds,
             },
             status=status.HTTP_429_TOO_MANY_REQUESTS,
         )
     
     # 3. 检查邮箱每日发送上限（每天最多20次）
-    from datetime import datetime
-    today_start = get_today_shanghai()
-    today_start_dt = timezone.make_aware(
-        datetime.combine(today_start, datetime.min.time())
-    )
-    email_send_count_today = EmailVerification.objects.filter(
-        email__iexact=email,
-        created_at__gte=today_start_dt
-    ).count()
+    email_send_count_today = rate_limit.VERIFICATION_SENDS_BY_EMAIL_DAILY.count(email)
     
     if email_send_count_today >= EMAIL_DAILY_LIMIT:
         return Response(
@@ -568,6 +543,12 @@ def send_verification_code(request):
         payload = {"detail": "验证码发送失败，请检查网络连接后重试。如果问题持续，请联系客服。"}
         return Response(payload, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    # 发送成功后计入各项限流
+    rate_limit.VERIFICATION_RESEND.start(resend_identity)
+    rate_limit.VERIFICATION_SENDS_BY_IP.hit(client_ip)
+    rate_limit.VERIFICATION_EMAILS_BY_IP.hit_distinct(client_ip, email)
+    rate_limit.VERIFICATION_SENDS_BY_EMAIL_DAILY.hit(email)
+
     return Response({"detail": "验证码已发送"}, status=status.HTTP_200_OK)
 
 
@@ -874,6 +855,12 @@ def reset_password(request):
     return Response({"token": token_key, "user": _user_payload(primary_user)})
 
 
+def _record_login_failure(email: str, client_ip: str) -> None:
+    rate_limit.LOGIN_FAILURES_BY_EMAIL.hit(email)
+    rate_limit.LOGIN_FAILURES_BY_IP.hit(client_ip)
+    rate_limit.record_login_attempt(email, client_ip, success=False)
+
+
 @api_view(["POST"])
 @permission_classes([AllowAny])
 @authentication_classes([])
@@ -930,23 +917,9 @@ def login(request):
             client_ip = first_ip
     
     # 检查最近15分钟内的登录失败次数（同一IP或同一邮箱）
-    # 优化：分别查询邮箱和IP，利用索引，然后取最大值
-    # 这样比OR查询更高效，特别是在高并发场景下
-    fifteen_minutes_ago = timezone.now() - timedelta(minutes=15)
-    
-    # 使用专门的LoginAttempt模型记录登录尝试
-    # 分别查询邮箱和IP的失败次数，利用各自的索引
-    email_failures = LoginAttempt.objects.filter(
-        email__iexact=email,
-        success=False,
-        created_at__gte=fifteen_minutes_ago
-    ).count()
-    
-    ip_failures = LoginAttempt.objects.filter(
-        ip_address=client_ip,
-        success=False,
-        created_at__gte=fifteen_minutes_ago
-    ).count()
+    # 失败次数保存在缓存的滑动窗口计数中（core.rate_limit），LoginAttempt 记录仅用于审计
+    email_failures = rate_limit.LOGIN_FAILURES_BY_EMAIL.count(email)
+    ip_failures = rate_limit.LOGIN_FAILURES_BY_IP.count(client_ip)
     
     # 取两者中的最大值（更严格的限制）
     recent_failures = max(email_failures, ip_failures)
@@ -968,32 +941,20 @@ def login(request):
         user = user_model.objects.get(email__iexact=email)
     except user_model.DoesNotExist:
         # 记录登录失败尝试
-        LoginAttempt.objects.create(
-            email=email,
-            ip_address=client_ip,
-            success=False,
-        )
+        _record_login_failure(email, client_ip)
         return Response(
             {"detail": "邮箱或密码错误，请检查后重试。如忘记密码，可使用\"忘记密码\"功能重置。"}, status=status.HTTP_400_BAD_REQUEST
         )
 
     if not user.check_password(password):
         # 记录登录失败尝试
-        LoginAttempt.objects.create(
-            email=email,
-            ip_address=client_ip,
-            success=False,
-        )
+        _record_login_failure(email, client_ip)
         return Response(
             {"detail": "邮箱或密码错误，请检查后重试。如忘记密码，可使用\"忘记密码\"功能重置。"}, status=status.HTTP_400_BAD_REQUEST
         )
 
     # 记录登录成功
-    LoginAttempt.objects.create(
-        email=email,
-        ip_address=client_ip,
-        success=True,
-    )
+    rate_limit.record_login_attempt(email, client_ip, success=True)
 
     token_key = AuthToken.issue_for_user(user)
 
@@ -1175,11 +1136,101 @@ class FeaturedArtworksView(APIView):
         return Response({"featured_artwork_ids": validated_ids})
 
 
+class UploadKeysetPagination(BasePagination):
+    """
+    上传列表的游标分页：按 (uploaded_at, id) 倒序取下一页，使用 (user, -uploaded_at) 索引，
+    翻页开销与页码无关。
+
+    仅当请求带有 cursor 或 page_size 参数时启用，否则返回完整数组（兼容旧客户端）。
+    分页对象为 .values() 查询集（见 UploadProjection），每行需包含 uploaded_at 与 id。
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 50
+    max_page_size = 200
+    invalid_cursor_message = "无效的分页游标。"
+    # 为 True 时即使请求不带分页参数也分页
+    always_paginate = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if (
+            not self.always_paginate
+            and self.cursor_query_param not in params
+            and self.page_size_query_param not in params
+        ):
+            return None
+
+        self.request = request
+        self.page_size = self._get_page_size(request)
+        cursor = params.get(self.cursor_query_param)
+        if cursor:
+            uploaded_at, pk = self._decode_cursor(cursor)
+            queryset = queryset.filter(
+                Q(uploaded_at__lt=uploaded_at) | Q(uploaded_at=uploaded_at, pk__lt=pk)
+            )
+
+        # 多取一条用于判断是否还有下一页
+        rows = list(queryset.order_by("-uploaded_at", "-id")[: self.page_size + 1])
+        page = rows[: self.page_size]
+        self.next_cursor = self._encode_cursor(page[-1]) if len(rows) > self.page_size else None
+        return page
+
+    def get_next_link(self) -> str | None:
+        if not self.next_cursor:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def _get_page_size(self, request) -> int:
+        try:
+            page_size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    @staticmethod
+    def _encode_cursor(row: dict) -> str:
+        raw = f"{row['uploaded_at'].isoformat()}|{row['id']}"
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    def _decode_cursor(self, cursor: str) -> tuple[datetime, int]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+            uploaded_at, pk = raw.rsplit("|", 1)
+            return datetime.fromisoformat(uploaded_at), int(pk)
+        except (ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+
+class UploadManifestPagination(UploadKeysetPagination):
+    """
+    全量同步清单的游标分页：清单接口总是分页。
+
+    后续页链接的 since 固定为第一页返回的 syncToken，各页都是该令牌时的上传记录。
+    """
+    always_paginate = True
+    page_size = 200
+    max_page_size = 500
+    sync_token_query_param = "since"
+
+    def get_next_link(self, sync_token: str | None = None) -> str | None:
+        next_url = super().get_next_link()
+        if next_url is None or sync_token is None:
+            return next_url
+        return replace_query_param(next_url, self.sync_token_query_param, sync_token)
+
+
 class UserUploadListCreateView(generics.ListCreateAPIView):
     serializer_class = UserUploadSerializer
     permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
-    pagination_class = None  # 保持前端期望的数组响应，不受全局分页影响
+    parser_classes = [MultiPartParser, FormParser, ORJSONParser]
+    # 默认返回前端期望的数组响应；带 cursor 或 page_size 参数时按游标分页
+    pagination_class = UploadKeysetPagination
     # 开发模式下禁用限流，生产模式下使用自定义限流作用域
     throttle_scope = None if settings.DEBUG else "uploads_get"
 
@@ -1197,12 +1248,59 @@ class UserUploadListCreateView(generics.ListCreateAPIView):
                 "tags",
                 "duration_minutes",
                 "image",
+                "thumbnail",
                 "created_at",
                 "updated_at",
             )
-            .order_by("-uploaded_at")
+            .select_related("mood")
+            .prefetch_related("tags")
+            .order_by("-uploaded_at", "-id")
         )
 
+    def _get_list_etag(self, request) -> str:
+        """
+        由用户上传记录的数量与最近修改时间生成强 ETag。
+
+        图片链接中包含访问令牌与域名，分页结果与查询参数有关，一并计入。
+        图片为预签名直链时再计入半个签名有效期的时间段，304 沿用的响应中链接仍至少有效半个有效期。
+        """
+        state = UserUpload.objects.filter(user=request.user).aggregate(
+            count=Count("id"), last_updated=Max("updated_at")
+        )
+        token = getattr(request.auth, "key", None) or ""
+        last_updated = state["last_updated"].isoformat() if state["last_updated"] else ""
+        parts = [
+            str(request.user.pk),
+            str(state["count"]),
+            last_updated,
+            request.get_host(),
+            token,
+            request.META.get("QUERY_STRING", ""),
+        ]
+        signed_url_expiry = get_signed_image_url_expiry()
+        if signed_url_expiry:
+            parts.append(str(int(timezone.now().timestamp()) // max(signed_url_expiry // 2, 1)))
+        material = "|".join(parts)
+        return quote_etag(hashlib.sha256(material.encode("utf-8")).hexdigest())
+
+    def list(self, request, *args, **kwargs):
+        etag = self._get_list_etag(request)
+        # 弱比较：压缩中间件会把强 ETag 改为弱 ETag
+        if etag in {tag.removeprefix("W/") for tag in parse_etags(request.headers.get("If-None-Match", ""))}:
+            # 上传记录未变化：不再序列化与生成图片链接
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        # 只读列表不经过序列化器，直接由 .values() 行构建响应（输出与 UserUploadSerializer 一致）
+        projection = UploadProjection(request)
+        queryset = projection.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            response = self.get_paginated_response(projection.project(page))
+        else:
+            response = Response(projection.project(queryset))
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
     @transaction.atomic
     def perform_create(self, serializer: UserUploadSerializer):
         # 检查用户是否为有效会员（包括检查会员是否过期）
@@ -1221,56 +1319,26 @@ class UserUploadListCreateView(generics.ListCreateAPIView):
         
         # 非会员用户只能上传1张图片
         # 注意：这里检查的是总上传数量，不会删除已有图片
-        # 在锁定用户记录后检查，确保并发安全
+        # 在锁定用户记录后检查，确保并发安全：上传计数在保存时于同一事务中递增
         if not is_member:
-            total_uploads_count = UserUpload.objects.filter(user=locked_user).count()
-            if total_uploads_count >= 1:
+            if upload_quota.get_total_count(locked_user.pk) >= upload_quota.NON_MEMBER_MAX_UPLOADS:
                 raise serializers.ValidationError(
                     "非会员用户只能上传1张图片。加入EchoDraw会员可享受无限制上传。"
                 )
         
         # 会员用户检查每月上传限制（150张）
-        # 使用 created_at 字段检查本月实际上传的数量，而不是 uploaded_at（用户可能设置为过去的日期）
-        month_start, month_end = get_current_month_range_shanghai()
-        monthly_uploads_count = UserUpload.objects.filter(
-            user=locked_user,
-            created_at__date__gte=month_start,
-            created_at__date__lte=month_end
-        ).count()
-        
-        MAX_MONTHLY_UPLOADS = 150
-        if is_member and monthly_uploads_count >= MAX_MONTHLY_UPLOADS:
-            raise serializers.ValidationError(
-                f"本月已上传 {monthly_uploads_count} 张图片，已达到每月上限 {MAX_MONTHLY_UPLOADS} 张。"
-            )
+        # 按 created_at 计数，而不是 uploaded_at（用户可能设置为过去的日期）
+        if is_member:
+            monthly_uploads_count = upload_quota.get_monthly_count(locked_user.pk)
+            if monthly_uploads_count >= upload_quota.MAX_MONTHLY_UPLOADS:
+                raise serializers.ValidationError(
+                    f"本月已上传 {monthly_uploads_count} 张图片，已达到每月上限 {upload_quota.MAX_MONTHLY_UPLOADS} 张。"
+                )
         
         try:
             # 使用锁定的用户对象保存上传记录
             upload = serializer.save(user=locked_user)
             
-            # 保存后再次验证限制（双重检查，防止在保存过程中出现并发问题）
-            if not is_member:
-                total_uploads_count_after = UserUpload.objects.filter(user=locked_user).count()
-                if total_uploads_count_after > 1:
-                    # 如果超过限制，删除刚创建的上传记录并抛出错误
-                    upload.delete()
-                    raise serializers.ValidationError(
-                        "非会员用户只能上传1张图片。加入EchoDraw会员可享受无限制上传。"
-                    )
-            
-            if is_member:
-                monthly_uploads_count_after = UserUpload.objects.filter(
-                    user=locked_user,
-                    created_at__date__gte=month_start,
-                    created_at__date__lte=month_end
-                ).count()
-                if monthly_uploads_count_after > MAX_MONTHLY_UPLOADS:
-                    # 如果超过限制，删除刚创建的上传记录并抛出错误
-                    upload.delete()
-                    raise serializers.ValidationError(
-                        f"本月已上传 {monthly_uploads_count_after} 张图片，已达到每月上限 {MAX_MONTHLY_UPLOADS} 张。"
-                    )
-            
             # 记录上传成功信息，包括图片URL和存储位置
             image_url = None
             storage_backend = None
@@ -1363,26 +1431,10 @@ class UserUploadListCreateView(generics.ListCreateAPIView):
             )
             raise
 
-        # 确保 uploaded_at 有时区信息，如果没有则使用当前时间（支持模拟日期）
-        uploaded_at = upload.uploaded_at
-        if uploaded_at is None:
-            uploaded_at = get_now_with_mock()
-        # 确保是时区感知的 datetime
-        elif timezone.is_naive(uploaded_at):
-            uploaded_at = timezone.make_aware(uploaded_at)
-
-        # 明确转换为中国时区，确保日期计算正确
-        # 安全修复：检查 SHANGHAI_TZ 是否为 None
-        if SHANGHAI_TZ is None:
-            logger.warning(
-                f"SHANGHAI_TZ 未配置，使用时区回退方案",
-                extra={"user_id": self.request.user.id}
-            )
-            # 回退方案：直接使用本地日期
-            checkin_date = uploaded_at.date()
-        else:
-            shanghai_time = uploaded_at.astimezone(SHANGHAI_TZ)
-            checkin_date = shanghai_time.date()
+        # 打卡日期即上传记录的中国时区日期（保存时已维护到 local_date）
+        checkin_date = upload.local_date
+        if checkin_date is None:
+            checkin_date = to_shanghai_date(get_now_with_mock())
 
         # 使用事务和异常处理防止并发竞态条件
         try:
@@ -1424,14 +1476,9 @@ def check_upload_limit(request):
     }
     """
     # 使用 created_at 字段检查本月实际上传的数量，而不是 uploaded_at（用户可能设置为过去的日期）
-    month_start, month_end = get_current_month_range_shanghai()
-    monthly_uploads_count = UserUpload.objects.filter(
-        user=request.user,
-        created_at__date__gte=month_start,
-        created_at__date__lte=month_end
-    ).count()
-    
-    MAX_MONTHLY_UPLOADS = 150
+    monthly_uploads_count = upload_quota.get_monthly_count(request.user.pk)
+    
+    MAX_MONTHLY_UPLOADS = upload_quota.MAX_MONTHLY_UPLOADS
     remaining = max(0, MAX_MONTHLY_UPLOADS - monthly_uploads_count)
     can_upload = monthly_uploads_count < MAX_MONTHLY_UPLOADS
     
@@ -1446,7 +1493,7 @@ def check_upload_limit(request):
 class UserUploadDetailView(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = UserUploadSerializer
     permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    parser_classes = [MultiPartParser, FormParser, ORJSONParser]
 
     def get_queryset(self):
         return (
@@ -1462,13 +1509,73 @@ class UserUploadDetailView(generics.RetrieveUpdateDestroyAPIView):
                 "tags",
                 "duration_minutes",
                 "image",
+                "thumbnail",
                 "created_at",
                 "updated_at",
             )
+            .select_related("mood")
             .order_by("-uploaded_at")
         )
 
 
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def upload_manifest(request):
+    """
+    上传记录增量同步清单。
+
+    客户端传入上次返回的 syncToken（参数 since），只返回之后新增/修改的上传与已删除的上传ID；
+    未传入或令牌过旧（删除记录已清理）时返回全量清单并标记 reset=true；令牌格式无效时返回 400。
+
+    全量清单按 (uploaded_at, id) 倒序游标分页（page_size 可选）：next 不为空时继续请求 next
+    （携带 since=本次 syncToken 与 cursor），后续页 reset=false、syncToken 不变，
+    其间的修改与删除由下次增量同步返回。客户端取完所有页后再保存 syncToken。
+    """
+    try:
+        since = upload_sync.parse_sync_token(request.query_params.get("since"))
+    except ValueError:
+        return Response(
+            {"detail": "无效的同步令牌。"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    projection = UploadProjection(request)
+    if request.query_params.get(UploadManifestPagination.cursor_query_param):
+        # 全量清单的后续页
+        if since is None:
+            return Response(
+                {"detail": "缺少同步令牌。"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        changes = {
+            "sync_token": str(since),
+            "reset": False,
+            "uploads": upload_sync.get_uploads_through(request.user, since),
+            "deleted": [],
+        }
+        paged = True
+    else:
+        changes = upload_sync.get_manifest_changes(request.user, since)
+        paged = changes["reset"]
+
+    next_url = None
+    if paged:
+        paginator = UploadManifestPagination()
+        uploads = paginator.paginate_queryset(projection.values(changes["uploads"]), request)
+        next_url = paginator.get_next_link(changes["sync_token"])
+    else:
+        uploads = changes["uploads"].order_by("-uploaded_at", "-id")
+    return Response(
+        {
+            "syncToken": changes["sync_token"],
+            "reset": changes["reset"],
+            "uploads": projection.project(uploads),
+            "deleted": changes["deleted"],
+            "next": next_url,
+        }
+    )
+
+
 class UserUploadImageView(APIView):
     permission_classes = [AllowAny]
 
@@ -1482,16 +1589,15 @@ class UserUploadImageView(APIView):
         if not token_value:
             return None
 
-        try:
-            token = AuthToken.objects.select_related("user").get(key=token_value)
-            # 安全修复：检查token是否过期
-            if token.is_expired:
-                return None
-        except AuthToken.DoesNotExist:
+        token = auth_token_cache.get_token(token_value)
+        # 安全修复：检查token是否过期
+        if token is None or token.is_expired:
             return None
 
-        # 使用update避免竞态条件
-        AuthToken.objects.filter(pk=token.pk).update(last_used_at=timezone.now())
+        try:
+            auth_token_cache.touch(token.pk)
+        except Exception:
+            logger.warning(f"无法记录 token {token.pk} 的最近使用时间", exc_info=True)
         return token.user
 
     def options(self, request, pk: int):
@@ -1649,84 +1755,6 @@ class UserUploadImageView(APIView):
         return response
 
 
-def _check_and_update_short_term_goal_status(goal: ShortTermGoal) -> bool:
-    """
-    检查短期目标是否已完成：
-    1. 完成所有打卡天数
-    2. 时间期限已到（创建日期 + 持续天数）
-    如果满足任一条件，更新状态为completed。
-    返回True表示状态已更新，False表示未更新。
-    """
-    # 只检查状态为active的目标
-    if goal.status != ShortTermGoal.STATUS_ACTIVE:
-        return False
-    
-    # 确保 duration_days 是整数类型（处理可能的字符串类型）
-    try:
-        duration_days = int(goal.duration_days) if goal.duration_days is not None else 0
-    except (ValueError, TypeError):
-        logger.warning(
-            f"短期目标 duration_days 无效: goal_id={goal.id}, duration_days={goal.duration_days}"
-        )
-        return False
-    
-    if duration_days <= 0:
-        return False
-    
-    # 检查1：获取该目标的所有任务完成记录，按日期去重
-    completed_dates = set(
-        ShortTermGoalTaskCompletion.objects.filter(goal=goal)
-        .values_list("date", flat=True)
-        .distinct()
-    )
-    
-    # 如果已完成的天数达到目标天数，更新状态为completed
-    if len(completed_dates) >= duration_days:
-        goal.status = ShortTermGoal.STATUS_COMPLETED
-        goal.save(update_fields=["status", "updated_at"])
-        logger.info(
-            f"短期目标自动完成（打卡完成）: goal_id={goal.id}, user_id={goal.user.id}, "
-            f"completed_dates={len(completed_dates)}, duration_days={duration_days}"
-        )
-        return True
-    
-    # 检查2：时间期限是否已到
-    # 计算目标的结束日期（创建日期 + 持续天数 - 1，因为第一天是创建日）
-    if goal.created_at:
-        # 确保created_at是aware datetime
-        created_at = goal.created_at
-        if timezone.is_naive(created_at):
-            created_at = timezone.make_aware(created_at)
-        
-        # 转换为上海时区计算日期
-        if SHANGHAI_TZ is not None:
-            created_at_shanghai = created_at.astimezone(SHANGHAI_TZ)
-            created_date = created_at_shanghai.date()
-        else:
-            # 回退：使用本地时区
-            created_date = timezone.localdate(created_at)
-        
-        # 计算结束日期（创建日期 + 持续天数 - 1）
-        from datetime import timedelta
-        end_date = created_date + timedelta(days=duration_days - 1)
-        
-        # 获取今天的日期（上海时区）
-        today = get_today_shanghai()
-        
-        # 如果今天已经超过结束日期，更新状态为completed
-        if today > end_date:
-            goal.status = ShortTermGoal.STATUS_COMPLETED
-            goal.save(update_fields=["status", "updated_at"])
-            logger.info(
-                f"短期目标自动完成（期限已到）: goal_id={goal.id}, user_id={goal.user.id}, "
-                f"created_date={created_date.isoformat()}, end_date={end_date.isoformat()}, "
-                f"today={today.isoformat()}, duration_days={duration_days}"
-            )
-            return True
-    
-    return False
-
-
 class ShortTermGoalListCreateView(generics.ListCreateAPIView):
     serializer_class = ShortTermGoalSerializer
     permission_classes = [IsAuthenticated]
@@ -1735,26 +1763,16 @@ class ShortTermGoalListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         queryset = (
             ShortTermGoal.objects.filter(user=self.request.user)
-            .only("id", "title", "duration_days", "plan_type", "schedule", "status", "created_at", "updated_at")
+            .only("id", "title", "duration_days", "plan_type", "schedule", "status", "started_at", "created_at", "updated_at")
             .order_by("-created_at", "-id")
         )
-        
-        # 检查并更新已完成但状态未更新的目标
-        # 只检查状态为active的目标，避免不必要的查询
-        active_goals = list(queryset.filter(status=ShortTermGoal.STATUS_ACTIVE))
-        for goal in active_goals:
-            try:
-                _check_and_update_short_term_goal_status(goal)
-            except Exception as e:
-                # 如果检查失败，记录错误但不影响列表返回
-                logger.warning(
-                    f"检查短期目标完成状态失败: goal_id={goal.id}, error={str(e)}",
-                    exc_info=True
-                )
-        
-        # 重新获取queryset以确保状态已更新
+        # 状态流转由定时任务 sweep_short_term_goal_statuses_task 完成，读取时不写数据库；
+        # 已过期但尚未被扫描的目标由序列化器按期限展示为已完成
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        return Response(ShortTermGoalProjection(request).project(self.get_queryset()))
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context["request"] = self.request
@@ -1767,23 +1785,9 @@ class ShortTermGoalDetailView(generics.RetrieveUpdateDestroyAPIView):
 
     def get_queryset(self):
         queryset = ShortTermGoal.objects.filter(user=self.request.user).only(
-            "id", "title", "duration_days", "plan_type", "schedule", "status", "created_at", "updated_at", "user"
+            "id", "title", "duration_days", "plan_type", "schedule", "status", "started_at", "created_at", "updated_at", "user"
         )
-        
-        # 检查并更新已完成但状态未更新的目标
-        # 只检查状态为active的目标，避免不必要的查询
-        active_goals = list(queryset.filter(status=ShortTermGoal.STATUS_ACTIVE))
-        for goal in active_goals:
-            try:
-                _check_and_update_short_term_goal_status(goal)
-            except Exception as e:
-                # 如果检查失败，记录错误但不影响详情返回
-                logger.warning(
-                    f"检查短期目标完成状态失败: goal_id={goal.id}, error={str(e)}",
-                    exc_info=True
-                )
-        
-        # 重新获取queryset以确保状态已更新
+        # 读取时不写数据库，状态流转见 core.short_term_goal_status
         return queryset
 
 
@@ -1841,7 +1845,7 @@ def short_term_goal_task_completions(request, goal_id):
     """
     user = request.user
     try:
-        goal = ShortTermGoal.objects.select_related('user').get(pk=goal_id, user=user)
+        goal = ShortTermGoal.objects.only("id", "user", "updated_at").get(pk=goal_id, user=user)
     except ShortTermGoal.DoesNotExist:
         # 使用统一错误消息，不泄露是否存在该目标
         return Response(
@@ -1849,54 +1853,7 @@ def short_term_goal_task_completions(request, goal_id):
             status=status.HTTP_404_NOT_FOUND,
         )
     
-    # 获取所有任务完成记录
-    # 性能优化：使用select_related避免N+1查询
-    completions = ShortTermGoalTaskCompletion.objects.filter(
-        goal=goal
-    ).select_related("upload", "goal").order_by("date", "task_id")
-    
-    # 构建返回数据：按日期和任务ID组织
-    # 使用任务完成记录的创建时间作为该目标的完成时间（而不是DailyCheckIn的时间）
-    result = {}
-    checkin_times = {}
-    for completion in completions:
-        date_key = completion.date.isoformat()
-        if date_key not in result:
-            result[date_key] = {}
-        
-        # 使用任务完成记录的创建时间作为该目标的完成时间
-        # 对于同一天，使用最早的任务完成时间（第一次完成的时间）
-        if date_key not in checkin_times:
-            checkin_times[date_key] = completion.created_at.isoformat()
-        else:
-            # 如果已有时间，使用更早的时间（第一次完成的时间）
-            try:
-                # 解析已有的ISO格式时间字符串
-                existing_time_str = checkin_times[date_key]
-                if isinstance(existing_time_str, str):
-                    # 使用datetime.fromisoformat（Python 3.7+）
-                    existing_time = datetime.fromisoformat(existing_time_str.replace('Z', '+00:00'))
-                    if completion.created_at < existing_time:
-                        checkin_times[date_key] = completion.created_at.isoformat()
-                else:
-                    checkin_times[date_key] = completion.created_at.isoformat()
-            except (ValueError, TypeError, AttributeError):
-                # 如果解析失败，使用当前记录的时间
-                checkin_times[date_key] = completion.created_at.isoformat()
-        
-        # 构建上传记录信息
-        upload_data = {
-            "id": completion.upload.id,
-            "title": completion.upload.title,
-            "image": completion.upload.image.url if completion.upload.image else None,
-            "uploaded_at": completion.upload.uploaded_at.isoformat(),
-        }
-        result[date_key][completion.task_id] = upload_data
-    
-    return Response({
-        "completions": result,
-        "checkin_times": checkin_times,
-    })
+    return Response(task_completion_cache.get_payload(goal, request))
 
 
 class UserTaskPresetListCreateView(generics.ListCreateAPIView):
@@ -1979,6 +1936,9 @@ def homepage_messages(request):
                     extra={"trace_id": trace_id, "user_id": user_id}
                 )
 
+        # 与用户无关的片段（节日、历史文案）按天缓存
+        fragments = get_daily_fragments(today)
+
         # 第一块：通用文案（随机展示，仅在不是特殊打卡日期时显示）
         # 如果匹配到条件文案（特殊打卡日期），则不显示通用文案
         general_text = None
@@ -1991,26 +1951,16 @@ def homepage_messages(request):
                 )
 
         # 第三块：节日文案和历史文案（基于日期）
-        holiday_message = HolidayMessage.get_for_date(today)
-        holiday_payload = None
-        if holiday_message:
-            holiday_payload = {
-                "headline": holiday_message.headline or None,
-                "text": holiday_message.text,
-            }
+        holiday_payload = fragments["holiday"]
+        if holiday_payload:
             logger.debug(
                 f"matched holiday message for date {today.isoformat()}",
                 extra={"trace_id": trace_id, "user_id": user_id}
             )
         
         # 历史文案（历史上的今天）
-        history_message = DailyHistoryMessage.get_for_date(today)
-        history_payload = None
-        if history_message:
-            history_payload = {
-                "headline": history_message.headline or None,
-                "text": history_message.text,
-            }
+        history_payload = fragments["history"]
+        if history_payload:
             logger.debug(
                 f"matched history message for date {today.isoformat()}",
                 extra={"trace_id": trace_id, "user_id": user_id}
@@ -2122,38 +2072,9 @@ class LongTermPlanCopyListView(generics.ListAPIView):
         return super().get(request, *args, **kwargs)
 
 
-@api_view(["GET"])
-@permission_classes([IsAuthenticated])
-def goals_calendar(request):
-    user = request.user
-    today = get_today_shanghai()
-
-    year_param = request.query_params.get("year")
-    month_param = request.query_params.get("month")
-
-    try:
-        year = int(year_param) if year_param is not None else today.year
-        month = int(month_param) if month_param is not None else today.month
-    except (TypeError, ValueError):
-        return Response(
-            {"detail": "年月参数格式不正确，应为数字。"},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
-
-    if month < 1 or month > 12:
-        return Response(
-            {"detail": "月份应在 1 到 12 之间。"},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
-
-    try:
-        month_start = date(year, month, 1)
-    except ValueError:
-        return Response(
-            {"detail": "提供的年月不合法。"},
-            status=status.HTTP_400_BAD_REQUEST,
-        )
-
+def _get_calendar_month_bounds(year: int, month: int) -> tuple[date, date]:
+    """返回日历月视图的展示范围（以周日为一周开始，补齐首尾周）。"""
+    month_start = date(year, month, 1)
     _, month_days = calendar.monthrange(year, month)
     month_end = date(year, month, month_days)
 
@@ -2162,31 +2083,30 @@ def goals_calendar(request):
 
     end_offset = (6 - ((month_end.weekday() + 1) % 7)) % 7
     display_end = month_end + timedelta(days=end_offset)
+    return display_start, display_end
+
 
+def _get_calendar_activity_dates(user, start_date: date, end_date: date) -> tuple[set, set]:
+    """
+    获取指定日期范围内的打卡日期和上传日期（上海时区）。
+    上传日期直接读取 local_date 并在数据库中去重，命中 (user, local_date) 索引。
+    """
     checkins = set(
         DailyCheckIn.objects.filter(
-            user=user, date__range=(display_start, display_end)
+            user=user, date__range=(start_date, end_date)
         ).values_list("date", flat=True)
     )
-
-    # 优化：批量查询上传记录，避免循环中的多次时区转换
-    uploads = set()
-    uploaded_at_list = list(
-        UserUpload.objects.filter(
-            user=user, uploaded_at__date__range=(display_start, display_end)
-        ).values_list("uploaded_at", flat=True)
+    uploads = set(
+        UserUpload.objects.filter(user=user, local_date__range=(start_date, end_date))
+        .order_by()
+        .values_list("local_date", flat=True)
+        .distinct()
     )
-    for uploaded_at in uploaded_at_list:
-        # 明确转换为中国时区，确保日期计算正确
-        if timezone.is_naive(uploaded_at):
-            uploaded_at = timezone.make_aware(uploaded_at)
-        # 安全修复：检查 SHANGHAI_TZ 是否为 None
-        if SHANGHAI_TZ is not None:
-            shanghai_time = uploaded_at.astimezone(SHANGHAI_TZ)
-            uploads.add(shanghai_time.date())
-        else:
-            # 回退方案：直接使用本地日期
-            uploads.add(uploaded_at.date())
+    return checkins, uploads
+
+
+def _build_calendar_month_payload(year: int, month: int, checkins: set, uploads: set) -> dict:
+    display_start, display_end = _get_calendar_month_bounds(year, month)
 
     days_payload = []
     cursor = display_start
@@ -2213,18 +2133,161 @@ def goals_calendar(request):
         "upload_days": sum(1 for day in days_payload if day["status"] == "upload"),
     }
 
+    return {
+        "year": year,
+        "month": month,
+        "start": display_start.isoformat(),
+        "end": display_end.isoformat(),
+        "days": days_payload,
+        "summary": summary,
+    }
+
+
+def _parse_calendar_year_month(request, year_key: str, month_key: str):
+    """解析年月参数，返回 ((year, month), None) 或 (None, 错误响应)。"""
+    today = get_today_shanghai()
+    year_param = request.query_params.get(year_key)
+    month_param = request.query_params.get(month_key)
+
+    try:
+        year = int(year_param) if year_param is not None else today.year
+        month = int(month_param) if month_param is not None else today.month
+    except (TypeError, ValueError):
+        return None, Response(
+            {"detail": "年月参数格式不正确，应为数字。"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    if month < 1 or month > 12:
+        return None, Response(
+            {"detail": "月份应在 1 到 12 之间。"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    try:
+        date(year, month, 1)
+    except ValueError:
+        return None, Response(
+            {"detail": "提供的年月不合法。"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    return (year, month), None
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def goals_calendar(request):
+    user = request.user
+
+    parsed, error_response = _parse_calendar_year_month(request, "year", "month")
+    if error_response is not None:
+        return error_response
+    year, month = parsed
+
+    display_start, display_end = _get_calendar_month_bounds(year, month)
+    checkins, uploads = _get_calendar_activity_dates(user, display_start, display_end)
+
+    return Response(_build_calendar_month_payload(year, month, checkins, uploads))
+
+
+# 多月日历接口单次最多返回的月份数
+CALENDAR_RANGE_MAX_MONTHS = 12
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def goals_calendar_range(request):
+    """
+    一次返回连续多个月的日历数据，用于前端日历预取。
+
+    查询参数：
+    - year / month: 起始年月（默认当前月）
+    - months: 月份数量（默认 3，最多 12）
+    """
+    user = request.user
+
+    parsed, error_response = _parse_calendar_year_month(request, "year", "month")
+    if error_response is not None:
+        return error_response
+    year, month = parsed
+
+    try:
+        months_count = int(request.query_params.get("months", 3))
+    except (TypeError, ValueError):
+        return Response(
+            {"detail": "months 参数格式不正确，应为数字。"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if months_count < 1 or months_count > CALENDAR_RANGE_MAX_MONTHS:
+        return Response(
+            {"detail": f"months 应在 1 到 {CALENDAR_RANGE_MAX_MONTHS} 之间。"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    year_months = []
+    for offset in range(months_count):
+        index = year * 12 + (month - 1) + offset
+        year_months.append((index // 12, index % 12 + 1))
+
+    try:
+        range_start, _ = _get_calendar_month_bounds(*year_months[0])
+        _, range_end = _get_calendar_month_bounds(*year_months[-1])
+    except ValueError:
+        return Response(
+            {"detail": "提供的年月不合法。"},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    # 整个范围只查询一次，再按月切分
+    checkins, uploads = _get_calendar_activity_dates(user, range_start, range_end)
+
     return Response(
         {
-            "year": year,
-            "month": month,
-            "start": display_start.isoformat(),
-            "end": display_end.isoformat(),
-            "days": days_payload,
-            "summary": summary,
+            "months": [
+                _build_calendar_month_payload(y, m, checkins, uploads)
+                for y, m in year_months
+            ],
         }
     )
 
 
+def _build_task_completions(
+    user, goal: ShortTermGoal, task_images: dict, target_date: date
+) -> list[ShortTermGoalTaskCompletion]:
+    """
+    校验任务图片关联并构建待写入的任务完成记录（未保存）。
+    
+    无效的任务ID、上传ID，以及不存在或不属于当前用户的上传记录会被跳过。
+    """
+    upload_ids_by_task: dict[str, int] = {}
+    for task_id, upload_id in task_images.items():
+        if not isinstance(task_id, str) or not task_id.strip():
+            continue
+        try:
+            upload_ids_by_task[task_id.strip()] = int(upload_id)
+        except (ValueError, TypeError):
+            logger.warning(
+                f"无效的上传ID: {upload_id}",
+                extra={"user_id": user.id, "task_id": task_id}
+            )
+
+    uploads = UserUpload.objects.filter(user=user).only("id").in_bulk(
+        set(upload_ids_by_task.values())
+    )
+    completions = []
+    for task_id, upload_id in upload_ids_by_task.items():
+        upload = uploads.get(upload_id)
+        if upload is None:
+            logger.warning(
+                f"上传记录不存在或不属于当前用户: {upload_id}",
+                extra={"user_id": user.id, "task_id": task_id}
+            )
+            continue
+        completions.append(
+            ShortTermGoalTaskCompletion(goal=goal, task_id=task_id, date=target_date, upload=upload)
+        )
+    return completions
 
 
 @api_view(["GET", "POST"])
@@ -2317,6 +2380,8 @@ def check_in(request):
                         {"detail": "指定的短期目标不存在或不属于当前用户。"},
                         status=status.HTTP_404_NOT_FOUND,
                     )
+                # 在加锁事务之外完成校验：一次查询取回所有引用的上传记录
+                task_completions = _build_task_completions(user, goal, task_images, target_date)
 
         with transaction.atomic():
             # 使用select_for_update锁定，防止并发问题
@@ -2371,46 +2436,19 @@ def check_in(request):
 
             # 保存任务图片关联（如果提供）
             if task_images and goal_id:
-                goal = ShortTermGoal.objects.get(pk=goal_id, user=user)
-                for task_id, upload_id in task_images.items():
-                    if not isinstance(task_id, str) or not task_id.strip():
-                        continue
-                    try:
-                        upload_id_int = int(upload_id)
-                    except (ValueError, TypeError):
-                        logger.warning(
-                            f"无效的上传ID: {upload_id}",
-                            extra={"user_id": user.id, "task_id": task_id}
-                        )
-                        continue
-                    
-                    # 验证上传记录是否存在且属于当前用户
-                    try:
-                        upload = UserUpload.objects.get(pk=upload_id_int, user=user)
-                    except UserUpload.DoesNotExist:
-                        logger.warning(
-                            f"上传记录不存在或不属于当前用户: {upload_id_int}",
-                            extra={"user_id": user.id, "task_id": task_id}
-                        )
-                        continue
-                    
-                    # 创建或更新任务完成记录
-                    # 如果是新创建，created_at会自动设置为当前时间
-                    # 如果是更新，保持原有的created_at不变
-                    completion, created = ShortTermGoalTaskCompletion.objects.get_or_create(
-                        goal=goal,
-                        task_id=task_id.strip(),
-                        date=target_date,
-                        defaults={"upload": upload}
-                    )
-                    # 如果是更新，更新upload字段
-                    if not created:
-                        completion.upload = upload
-                        completion.save(update_fields=["upload", "updated_at"])
+                # 一条语句写入所有记录；已存在的记录（同一目标、任务、日期）更新关联的上传，
+                # created_at 保持不变
+                ShortTermGoalTaskCompletion.objects.bulk_create(
+                    task_completions,
+                    update_conflicts=True,
+                    unique_fields=conflict_target(["goal", "task_id", "date"]),
+                    update_fields=["upload", "updated_at"],
+                )
+                # bulk_create 不触发模型信号，手动使完成记录响应缓存失效
+                task_completion_cache.bump_version(user.id)
                 
                 # 检查短期目标是否已完成所有天数
-                # 使用辅助函数统一处理
-                _check_and_update_short_term_goal_status(goal)
+                update_goal_status(goal)
 
         stats = _get_check_in_stats(user)
         payload = {
@@ -2441,67 +2479,15 @@ def _get_check_in_stats(user):
     - 今日是否已打卡 = 并集中是否包含今天
     - 连续天数 = 以最近一天为起点，向前按日连续命中的天数
     """
-    today = get_today_shanghai()
-    # 1) 收集 DailyCheckIn 日期
-    checkin_dates = set(
-        DailyCheckIn.objects.filter(user=user).values_list("date", flat=True)
-    )
-    # 2) 收集上传记录日期（本地化为上海时区的"日"）
-    # 优化：批量查询所有上传时间，避免循环中的多次时区转换
-    upload_dates = set()
-    uploaded_at_list = list(
-        UserUpload.objects.filter(user=user, uploaded_at__isnull=False)
-        .values_list("uploaded_at", flat=True)
-    )
-    for uploaded_at in uploaded_at_list:
-        # 明确转换为中国时区，确保日期计算正确
-        if timezone.is_naive(uploaded_at):
-            uploaded_at = timezone.make_aware(uploaded_at)
-        # 安全修复：检查 SHANGHAI_TZ 是否为 None
-        if SHANGHAI_TZ is not None:
-            shanghai_time = uploaded_at.astimezone(SHANGHAI_TZ)
-            upload_dates.add(shanghai_time.date())
-        else:
-            # 回退方案：直接使用本地日期
-            upload_dates.add(uploaded_at.date())
-    # 3) 合并为并集
-    union_dates = checkin_dates | upload_dates
-    if not union_dates:
-        return {
-            "checked_today": False,
-            "current_streak": 0,
-            "total_checkins": 0,
-            "latest_checkin": None,
-        }
-    total = len(union_dates)
-    latest_date = max(union_dates)
-    checked_today = today in union_dates
-    # 4) 计算连续天数：从最近一天开始，向前逐天查找连续
-    streak = 0
-    cursor = latest_date
-    while cursor in union_dates:
-        streak += 1
-        cursor = cursor - timedelta(days=1)
-    return {
-        "checked_today": checked_today,
-        "current_streak": streak,
-        "total_checkins": total,
-        "latest_checkin": latest_date.isoformat(),
-    }
+    return get_check_in_stats_bulk([user.id], today=get_today_shanghai())[user.id]
 
 
 def _resolve_general_message():
-    """解析通用文案：随机展示一句。"""
-    messages = list(
-        EncouragementMessage.objects.filter(is_active=True).only("text", "weight")
-    )
-    if not messages:
+    """解析通用文案：按权重随机展示一句（使用进程内缓存的别名抽样器）。"""
+    sampler = get_encouragement_sampler()
+    if sampler is None:
         return None
-
-    # 确保类型正确（防止从数据库读取时是字符串）
-    weights = [max(int(message.weight) if message.weight is not None else 1, 1) for message in messages]
-    selected = random.choices(messages, weights=weights, k=1)[0]
-    return selected.text
+    return sampler.sample()
 
 
 def _resolve_conditional_message(
@@ -2563,12 +2549,10 @@ class LongTermGoalView(APIView):
             if goal is None:
                 return Response(None, status=status.HTTP_200_OK)
             
-            uploads = self._fetch_uploads(request.user, goal.started_at)
             serializer = LongTermGoalSerializer(
                 goal,
                 context={
                     "request": request,
-                    "uploads": uploads,
                 },
             )
             return Response(serializer.data)
@@ -2587,12 +2571,10 @@ class LongTermGoalView(APIView):
             
             result = []
             for goal in goals:
-                uploads = self._fetch_uploads(request.user, goal.started_at)
                 serializer = LongTermGoalSerializer(
                     goal,
                     context={
                         "request": request,
-                        "uploads": uploads,
                     },
                 )
                 result.append(serializer.data)
@@ -2782,13 +2764,15 @@ class LongTermGoalView(APIView):
                 goal.metadata = metadata
                 goal.save(update_fields=["metadata"])
 
+        # 开始时间或检查点参数可能已变化，重建进度统计并重新判断是否完成
+        rebuild_goal_progress(goal)
+        discard_goal_snapshot(goal)
+
         try:
-            uploads = self._fetch_uploads(request.user, goal.started_at)
             serializer = LongTermGoalSerializer(
                 goal,
                 context={
                     "request": request,
-                    "uploads": uploads,
                 },
             )
             status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
@@ -2808,40 +2792,6 @@ class LongTermGoalView(APIView):
         )
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @staticmethod
-    def _fetch_uploads(user, started_at):
-        """
-        获取用户在长期目标开始后的所有上传记录。
-        
-        修复：使用日期范围查询，确保时区一致，避免遗漏边界时间点的上传。
-        """
-        # 确保started_at是aware datetime
-        if timezone.is_naive(started_at):
-            started_at = timezone.make_aware(started_at)
-        
-        # 获取started_at的日期（上海时区），用于更准确的查询
-        if SHANGHAI_TZ is not None:
-            started_at_shanghai = started_at.astimezone(SHANGHAI_TZ)
-            # 使用当天的开始时间（00:00:00）作为查询起点，确保包含当天所有上传
-            start_date = started_at_shanghai.date()
-            start_datetime = timezone.make_aware(
-                datetime.combine(start_date, datetime.min.time()),
-                timezone=SHANGHAI_TZ
-            )
-            # 转换为UTC用于数据库查询
-            if settings.USE_TZ:
-                start_datetime = start_datetime.astimezone(dt_timezone.utc)
-        else:
-            # 回退：使用原始started_at，但确保时区正确
-            start_datetime = started_at
-        
-        return list(
-            UserUpload.objects.filter(
-                user=user, 
-                uploaded_at__gte=start_datetime
-            ).order_by("uploaded_at", "id")
-        )
-
 
 class YearlyGoalPresetView(APIView):
     permission_classes = [IsAuthenticated]
@@ -2860,66 +2810,23 @@ def completed_long_term_goals(request):
     返回当前用户所有"已完成"的长期目标历史记录：
     - 包含已归档的历史记录（is_archived=True）
     - 也包含当前未归档但进度已达成的目标
+    
+    已完成的目标读取归档快照，只有尚未完成的目标会重新序列化判断。
+    传入 page 参数时分页返回（page_size 可选），否则返回完整列表（向后兼容）。
     """
-    goals_qs = (
-        LongTermGoal.objects.filter(user=request.user)
-        .order_by("-created_at", "-id")
+    ensure_goal_snapshots(request.user)
+    snapshots = LongTermGoalSnapshot.objects.filter(user=request.user).order_by(
+        "-goal_created_at", "-goal_id"
     )
     
-    # 为每个目标获取对应的uploads，并序列化
-    completed_goals = []
-    for goal in goals_qs:
-        try:
-            # 为每个目标获取对应的uploads
-            uploads = LongTermGoalView._fetch_uploads(request.user, goal.started_at)
-            serializer = LongTermGoalSerializer(
-                goal,
-                context={
-                    "request": request,
-                    "uploads": uploads,
-                },
-            )
-            goal_data = serializer.data
-            
-            # 检查是否已完成
-            progress = goal_data.get("progress") or {}
-            checkpoints = goal_data.get("checkpoints") or []
-            
-            # 检查是否所有检查点都已完成
-            all_checkpoints_completed = (
-                len(checkpoints) > 0 and
-                all(cp.get("status") == "completed" for cp in checkpoints)
-            )
-            
-            try:
-                progress_percent = int(progress.get("progressPercent") or 0)
-            except (TypeError, ValueError):
-                progress_percent = 0
-            try:
-                spent_hours = float(progress.get("spentHours") or 0)
-            except (TypeError, ValueError):
-                spent_hours = 0.0
-            try:
-                target_hours = float(progress.get("targetHours") or 0)
-            except (TypeError, ValueError):
-                target_hours = 0.0
-
-            # 如果所有检查点都已完成，或者进度达到100%，或者时长达到目标，则认为已完成
-            if all_checkpoints_completed:
-                completed_goals.append(goal_data)
-            elif progress_percent >= 100:
-                completed_goals.append(goal_data)
-            elif target_hours > 0 and spent_hours >= target_hours:
-                completed_goals.append(goal_data)
-        except Exception as e:
-            # 如果某个目标序列化失败，记录错误但继续处理其他目标
-            logger.error(
-                f"序列化长期目标失败: goal_id={goal.id}, error={str(e)}",
-                exc_info=True
-            )
-            continue
+    if "page" not in request.query_params:
+        return Response([render_goal_snapshot(snapshot, request) for snapshot in snapshots])
     
-    return Response(completed_goals)
+    paginator = StandardResultsSetPagination()
+    page = paginator.paginate_queryset(snapshots, request)
+    return paginator.get_paginated_response(
+        [render_goal_snapshot(snapshot, request) for snapshot in page]
+    )
 
 
 @api_view(["PATCH"])
@@ -3098,13 +3005,13 @@ def update_checkpoint(request):
         # 只更新metadata字段
         goal.save(update_fields=["metadata", "updated_at"])
     
+    refresh_existing_snapshot(goal)
+    
     # 重新获取并序列化goal
-    uploads = LongTermGoalView._fetch_uploads(request.user, goal.started_at)
     serializer = LongTermGoalSerializer(
         goal,
         context={
             "request": request,
-            "uploads": uploads,
         },
     )
     return Response(serializer.data)
@@ -3267,14 +3174,13 @@ def update_three_months_round(request, goal_id):
     
     # 保存
     goal.save(update_fields=["metadata", "updated_at"])
+    refresh_existing_snapshot(goal)
     
     # 重新获取并序列化goal
-    uploads = LongTermGoalView._fetch_uploads(request.user, goal.started_at)
     serializer = LongTermGoalSerializer(
         goal,
         context={
             "request": request,
-            "uploads": uploads,
         },
     )
     return Response(serializer.data)
@@ -3517,6 +3423,13 @@ def user_test_result(request, result_id):
 
 # ==================== 标签管理 API ====================
 
+def _order_tags(queryset, request):
+    """标签排序：默认按显示顺序；ordering=popular 时按使用次数从多到少。"""
+    if request.query_params.get("ordering") == "popular":
+        return queryset.order_by("-usage_count", "display_order", "name")
+    return queryset.order_by("display_order", "name")
+
+
 class TagListCreateView(generics.ListCreateAPIView):
     """标签列表和创建视图"""
     serializer_class = TagSerializer
@@ -3525,7 +3438,10 @@ class TagListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         # 返回用户的所有标签（统一为自定义标签）
-        return Tag.objects.filter(user=user).order_by("display_order", "name")
+        return _order_tags(Tag.objects.filter(user=user), self.request)
+    
+    def list(self, request, *args, **kwargs):
+        return Response(TagProjection(request).project(self.get_queryset()))
     
     def perform_create(self, serializer):
         # 创建时自动设置用户
@@ -3557,8 +3473,11 @@ class TagDetailView(generics.RetrieveUpdateDestroyAPIView):
             from rest_framework.exceptions import PermissionDenied
             raise PermissionDenied("不能删除其他用户的标签。")
         
-        # 检查是否有画作使用此标签
-        upload_count = instance.uploads.count()
+        # 检查是否有画作使用此标签（使用次数随标签关联变化维护）
+        upload_count = instance.usage_count
+        if upload_count == 0 and instance.uploads.exists():
+            # 使用次数可能与关联表不一致（bulk_create、直接 SQL 修改关联），以关联表为准
+            upload_count = instance.uploads.count()
         if upload_count > 0:
             from rest_framework.exceptions import ValidationError
             raise ValidationError(
@@ -3575,14 +3494,12 @@ def tags_list(request):
     user = request.user
     
     # 获取用户的所有标签
-    tags = Tag.objects.filter(user=user).order_by("display_order", "name")
-    
-    serializer = TagSerializer(tags, many=True, context={"request": request})
+    tags = _order_tags(Tag.objects.filter(user=user), request)
     
     # 为了向后兼容，保留preset_tags和custom_tags字段，但都返回用户的标签
     return Response({
         "preset_tags": [],
-        "custom_tags": serializer.data,
+        "custom_tags": TagProjection(request).project(tags),
     })
 
 
@@ -3591,8 +3508,7 @@ def tags_list(request):
 def moods_list(request):
     """获取所有可用的创作状态"""
     moods = Mood.objects.filter(is_active=True).order_by("display_order", "name")
-    serializer = MoodSerializer(moods, many=True, context={"request": request})
-    return Response(serializer.data)
+    return Response(MoodProjection(request).project(moods))
 
 
 @api_view(["GET"])
@@ -3642,32 +3558,55 @@ def monthly_report(request):
             month=month,
         )
     except MonthlyReport.DoesNotExist:
+        report = None
+    
+    if report is None:
         # 如果不存在且已到可见日期，按需生成
-        from core.management.commands.generate_monthly_report import Command
-        
-        try:
-            cmd = Command()
-            report_data = cmd._generate_report_data(request.user, year, month)
-            
-            # 保存到数据库
-            with transaction.atomic():
-                report = MonthlyReport.objects.create(
-                    user=request.user,
-                    year=year,
-                    month=month,
-                    **report_data,
-                )
-        except Exception as e:
-            # 生成失败，返回不存在
-            logger.warning(f"Failed to generate monthly report for user {request.user.id}, year {year}, month {month}: {e}")
-            return Response({
-                "exists": False,
-                "year": year,
-                "month": month,
-            })
+        if not getattr(settings, "CELERY_ENABLED", False):
+            # Celery 未启用时同步生成（向后兼容）
+            generate_reports_for_users([request.user.id], year, month)
+            report = MonthlyReport.objects.filter(
+                user=request.user,
+                year=year,
+                month=month,
+            ).first()
+            if report is None:
+                # 生成失败，返回不存在
+                return Response({
+                    "exists": False,
+                    "year": year,
+                    "month": month,
+                })
+        else:
+            # 在后台生成，返回任务ID供客户端轮询进度
+            try:
+                job_id = monthly_report_jobs.enqueue_report_generation(request.user, year, month)
+            except Exception:
+                return Response({
+                    "exists": False,
+                    "year": year,
+                    "month": month,
+                })
+            job = monthly_report_jobs.get_job(job_id) or {}
+            return Response(
+                {
+                    "exists": False,
+                    "year": year,
+                    "month": month,
+                    "jobId": job_id,
+                    "status": job.get("status", monthly_report_jobs.STATUS_PENDING),
+                    "progressUrl": reverse("core:monthly-report-job", args=[job_id]),
+                },
+                status=status.HTTP_202_ACCEPTED,
+            )
     
     # 返回月报数据
-    return Response({
+    return Response(_serialize_monthly_report(report))
+
+
+def _serialize_monthly_report(report: MonthlyReport) -> dict:
+    """将固定月报转换为前端需要的格式"""
+    return {
         "exists": True,
         "year": report.year,
         "month": report.month,
@@ -3690,7 +3629,37 @@ def monthly_report(request):
         "uploadIds": report.upload_ids,
         "reportTexts": report.report_texts,
         "createdAt": report.created_at.isoformat(),
-    })
+    }
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def monthly_report_job(request, job_id):
+    """查询按需月报生成任务的进度，完成后直接返回月报数据"""
+    job = monthly_report_jobs.get_job(job_id)
+    if job is None or job["user_id"] != request.user.id:
+        return Response(
+            {"detail": "任务不存在"},
+            status=status.HTTP_404_NOT_FOUND,
+        )
+    
+    response_data = {
+        "jobId": job_id,
+        "status": job["status"],
+        "year": job["year"],
+        "month": job["month"],
+    }
+    if job["status"] == monthly_report_jobs.STATUS_SUCCESS:
+        report = MonthlyReport.objects.filter(
+            user=request.user,
+            year=job["year"],
+            month=job["month"],
+        ).first()
+        if report is not None:
+            response_data["report"] = _serialize_monthly_report(report)
+    elif job["status"] == monthly_report_jobs.STATUS_FAILURE:
+        response_data["error"] = job["error"]
+    return Response(response_data)
 
 
 @api_view(["GET"])
@@ -3755,7 +3724,12 @@ def admin_user_uploads(request):
         )
     
     # 获取用户的上传记录（带分页）
-    uploads = UserUpload.objects.filter(user=user).order_by("-uploaded_at")
+    uploads = (
+        UserUpload.objects.filter(user=user)
+        .select_related("mood")
+        .prefetch_related("tags")
+        .order_by("-uploaded_at", "-id")
+    )
     
     # 使用分页器
     paginator = StandardResultsSetPagination()
@@ -3845,7 +3819,7 @@ def admin_user_monthly_report(request):
 class VisualAnalysisResultListCreateView(generics.ListCreateAPIView):
     """视觉分析结果列表和创建视图（带分页）"""
     permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser, JSONParser]  # 支持文件上传和JSON
+    parser_classes = [MultiPartParser, FormParser, ORJSONParser]  # 支持文件上传和JSON
     pagination_class = StandardResultsSetPagination  # 使用标准分页，避免返回大量数据
     
     def get_serializer_class(self):
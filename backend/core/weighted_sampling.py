@@ -0,0 +1,74 @@
+"""
+加权随机抽样：Vose 别名法（Alias Method）。
+
+构建复杂度 O(n)，每次抽样 O(1)，抽样时不分配任何临时列表，
+适合"构建一次、抽样多次"的场景（如首页通用文案）。
+"""
+from __future__ import annotations
+
+import random
+from typing import Generic, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class AliasSampler(Generic[T]):
+    """
+    按权重从固定候选集合中抽样。
+
+    Args:
+        items: 候选项
+        weights: 与 items 一一对应的非负权重，总和必须大于 0
+    """
+
+    __slots__ = ("items", "_prob", "_alias")
+
+    def __init__(self, items: Sequence[T], weights: Sequence[float]):
+        if len(items) != len(weights):
+            raise ValueError("items 与 weights 长度必须一致")
+        if not items:
+            raise ValueError("候选项不能为空")
+        if any(weight < 0 for weight in weights):
+            raise ValueError("权重不能为负数")
+        total = float(sum(weights))
+        if total <= 0:
+            raise ValueError("权重总和必须大于 0")
+
+        n = len(items)
+        self.items = tuple(items)
+        prob = [0.0] * n
+        alias = [0] * n
+
+        # 将权重缩放为均值 1，分入"不足"与"溢出"两个栈
+        scaled = [weight * n / total for weight in weights]
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] = (scaled[more] + scaled[less]) - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+
+        # 剩余项因浮点误差可能略偏离 1，统一视为满格
+        for index in large + small:
+            prob[index] = 1.0
+
+        self._prob = tuple(prob)
+        self._alias = tuple(alias)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def sample(self, rng: random.Random | None = None) -> T:
+        """抽取一个候选项。rng 为 None 时使用全局 random 模块。"""
+        rng = rng or random
+        index = rng.randrange(len(self.items))
+        if rng.random() < self._prob[index]:
+            return self.items[index]
+        return self.items[self._alias[index]]